@@ -1,9 +1,24 @@
 from flask import Flask
-from redis import Redis
 from .config import get_config
+# 扩展需要先于模型导入，模型通过 `from .. import db` 引用
+from .extensions import db, setup_extensions
+from .models.base import setup_soft_delete_filter
+from .utils.db_engine import setup_engine
+from .utils.read_replica import setup_read_replicas
 from .utils.logger import setup_logger
+from .utils.redis_client import setup_redis
+from .utils.json_provider import setup_json
+from .utils.captcha_pool import setup_captcha_pool
+from .utils.captcha_store import setup_captcha_store
+from .utils.login_guard import setup_login_guard
+from .utils.permission import setup_permissions
+from .utils.identity import setup_identity_cache
+from .utils.token_blocklist import setup_token_blocklist
+from .utils.menu_tree import setup_menu_tree
+from .utils.response_cache import setup_response_cache
+from .utils.metrics import setup_metrics
+from .utils.query_profiler import setup_query_profiler
 from .views import register_blueprints
-from .extensions import db, setup_extensions
 
 
 def create_app():
@@ -15,28 +30,69 @@ def create_app():
     # 初始化日志
     setup_logger(app)
 
+    # 使用更快的 JSON provider（安装了 orjson 时），统一 datetime/Enum 编码
+    setup_json(app)
+
+    # 初始化 Redis 连接池和客户端，限流存储也使用这个连接池，需要先于扩展初始化
+    try:
+        setup_redis(app)
+    except Exception as e:
+        app.logger.error(f"Redis initialization failed: {e}")
+        raise
+
     # 初始化数据库
     try:
         db.init_app(app)
+        # 按数据库类型设置连接参数（SQLite PRAGMA），并输出生效的引擎配置
+        setup_engine(app)
+        # 只读副本（可选）
+        setup_read_replicas(app)
         setup_extensions(app)
+        # 已逻辑删除的行默认不出现在查询结果中
+        setup_soft_delete_filter()
     except Exception as e:
         app.logger.error(f"Database initialization failed: {e}")
         # 如果数据库初始化失败，则抛出异常，阻止应用启动
         raise
 
-    # 初始化 Redis 客户端，使用 from_url() 方法从配置中加载URI
-    try:
-        redis_client = Redis.from_url(app.config['REDIS_URI'])
-        app.redis_client = redis_client
-    except Exception as e:
-        app.logger.error(f"Redis initialization failed: {e}")
-        raise
+    # 初始化验证码存储和预渲染池
+    setup_captcha_store(app)
+    setup_captcha_pool(app)
+
+    # 初始化登录失败保护
+    setup_login_guard(app)
+
+    # 初始化 JWT 撤销列表
+    setup_token_blocklist(app)
+
+    # 初始化权限缓存
+    setup_permissions(app)
+
+    # 初始化当前用户身份信息缓存和 user_lookup_loader
+    setup_identity_cache(app)
+
+    # 初始化菜单树缓存，依赖权限缓存的版本号
+    setup_menu_tree(app)
+
+    # 初始化 GET 响应缓存
+    setup_response_cache(app)
+
+    # 初始化请求、SQL 和 Redis 指标统计
+    setup_metrics(app)
+
+    # 开发环境的 SQL 分析：N+1 和慢查询
+    setup_query_profiler(app)
 
     # 注册蓝图
     register_blueprints(app)
 
     # 注册 CLI 命令
-    from .commands import init_db_command
+    from .commands import (
+        init_db_command, login_guard_command, rebuild_department_tree_command, import_users_command
+    )
     app.cli.add_command(init_db_command)
+    app.cli.add_command(login_guard_command)
+    app.cli.add_command(rebuild_department_tree_command)
+    app.cli.add_command(import_users_command)
 
     return app
@@ -1,7 +1,10 @@
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 from .models.user import User
+from .models.department import Department
 from .extensions import db
+from .utils.user_io import import_users
 
 
 @click.command('init-db')
@@ -27,3 +30,58 @@ def init_db_command():
         click.echo("Admin user already exists.")
 
     click.echo("Database tables created successfully.")
+
+
+@click.command('login-guard')
+@click.argument('username', required=False)
+@click.option('--unlock', is_flag=True, help='清空该账号的失败计数并解除锁定。')
+@with_appcontext
+def login_guard_command(username, unlock):
+    """
+    查看登录失败统计；指定用户名时显示该账号的失败次数和剩余锁定时间。
+    """
+    guard = current_app.login_guard
+
+    if unlock:
+        if not username:
+            raise click.UsageError("--unlock 需要指定用户名。")
+        guard.record_success(username)
+        click.echo(f"Account '{username}' unlocked.")
+        return
+
+    stats = guard.stats(username)
+    click.echo(f"failures: {stats['failures']}")
+    click.echo(f"lockouts: {stats['lockouts']}")
+    click.echo(f"rejected: {stats['rejected']}")
+    if username:
+        account = stats['account']
+        click.echo(f"{username}: failures={account['failures']}, locked_for={account['locked_for']}s")
+
+
+@click.command('rebuild-department-tree')
+@with_appcontext
+def rebuild_department_tree_command():
+    """
+    按 parent_id 重建部门树的物化路径，用于为已有数据补齐路径。
+    """
+    count = Department.rebuild_paths()
+    db.session.commit()
+    click.echo(f"Rebuilt tree paths for {count} departments.")
+
+
+@click.command('import-users')
+@click.argument('file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--chunk-size', type=int, default=None, help='每批导入的行数，默认取 USER_IMPORT_CHUNK_SIZE。')
+@with_appcontext
+def import_users_command(file, chunk_size):
+    """
+    从 CSV 文件批量导入用户，逐批输出进度，最后列出失败的行。
+    """
+    def progress(chunk):
+        click.echo(f"chunk {chunk['chunk']}: {chunk['created']}/{chunk['rows']} created, "
+                   f"{chunk['total_created']} in total")
+
+    result = import_users(file, chunk_size or current_app.config['USER_IMPORT_CHUNK_SIZE'], progress)
+    for line, message in result.errors:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"Imported {result.created} of {result.total} users.")
@@ -8,18 +8,180 @@ load_dotenv()
 class Config:
     # 从环境变量中获取 Redis URI，如果不存在则使用本地默认值
     REDIS_URI = os.getenv("REDIS_URI", 'redis://10.1.8.13:6379/0')
+    # 是否连接 Redis；为 False 时不建立任何连接，Redis 命令立即失败，各类缓存直接查库、失效通知被跳过
+    REDIS_ENABLED = os.getenv('REDIS_ENABLED', 'true').lower() == 'true'
+    # --- Redis 连接池配置，验证码、限流和各类缓存共用一个连接池 ---
+    # 每个进程最多的连接数，用尽时等待 REDIS_POOL_TIMEOUT 秒
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+    REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 2))
+    # 建立连接的超时时间（秒），Redis 不可达时快速失败
+    REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 1))
+    # 单条命令读写的超时时间（秒）
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2))
+    # 空闲连接在使用前 PING 的间隔（秒）
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30))
+    # 连接错误和超时的重试次数
+    REDIS_RETRIES = int(os.getenv('REDIS_RETRIES', 1))
 
     SECRET_KEY = os.getenv("SECRET_KEY")
 
     # JWT 配置信息
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ACCESS_TOKEN_EXPIRES = os.getenv("JWT_ACCESS_TOKEN_EXPIRES", '15m')
+    # 注销时撤销令牌：撤销的 jti 存入 Redis，每个进程用布隆过滤器在本地放行绝大多数未撤销的令牌
+    JWT_BLOCKLIST_ENABLED = os.getenv('JWT_BLOCKLIST_ENABLED', 'true').lower() == 'true'
+    # 过滤器容量，按令牌有效期内预计的最大撤销数量设置，超过时全量同步会自动扩容
+    JWT_BLOCKLIST_CAPACITY = int(os.getenv('JWT_BLOCKLIST_CAPACITY', 100000))
+    # 过滤器的目标误报率，误报的令牌会多一次 Redis 查询
+    JWT_BLOCKLIST_ERROR_RATE = float(os.getenv('JWT_BLOCKLIST_ERROR_RATE', 0.001))
+    # 全量重建过滤器的间隔（秒），用于剔除已过期的 jti
+    JWT_BLOCKLIST_RESYNC_INTERVAL = float(os.getenv('JWT_BLOCKLIST_RESYNC_INTERVAL', 300))
+
+    # 是否扫描 app/views 目录自动注册蓝图，默认只注册 app/views/__init__.py 中 BLUEPRINTS 列出的蓝图
+    BLUEPRINT_AUTO_DISCOVER = os.getenv('BLUEPRINT_AUTO_DISCOVER', 'false').lower() == 'true'
 
     # --- MySQL 连接池配置 ---
+    # 以下配置由 get_config 组装为 SQLALCHEMY_ENGINE_OPTIONS，Flask-SQLAlchemy 不会直接读取这些键
     # 连接池大小，默认为 10
     SQLALCHEMY_POOL_SIZE = int(os.getenv('SQLALCHEMY_POOL_SIZE', 10))
     # 连接池溢出数量，默认为 5
     SQLALCHEMY_MAX_OVERFLOW = int(os.getenv('SQLALCHEMY_MAX_OVERFLOW', 5))
+    # 连接最长使用时间（秒），需小于 MySQL 的 wait_timeout，避免使用已被服务端断开的连接
+    SQLALCHEMY_POOL_RECYCLE = int(os.getenv('SQLALCHEMY_POOL_RECYCLE', 1800))
+    # 连接池耗尽时等待空闲连接的最长时间（秒）
+    SQLALCHEMY_POOL_TIMEOUT = float(os.getenv('SQLALCHEMY_POOL_TIMEOUT', 10))
+    # 取出连接时先发送一次 ping，自动替换失效的连接
+    SQLALCHEMY_POOL_PRE_PING = os.getenv('SQLALCHEMY_POOL_PRE_PING', 'true').lower() == 'true'
+    # 建立连接、读、写的超时时间（秒）
+    MYSQL_CONNECT_TIMEOUT = int(os.getenv('MYSQL_CONNECT_TIMEOUT', 5))
+    MYSQL_READ_TIMEOUT = int(os.getenv('MYSQL_READ_TIMEOUT', 30))
+    MYSQL_WRITE_TIMEOUT = int(os.getenv('MYSQL_WRITE_TIMEOUT', 30))
+
+    # --- 只读副本配置 ---
+    # 只读副本的数据库 URI，逗号分隔；只读请求（GET/HEAD/OPTIONS）和 read_replica() 代码块中的查询发往副本
+    SQLALCHEMY_REPLICA_URIS = tuple(uri for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri)
+    # 副本健康检查间隔（秒）
+    REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 5))
+    # 不健康的副本在该时间（秒）后才重新检查，期间读主库
+    REPLICA_RETRY_INTERVAL = float(os.getenv('REPLICA_RETRY_INTERVAL', 30))
+
+    # --- SQLite 配置 ---
+    # 日志模式，WAL 下读写互不阻塞，多个读者可以与一个写者并发
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    # WAL 模式下 NORMAL 只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    # 数据库被锁定时等待的最长时间（毫秒），超时后才报 database is locked
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # 内存映射读取的最大字节数，默认 256MB
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+    # 每个连接的页缓存大小，负数表示 KiB，默认 64MB
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))
+
+    # --- 日志配置 ---
+    # 日志文件目录，默认为 backend/logs
+    LOG_DIR = os.getenv('LOG_DIR')
+    # 日志格式：text（文本）或 json（每行一条 JSON）
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    # 是否通过队列在后台线程中写日志，请求线程不做文件 I/O
+    LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE_ENABLED', 'true').lower() == 'true'
+    # 日志队列容量
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    # 队列满时的处理方式：drop（丢弃并计数）或 block（等待）
+    LOG_QUEUE_POLICY = os.getenv('LOG_QUEUE_POLICY', 'drop')
+    # 轮转后的旧日志文件是否 gzip 压缩，只在 LOG_QUEUE_ENABLED 开启时生效（压缩在后台日志线程中进行）
+    LOG_COMPRESS = os.getenv('LOG_COMPRESS', 'true').lower() == 'true'
+
+    # --- 限流配置 ---
+    # 两级限流：每个进程先在本地计数，按批次同步到 Redis。集群范围的上限变为近似值，
+    # 最多超出 进程数 × RATELIMIT_SYNC_BATCH 次，换来大部分请求不访问 Redis
+    RATELIMIT_LOCAL_TIER = os.getenv('RATELIMIT_LOCAL_TIER', 'false').lower() == 'true'
+    # 后台同步本地计数的间隔（秒）
+    RATELIMIT_SYNC_INTERVAL = float(os.getenv('RATELIMIT_SYNC_INTERVAL', 0.5))
+    # 单个限流键本地未同步计数达到该值时立即同步
+    RATELIMIT_SYNC_BATCH = int(os.getenv('RATELIMIT_SYNC_BATCH', 10))
+
+    # --- 密码哈希配置 ---
+    # werkzeug 哈希方法及成本参数，如 scrypt、scrypt:32768:8:1、pbkdf2:sha256:600000
+    # 修改后，用户下次登录成功时会自动按新参数重新哈希
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # 哈希计算的执行方式：process（进程池，利用多核）、thread（线程池）、inline（请求线程内）
+    PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')
+    # 工作池大小，默认为 CPU 核数
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    # 排队中的哈希任务上限，0 表示工作池大小的 4 倍
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0))
+    # 单次哈希任务的排队及执行超时时间（秒）
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+    # --- 登录失败保护配置 ---
+    # 同一账号在窗口期内连续失败达到该次数后开始锁定
+    LOGIN_FAIL_THRESHOLD = int(os.getenv('LOGIN_FAIL_THRESHOLD', 5))
+    # 失败计数的统计窗口（秒）
+    LOGIN_FAIL_WINDOW = int(os.getenv('LOGIN_FAIL_WINDOW', 900))
+    # 首次锁定时长（秒），之后每多失败一次翻倍
+    LOGIN_LOCKOUT_BASE = int(os.getenv('LOGIN_LOCKOUT_BASE', 30))
+    # 最长锁定时长（秒）
+    LOGIN_LOCKOUT_MAX = int(os.getenv('LOGIN_LOCKOUT_MAX', 3600))
+
+    # --- 权限缓存配置 ---
+    # Redis 中用户权限集合的缓存时间（秒）
+    PERMISSION_CACHE_TTL = int(os.getenv('PERMISSION_CACHE_TTL', 3600))
+    # 进程内最多缓存的用户权限集合数量
+    PERMISSION_LOCAL_CACHE_SIZE = int(os.getenv('PERMISSION_LOCAL_CACHE_SIZE', 10000))
+    # 进程内读取 Redis 权限版本号的最小间隔（秒），即权限变更在其他进程生效的最大延迟
+    PERMISSION_VERSION_CHECK_INTERVAL = float(os.getenv('PERMISSION_VERSION_CHECK_INTERVAL', 1.0))
+    # Redis 中当前用户身份信息（用户、部门、角色）的缓存时间（秒）
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))
+
+    # --- 用户批量导入导出配置 ---
+    # 导入时每批解析、校验、哈希和写入的行数，每批单独提交
+    USER_IMPORT_CHUNK_SIZE = int(os.getenv('USER_IMPORT_CHUNK_SIZE', 1000))
+    # 导出时服务端游标每次读取的行数
+    USER_EXPORT_BATCH_SIZE = int(os.getenv('USER_EXPORT_BATCH_SIZE', 1000))
+
+    # --- GET 响应缓存配置 ---
+    # 缓存过期后仍保留的秒数，期间重建缓存的同时其他请求返回旧内容
+    RESPONSE_CACHE_STALE_TTL = int(os.getenv('RESPONSE_CACHE_STALE_TTL', 60))
+    # 重建锁的过期时间（秒），也是其他请求等待重建结果的最长时间
+    RESPONSE_CACHE_LOCK_TIMEOUT = float(os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', 5))
+
+    # --- 监控指标配置 ---
+    # 是否记录各端点的请求耗时、SQL 和 Redis 调用统计，并在 /api/metrics 输出 Prometheus 格式指标
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    # 访问 /api/metrics 需要携带的 Bearer 令牌；为空时只在开发和测试环境开放，生产环境不对外提供该接口
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # --- SQL 分析配置（开发和测试环境使用） ---
+    # 是否按请求分析 SQL，将 N+1 查询和慢查询记录到日志
+    QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+    # 同一请求中同一形状的语句执行达到该次数时视为 N+1
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    # 慢查询阈值（毫秒）
+    QUERY_SLOW_THRESHOLD_MS = float(os.getenv('QUERY_SLOW_THRESHOLD_MS', 100))
+    # 慢查询是否附带 EXPLAIN 执行计划
+    QUERY_EXPLAIN_SLOW = os.getenv('QUERY_EXPLAIN_SLOW', 'true').lower() == 'true'
+
+    # --- 菜单树缓存配置 ---
+    # 按角色集合缓存的菜单树在 Redis 中的过期时间（秒），菜单或角色变化时通过权限版本号立即失效
+    MENU_TREE_CACHE_TTL = int(os.getenv('MENU_TREE_CACHE_TTL', 3600))
+    # 进程内最多缓存的角色集合数量（同时用于缓存用户到角色集合的映射）
+    MENU_TREE_LOCAL_CACHE_SIZE = int(os.getenv('MENU_TREE_LOCAL_CACHE_SIZE', 10000))
+
+    # --- 验证码存储配置 ---
+    # redis：多进程/多节点共享；memory：进程内 TTL 存储，仅适用于单进程部署
+    CAPTCHA_STORE = os.getenv('CAPTCHA_STORE', 'redis')
+    # memory 存储最多保留的验证码数量，超出时淘汰最早过期的验证码
+    CAPTCHA_STORE_MAX_SIZE = int(os.getenv('CAPTCHA_STORE_MAX_SIZE', 10000))
+
+    # --- 验证码预渲染池配置 ---
+    # 是否启用后台预渲染池，关闭后每次请求都在请求线程内渲染
+    CAPTCHA_POOL_ENABLED = os.getenv('CAPTCHA_POOL_ENABLED', 'true').lower() == 'true'
+    # 池中最多保留的预渲染验证码数量
+    CAPTCHA_POOL_SIZE = int(os.getenv('CAPTCHA_POOL_SIZE', 200))
+    # 低水位，池中剩余数量不高于该值时唤醒生产线程补满
+    CAPTCHA_POOL_LOW_WATERMARK = int(os.getenv('CAPTCHA_POOL_LOW_WATERMARK', 50))
+    # 预渲染时同时编码的图片格式，逗号分隔，可选 png、png8（调色板 PNG）、webp
+    CAPTCHA_POOL_FORMATS = tuple(os.getenv('CAPTCHA_POOL_FORMATS', 'png,png8').split(','))
 
 
 def get_config():
@@ -51,5 +213,55 @@ def get_config():
         )
     else:
         raise ValueError(f"Invalid DB_TYPE: {db_type}. Must be 'sqlite' or 'mysql'.")
+    config_obj.DB_TYPE = db_type
+
+    # 运行环境：development / production / testing
+    config_obj.FLASK_ENV = os.getenv('FLASK_ENV', 'production')
+
+    if config_obj.FLASK_ENV == 'testing':
+        # 测试环境使用内存数据库、内存限流存储和进程内验证码存储，不依赖外部服务
+        config_obj.TESTING = True
+        config_obj.SECRET_KEY = config_obj.SECRET_KEY or 'testing-secret-key-for-unit-tests-only'
+        config_obj.JWT_SECRET_KEY = config_obj.JWT_SECRET_KEY or 'testing-jwt-secret-key-for-unit-tests-only'
+        config_obj.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        config_obj.RATELIMIT_STORAGE_URI = 'memory://'
+        config_obj.CAPTCHA_STORE = 'memory'
+        # 测试中直接断言日志输出，使用同步日志
+        config_obj.LOG_QUEUE_ENABLED = False
+        # 测试环境使用低成本哈希，在当前线程内执行
+        config_obj.PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        config_obj.PASSWORD_HASH_EXECUTOR = 'inline'
+        # 测试不连接 Redis，缓存失效等写入不访问网络；需要 Redis 的测试替换为模拟客户端
+        config_obj.REDIS_ENABLED = False
+        # 测试中 Redis 不可用时立即失败，不重试
+        config_obj.REDIS_RETRIES = 0
+        # 不启动撤销列表的订阅线程，测试中按需替换为使用模拟 Redis 的实例
+        config_obj.JWT_BLOCKLIST_ENABLED = False
+
+    config_obj.SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(config_obj)
 
     return config_obj
+
+
+def build_engine_options(config_obj):
+    """
+    按 DB_TYPE 组装 SQLALCHEMY_ENGINE_OPTIONS：
+    - mysql：连接池大小、溢出、回收、预检和超时；
+    - sqlite：连接级 PRAGMA 由 app.utils.db_engine 在每个新连接上执行，这里只设置驱动层的锁等待超时。
+    """
+    if config_obj.DB_TYPE == 'mysql':
+        return {
+            'pool_size': config_obj.SQLALCHEMY_POOL_SIZE,
+            'max_overflow': config_obj.SQLALCHEMY_MAX_OVERFLOW,
+            'pool_recycle': config_obj.SQLALCHEMY_POOL_RECYCLE,
+            'pool_timeout': config_obj.SQLALCHEMY_POOL_TIMEOUT,
+            'pool_pre_ping': config_obj.SQLALCHEMY_POOL_PRE_PING,
+            'connect_args': {
+                'connect_timeout': config_obj.MYSQL_CONNECT_TIMEOUT,
+                'read_timeout': config_obj.MYSQL_READ_TIMEOUT,
+                'write_timeout': config_obj.MYSQL_WRITE_TIMEOUT,
+            },
+        }
+    return {
+        'connect_args': {'timeout': config_obj.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
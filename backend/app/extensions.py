@@ -5,9 +5,14 @@ from flask_jwt_extended import JWTManager, exceptions
 from werkzeug.exceptions import TooManyRequests
 from flask import jsonify
 from .utils.parse_time import parse_expire_time
+from .utils.password import PasswordHasher, PasswordHasherBusy
+# 导入时注册 tiered+ 限流存储
+from .utils.rate_limit import TIERED_PREFIX
+from .utils.read_replica import RoutingSession
 
 # 在这里实例化所有扩展对象
-db = SQLAlchemy()
+# 会话按语句选择主库或只读副本，未配置副本时与默认会话相同
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 limiter = Limiter(
     key_func=get_remote_address,
@@ -16,6 +21,8 @@ limiter = Limiter(
 
 jwt = JWTManager()
 
+password_hasher = PasswordHasher()
+
 
 def setup_extensions(app):
     """
@@ -30,9 +37,25 @@ def setup_extensions(app):
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = parse_expire_time(expire_str)  # 设置 token 过期时间
     jwt.init_app(app)
     # 初始化限流器
-    # 将 Redis URI 添加到应用配置中，供 Limiter 使用
-    app.config['RATELIMIT_STORAGE_URI'] = app.config['REDIS_URI']
+    # 将 Redis URI 添加到应用配置中，供 Limiter 使用（未单独配置限流存储时）
+    app.config.setdefault('RATELIMIT_STORAGE_URI', app.config['REDIS_URI'])
+    # 限流存储与应用使用同一个 Redis 时共用 app.redis_pool，不再单独建立连接
+    if app.config['RATELIMIT_STORAGE_URI'] == app.config['REDIS_URI'] and getattr(app, 'redis_pool', None) is not None:
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {
+            **app.config.get('RATELIMIT_STORAGE_OPTIONS', {}),
+            'connection_pool': app.redis_pool,
+        }
+    # 两级限流：进程内计数在前，定期批量同步到共享存储，大部分请求不访问 Redis
+    if app.config['RATELIMIT_LOCAL_TIER'] and not app.config['RATELIMIT_STORAGE_URI'].startswith(TIERED_PREFIX):
+        app.config['RATELIMIT_STORAGE_URI'] = TIERED_PREFIX + app.config['RATELIMIT_STORAGE_URI']
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {
+            **app.config.get('RATELIMIT_STORAGE_OPTIONS', {}),
+            'sync_interval': app.config['RATELIMIT_SYNC_INTERVAL'],
+            'sync_batch': app.config['RATELIMIT_SYNC_BATCH'],
+        }
     limiter.init_app(app)
+    # 初始化密码哈希服务
+    password_hasher.init_app(app)
 
     # JWT 错误处理，捕获无效令牌错误，返回 JSON 响应
     @app.errorhandler(exceptions.JWTExtendedException)
@@ -40,6 +63,14 @@ def setup_extensions(app):
         app.logger.error(f"Rate limit exceeded: {error.description}")
         return jsonify({"message": "无效令牌"}), 401
 
+    # 密码哈希工作池过载时返回 503，与程序错误区分开，客户端按 Retry-After 重试
+    @app.errorhandler(PasswordHasherBusy)
+    def handle_password_hasher_busy(error):
+        app.logger.warning(f"Password hasher overloaded: {error}")
+        response = jsonify({"code": -1, "data": None, "message": "服务繁忙，请稍后再试。"})
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, 503
+
     # 为 TooManyRequests 异常注册自定义错误处理函数
     @app.errorhandler(TooManyRequests)
     def handle_rate_limit_exceeded(error):
@@ -1,10 +1,17 @@
 from datetime import datetime, timezone
+from sqlalchemy import event, text, update
+from sqlalchemy.orm import declared_attr, with_loader_criteria
 from .. import db
 
+# 查询时传入 execution_options(include_deleted=True) 可以包含已逻辑删除的行
+INCLUDE_DELETED = 'include_deleted'
+
 
 class BaseModelMixin(object):
     """
     所有数据库模型的基础类，提供了通用的基础字段。
+    已逻辑删除的行默认不出现在任何 ORM 查询中（见 setup_soft_delete_filter），
+    子类的额外索引放在 __indexes__ 中，与基础索引合并为 __table_args__。
     """
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment="主键ID")
 
@@ -21,3 +28,64 @@ class BaseModelMixin(object):
     update_by = db.Column(db.String(46), comment='更新者')
     remark = db.Column(db.String(256), comment='备注')
 
+    # 子类额外的索引或约束
+    __indexes__ = ()
+
+    @declared_attr.directive
+    def __table_args__(cls):
+        tablename = cls.__tablename__
+        return (
+            # 通用列表查询：未删除 + 状态过滤 + 按创建时间排序
+            db.Index(f'ix_{tablename}_is_delete_status_create_time', 'is_delete', 'status', 'create_time'),
+            # 支持部分索引的数据库只索引未删除的行；MySQL 没有部分索引，由上面的组合索引覆盖
+            db.Index(
+                f'ix_{tablename}_live_status_create_time', 'status', 'create_time',
+                sqlite_where=text('is_delete = 0'), postgresql_where=text('is_delete = false')
+            ).ddl_if(dialect=('sqlite', 'postgresql')),
+        ) + tuple(cls.__indexes__)
+
+    def soft_delete(self):
+        """逻辑删除当前对象，随会话提交"""
+        self.is_delete = True
+
+    def restore(self):
+        """恢复逻辑删除的对象，随会话提交"""
+        self.is_delete = False
+
+    @classmethod
+    def soft_delete_by_ids(cls, ids):
+        """一条 UPDATE 批量逻辑删除，返回受影响的行数，需要调用方提交"""
+        return cls._set_deleted(ids, True)
+
+    @classmethod
+    def restore_by_ids(cls, ids):
+        """一条 UPDATE 批量恢复，返回受影响的行数，需要调用方提交"""
+        return cls._set_deleted(ids, False)
+
+    @classmethod
+    def _set_deleted(cls, ids, deleted):
+        ids = list(ids)
+        if not ids:
+            return 0
+        result = db.session.execute(
+            update(cls).where(cls.id.in_(ids), cls.is_delete.is_(not deleted)).values(is_delete=deleted)
+        )
+        return result.rowcount
+
+
+def _filter_soft_deleted(orm_execute_state):
+    """为所有 ORM 查询（包括关联关系的延迟加载）追加 is_delete = False 条件"""
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and not orm_execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(BaseModelMixin, lambda cls: cls.is_delete.is_(False), include_aliases=True)
+        )
+
+
+def setup_soft_delete_filter():
+    """注册全局的逻辑删除过滤，会话事件对所有应用实例只注册一次"""
+    if not event.contains(db.session, 'do_orm_execute', _filter_soft_deleted):
+        event.listen(db.session, 'do_orm_execute', _filter_soft_deleted)
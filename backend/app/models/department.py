@@ -1,10 +1,18 @@
+from sqlalchemy import and_, event, false, func, literal, or_, select, update
+from sqlalchemy.orm.attributes import get_history, set_committed_value
 from .. import db
-from .base import BaseModelMixin
+from .base import INCLUDE_DELETED, BaseModelMixin
+
+# 物化路径分隔符，路径形如 /1/5/12/，根部门深度为 0
+PATH_SEPARATOR = '/'
 
 
 class Department(BaseModelMixin, db.Model):
     """
     部门表模型
+    物化路径在插入、移动和删除时保持一致：
+    - 物理删除部门时，下级部门（包括已逻辑删除的）的 parent_id 被置空，成为新的根部门，整棵子树的路径随之改写；
+    - 逻辑删除要求没有未删除的下级部门，上级部门已删除时不能恢复，违反时抛出 ValueError。
     """
     __tablename__ = 'departments'
 
@@ -14,6 +22,10 @@ class Department(BaseModelMixin, db.Model):
     # 自引用字段，用于构建树状结构
     parent_id = db.Column(db.Integer, db.ForeignKey('departments.id'), comment='上级部门ID')
 
+    # 物化路径索引，随 parent_id 自动维护：子树查询为一次前缀匹配，祖先查询为一次 IN 查询
+    path = db.Column(db.String(255), index=True, comment='物化路径，如 /1/5/12/')
+    depth = db.Column(db.Integer, default=0, nullable=False, comment='层级深度，根部门为 0')
+
     # 定义与 User 模型的关系
     users = db.relationship('User', backref='department', lazy='dynamic')
 
@@ -26,3 +38,214 @@ class Department(BaseModelMixin, db.Model):
 
     def __repr__(self):
         return f'<Department {self.name}>'
+
+    @property
+    def ancestor_ids(self):
+        """从根到上级部门的 ID 列表（不含自身）"""
+        return [int(part) for part in self.path.strip(PATH_SEPARATOR).split(PATH_SEPARATOR)[:-1]]
+
+    def ancestors(self):
+        """所有上级部门，按从根到近的顺序，一次查询"""
+        return Department.query.filter(Department.id.in_(self.ancestor_ids)).order_by(Department.depth)
+
+    def subtree(self, include_self=True):
+        """本部门及所有下级部门，一次路径索引上的范围查询"""
+        query = Department.query.filter(path_prefix(Department.path, self.path))
+        if not include_self:
+            query = query.filter(Department.id != self.id)
+        return query
+
+    @staticmethod
+    def subtree_condition(department_id, column=None):
+        """
+        返回“属于 department_id 子树”的过滤条件，可直接用于其他查询，无需先加载部门对象。
+        先按主键查出根部门路径，条件中的路径前缀是常量，MySQL 和 SQLite 都能走 path 索引；
+        部门不存在或已删除时返回恒假条件。
+        column 默认为 Department.path，关联查询时可传入别名的 path 列。
+        """
+        root_path = db.session.execute(
+            select(Department.path).where(Department.id == department_id)
+        ).scalar_one_or_none()
+        if root_path is None:
+            return false()
+        return path_prefix(column if column is not None else Department.path, root_path)
+
+    @staticmethod
+    def subtree_users(department_id):
+        """本部门及所有下级部门的用户：一次主键查询取根路径，一次用户查询"""
+        from .user import User
+        return User.query.join(Department, User.department_id == Department.id).filter(
+            Department.subtree_condition(department_id)
+        )
+
+    @classmethod
+    def _set_deleted(cls, ids, deleted):
+        """批量逻辑删除或恢复，与单个部门相同的约束：不能留下指向已删除部门的下级部门"""
+        ids = list(ids)
+        connection = db.session.connection()
+        if deleted and ids and _live_children_exist(connection, ids, excluded_ids=ids):
+            raise ValueError("Cannot delete departments while they have child departments")
+        if not deleted and ids and _deleted_parent_exists(connection, ids, excluded_parent_ids=ids):
+            raise ValueError("Cannot restore departments under a deleted parent")
+        return super()._set_deleted(ids, deleted)
+
+    @classmethod
+    def rebuild_paths(cls):
+        """
+        按 parent_id 重建全部物化路径，用于为已有数据补齐路径或修复不一致。
+        返回更新的部门数量。
+        """
+        # 已逻辑删除的部门也参与重建，否则其下级部门找不到上级，路径保持为空
+        rows = db.session.execute(
+            select(cls.id, cls.parent_id).execution_options(**{INCLUDE_DELETED: True})
+        ).all()
+        children = {}
+        for department_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(department_id)
+
+        paths = {}
+        stack = [(department_id, PATH_SEPARATOR, 0) for department_id in children.get(None, [])]
+        while stack:
+            department_id, parent_path, depth = stack.pop()
+            path = f'{parent_path}{department_id}{PATH_SEPARATOR}'
+            paths[department_id] = (path, depth)
+            stack.extend((child_id, path, depth + 1) for child_id in children.get(department_id, []))
+
+        db.session.execute(
+            update(cls),
+            [{'id': department_id, 'path': path, 'depth': depth} for department_id, (path, depth) in paths.items()]
+        )
+        return len(paths)
+
+
+def path_prefix(column, prefix):
+    """
+    path 以 prefix 开头的条件，写成 [prefix, prefix 末尾分隔符加一) 的范围比较：
+    与 LIKE 'prefix%' 等价，但在 SQLite 默认设置下也能使用 path 索引
+    """
+    upper = prefix[:-1] + chr(ord(PATH_SEPARATOR) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def _parent_path(connection, parent_id):
+    """查询上级部门的 (path, depth)，无上级时返回根路径"""
+    if parent_id is None:
+        return PATH_SEPARATOR, -1
+    table = Department.__table__
+    row = connection.execute(
+        select(table.c.path, table.c.depth).where(table.c.id == parent_id)
+    ).first()
+    if row is None or row.path is None:
+        raise ValueError(f"Parent department {parent_id} has no tree path")
+    return row.path, row.depth
+
+
+@event.listens_for(Department, 'after_insert')
+def _set_path_on_insert(mapper, connection, target):
+    """插入后 id 已确定，根据上级部门路径写入自身路径"""
+    parent_path, parent_depth = _parent_path(connection, target.parent_id)
+    path = f'{parent_path}{target.id}{PATH_SEPARATOR}'
+    depth = parent_depth + 1
+
+    table = Department.__table__
+    connection.execute(update(table).where(table.c.id == target.id).values(path=path, depth=depth))
+    set_committed_value(target, 'path', path)
+    set_committed_value(target, 'depth', depth)
+
+
+def _live_children_exist(connection, parent_ids, excluded_ids=()):
+    """是否有未删除的下级部门（不含 excluded_ids 中的部门）"""
+    table = Department.__table__
+    query = select(table.c.id).where(table.c.parent_id.in_(parent_ids), table.c.is_delete.is_(False))
+    if excluded_ids:
+        query = query.where(table.c.id.not_in(excluded_ids))
+    return connection.execute(query.limit(1)).first() is not None
+
+
+def _deleted_parent_exists(connection, ids, excluded_parent_ids=()):
+    """这些部门中是否有上级部门已被逻辑删除或已不存在的（不含 excluded_parent_ids 中的上级部门）"""
+    table = Department.__table__
+    parent = table.alias('parent')
+    query = (
+        select(table.c.id)
+        .outerjoin(parent, parent.c.id == table.c.parent_id)
+        .where(table.c.id.in_(ids), table.c.parent_id.is_not(None),
+               or_(parent.c.id.is_(None), parent.c.is_delete.is_(True)))
+    )
+    if excluded_parent_ids:
+        query = query.where(table.c.parent_id.not_in(excluded_parent_ids))
+    return connection.execute(query.limit(1)).first() is not None
+
+
+@event.listens_for(Department, 'before_update')
+def _check_delete(mapper, connection, target):
+    """
+    逻辑删除前必须先删除或移走下级部门，否则下级部门的路径会指向已删除的部门；
+    同理，上级部门已删除时不能恢复。
+    """
+    if not get_history(target, 'is_delete').has_changes():
+        return
+    if target.is_delete and _live_children_exist(connection, [target.id]):
+        raise ValueError(f"Cannot delete department {target.id} while it has child departments")
+    if not target.is_delete and _deleted_parent_exists(connection, [target.id]):
+        raise ValueError(f"Cannot restore department {target.id} under a deleted parent")
+
+
+@event.listens_for(Department, 'before_delete')
+def _promote_children(mapper, connection, target):
+    """
+    物理删除前把下级部门提升为根部门，并改写整棵子树的路径和深度。
+    直接用 Core 语句处理：ORM 关系加载受逻辑删除过滤影响，已逻辑删除的下级部门不会被置空 parent_id。
+    """
+    if target.path is None:
+        return
+    table = Department.__table__
+    connection.execute(update(table).where(table.c.parent_id == target.id).values(parent_id=None))
+    connection.execute(
+        update(table)
+        .where(path_prefix(table.c.path, target.path), table.c.id != target.id)
+        .values(
+            path=literal(PATH_SEPARATOR) + func.substr(table.c.path, len(target.path) + 1),
+            depth=table.c.depth - (target.depth + 1)
+        )
+    )
+
+
+@event.listens_for(Department, 'before_update')
+def _check_move(mapper, connection, target):
+    """禁止把部门移动到自身或自身的下级部门之下"""
+    if not get_history(target, 'parent_id').has_changes():
+        return
+    if target.parent_id is None or target.path is None:
+        return
+    parent_path, _ = _parent_path(connection, target.parent_id)
+    if parent_path.startswith(target.path):
+        raise ValueError(f"Cannot move department {target.id} under its own subtree")
+
+
+@event.listens_for(Department, 'after_update')
+def _move_subtree(mapper, connection, target):
+    """上级部门变化时，一条 UPDATE 改写整棵子树的路径前缀和深度"""
+    if not get_history(target, 'parent_id').has_changes():
+        return
+    old_path = target.path
+    if old_path is None:
+        return
+
+    parent_path, parent_depth = _parent_path(connection, target.parent_id)
+    new_path = f'{parent_path}{target.id}{PATH_SEPARATOR}'
+    depth_delta = parent_depth + 1 - target.depth
+    if new_path == old_path:
+        return
+
+    table = Department.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.path.startswith(old_path))
+        .values(
+            path=literal(new_path) + func.substr(table.c.path, len(old_path) + 1),
+            depth=table.c.depth + depth_delta
+        )
+    )
+    set_committed_value(target, 'path', new_path)
+    set_committed_value(target, 'depth', target.depth + depth_delta)
@@ -15,5 +15,15 @@ class Menu(BaseModelMixin, db.Model):
     permission_id = db.Column(db.String(128), index=True, comment='权限标识')
     component_path = db.Column(db.String(256), comment='组件路径')
 
+    # 自引用字段，用于构建菜单树
+    parent_id = db.Column(db.Integer, db.ForeignKey('menus.id'), index=True, comment='上级菜单ID')
+
+    # 定义自引用关系，用于获取子菜单
+    children = db.relationship(
+        'Menu',
+        backref=db.backref('parent', remote_side='Menu.id'),
+        lazy='dynamic'
+    )
+
     def __repr__(self):
         return f'<Menu {self.name}>'
@@ -1,5 +1,5 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from .. import db
+from ..extensions import password_hasher
 from .base import BaseModelMixin
 
 # 多对多关联表：用户和角色
@@ -15,6 +15,12 @@ class User(BaseModelMixin, db.Model):
     用户表模型
     """
     __tablename__ = 'users'
+    # 序列化时默认排除的字段
+    __serialize_exclude__ = ('password',)
+    __indexes__ = (
+        # 用户列表按 (create_time, id) 做游标分页
+        db.Index('ix_users_create_time_id', 'create_time', 'id'),
+    )
 
     username = db.Column(db.String(64), unique=False, nullable=False, index=True, comment='用户姓名')
     nickname = db.Column(db.String(64), comment='用户昵称')
@@ -42,7 +48,11 @@ class User(BaseModelMixin, db.Model):
         return f'<User {self.username}>'
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
+
+    def password_needs_rehash(self):
+        """存储的密码哈希与当前配置的算法或成本参数不一致"""
+        return password_hasher.needs_rehash(self.password)
@@ -1,89 +1,80 @@
 import base64
 import uuid
-import io
 import random
 import string
-from PIL import Image, ImageDraw, ImageFont
+from .captcha_render import get_renderer, encode_image
+from .captcha_store import CaptchaStore, RedisCaptchaStore
 
 
 class Captcha:
-    def __init__(self, store, key_prefix='captcha:', expire=60):
+    def __init__(self, store, key_prefix='captcha:', expire=60, pool=None):
         """
         初始化 Captcha 实例。
+        store: CaptchaStore 实例；直接传入 Redis 客户端时自动包装为 RedisCaptchaStore
+        pool: 可选的 CaptchaPool，存在时优先从预渲染池中取图片
         """
         self.width = 120
         self.height = 40
         self.code_length = 4
         self.key_prefix = key_prefix
         self.expire = expire
+        if store is not None and not isinstance(store, CaptchaStore):
+            store = RedisCaptchaStore(store)
         self.store = store
+        self.pool = pool
+        # 同尺寸共享渲染器，字体和字形图集只在进程内构建一次
+        self.renderer = get_renderer(self.width, self.height)
 
     def _generate_random_code(self):
         """生成随机验证码字符串（大写字母 + 数字）"""
         characters = string.ascii_uppercase + string.digits
         return ''.join(random.choices(characters, k=self.code_length))
 
-    def _add_noise(self, draw):
-        """添加噪点和干扰线"""
-        for _ in range(200):
-            x = random.randint(0, self.width)
-            y = random.randint(0, self.height)
-            draw.point((x, y), fill=(random.randint(100, 200),
-                                     random.randint(100, 200),
-                                     random.randint(100, 200)))
-        for _ in range(4):
-            start = (random.randint(0, self.width), random.randint(0, self.height))
-            end = (random.randint(0, self.width), random.randint(0, self.height))
-            draw.line([start, end], fill=(random.randint(100, 200),
-                                          random.randint(100, 200),
-                                          random.randint(100, 200)), width=2)
-
     def _create_captcha_image(self, code):
         """
         根据验证码文本生成 PIL Image 对象
         """
-        image = Image.new("RGB", (self.width, self.height), (255, 255, 255))
-        draw = ImageDraw.Draw(image)
+        return self.renderer.render(code)
 
-        # 计算每个字符的平均宽度
-        font_size = int(self.height * random.uniform(0.8, 0.9))
-        font = ImageFont.load_default().font_variant(size=font_size)  # 通过 font_variant 设置验证码字体大小
+    def render(self, image_formats=('png',)):
+        """
+        生成随机验证码并按给定格式编码，返回 (code, {格式: 图片字节})。
+        同一张图片可以一次编码为多种格式，供预渲染池按需取用。
+        """
+        code = self._generate_random_code()
+        image = self._create_captcha_image(code)
+        return code, {image_format: encode_image(image, image_format) for image_format in image_formats}
 
-        avg_width = self.width // self.code_length
+    def generate_captcha(self, image_format='png'):
+        """生成验证码并写入存储，返回 captcha_id 和指定格式的图片字节"""
+        captcha_id = uuid.uuid4().hex
+        if self.pool is not None:
+            code, image_bytes = self.pool.acquire(image_format)
+        else:
+            code, images = self.render((image_format,))
+            image_bytes = images[image_format]
 
-        for i, char in enumerate(code):
-            x = i * avg_width + random.randint(0, avg_width // 4)
-            y = random.randint(0, self.height - font_size)
-            draw.text((x, y), char, font=font, fill=(0, 0, 0))
+        self.store.setex(f'{self.key_prefix}{captcha_id}', self.expire, code)
 
-        self._add_noise(draw)
-        return image
+        return captcha_id, image_bytes
 
     def generate_captcha_base64(self):
         """生成验证码图片并返回 base64 字符串和 code 和 captcha_id """
-        captcha_id = uuid.uuid4().hex
-        code = self._generate_random_code()
-
-        self.store.setex(f'{self.key_prefix}{captcha_id}', self.expire, code)
-
-        image = self._create_captcha_image(code)
+        captcha_id, png_bytes = self.generate_captcha('png')
 
         # 转换为 base64
-        image_io = io.BytesIO()
-        image.save(image_io, format="PNG")
-        image_io.seek(0)
-        base64_data = base64.b64encode(image_io.read()).decode("utf-8")
+        base64_data = base64.b64encode(png_bytes).decode("utf-8")
 
         return captcha_id, base64_data
 
     def verify_captcha(self, captcha_id, user_code):
-        stored_code = self.store.get(f'{self.key_prefix}{captcha_id}')
+        # 无论校验是否通过，验证码都只能使用一次，防止重放和暴力猜测
+        stored_code = self.store.take(f'{self.key_prefix}{captcha_id}')
 
-        if not stored_code:
+        if not stored_code or not user_code:
             return False
 
-        # Delete the code after one use to prevent replay attacks
-        self.store.delete(f'{self.key_prefix}{captcha_id}')
+        if isinstance(stored_code, bytes):
+            stored_code = stored_code.decode('utf-8')
 
         return stored_code.upper() == user_code.upper()
-
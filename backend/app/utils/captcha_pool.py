@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from flask import Flask
+from .captcha import Captcha
+from .captcha_render import IMAGE_MIME_TYPES, encode_image
+
+
+class CaptchaPool:
+    """
+    验证码预渲染池。
+
+    后台生产线程维护一个有界队列，预先渲染好 (code, {格式: 图片字节})，
+    请求线程只需要弹出一张并写入 Redis，池为空时回退到请求线程内渲染。
+    """
+
+    # 渲染失败后的重试间隔（秒），连续失败时翻倍，不超过上限
+    ERROR_BACKOFF = 0.1
+    ERROR_BACKOFF_MAX = 5.0
+
+    def __init__(self, captcha, size=200, low_watermark=50, image_formats=('png',), logger=None):
+        if size <= 0:
+            raise ValueError("captcha pool size must be a positive number")
+        if not 0 <= low_watermark < size:
+            raise ValueError("captcha pool low watermark must be in [0, size)")
+        unknown = [image_format for image_format in image_formats if image_format not in IMAGE_MIME_TYPES]
+        if unknown:
+            raise ValueError(f"Unsupported captcha image formats: {', '.join(unknown)}")
+
+        self.captcha = captcha
+        self.size = size
+        self.low_watermark = low_watermark
+        # 每张预渲染图片同时编码的格式
+        self.image_formats = tuple(image_formats)
+        self.logger = logger or logging.getLogger(__name__)
+        self._formats_checked = False
+
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+        # 统计信息
+        self._hits = 0
+        self._misses = 0
+        self._produced = 0
+        self._produce_seconds = 0.0
+        self._errors = 0
+        self._consecutive_errors = 0
+
+    def _check_formats(self):
+        """
+        用一张 1x1 图片试编码每种格式，去掉当前 Pillow 无法编码的格式（如缺少 libwebp 时的 webp），
+        这些格式的请求改为在请求线程内渲染；一种都不能编码时抛出 ValueError
+        """
+        from PIL import Image
+        sample = Image.new("RGB", (1, 1), (255, 255, 255))
+        supported = []
+        for image_format in self.image_formats:
+            try:
+                encode_image(sample, image_format)
+                supported.append(image_format)
+            except Exception as e:
+                self.logger.error(f"Captcha pool cannot encode {image_format}, format disabled: {e}")
+        if not supported:
+            raise ValueError(f"None of the captcha pool formats can be encoded: {', '.join(self.image_formats)}")
+        self.image_formats = tuple(supported)
+        self._formats_checked = True
+
+    def start(self):
+        """启动后台生产线程；fork 之后的子进程或线程意外退出后会重新启动"""
+        if not self._formats_checked:
+            self._check_formats()
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # 线程不会跨 fork 存活，子进程中继承下来的队列也一并丢弃
+            self._items.clear()
+            self._stopped = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._produce_loop, name='captcha-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止后台生产线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _produce_loop(self):
+        while True:
+            with self._cond:
+                # 高于低水位时休眠，直到被取走足够多的验证码或被停止
+                while not self._stopped and len(self._items) > self.low_watermark:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                missing = self.size - len(self._items)
+
+            # 渲染在锁外进行，不阻塞请求线程取用
+            for _ in range(missing):
+                started = time.perf_counter()
+                try:
+                    item = self.captcha.render(self.image_formats)
+                except Exception as e:
+                    # 渲染失败不能让线程退出，否则池不再补充，所有请求都退回到请求线程内渲染
+                    with self._cond:
+                        self._errors += 1
+                        backoff = min(self.ERROR_BACKOFF * 2 ** self._consecutive_errors, self.ERROR_BACKOFF_MAX)
+                        self._consecutive_errors += 1
+                        # 连续失败只记录前几次和之后每 100 次，避免刷屏
+                        if self._consecutive_errors <= 3 or self._errors % 100 == 0:
+                            self.logger.error(f"Captcha pool render failed ({self._errors} errors so far): {e}")
+                        # 退避期间只响应停止，取用时的唤醒不会提前重试
+                        deadline = time.monotonic() + backoff
+                        while not self._stopped and time.monotonic() < deadline:
+                            self._cond.wait(deadline - time.monotonic())
+                        if self._stopped:
+                            return
+                    break
+                elapsed = time.perf_counter() - started
+                with self._cond:
+                    if self._stopped:
+                        return
+                    self._consecutive_errors = 0
+                    self._items.append(item)
+                    self._produced += 1
+                    self._produce_seconds += elapsed
+
+    def acquire(self, image_format='png'):
+        """
+        取出一张预渲染的验证码，返回 (code, image_bytes)。
+        池为空或池中不包含该格式时在当前线程内渲染（记为 miss）。
+        """
+        thread = self._thread
+        if self._pid != os.getpid() or (not self._stopped and (thread is None or not thread.is_alive())):
+            self.start()
+
+        if image_format in self.image_formats:
+            with self._cond:
+                if self._items:
+                    code, images = self._items.popleft()
+                    self._hits += 1
+                    if len(self._items) <= self.low_watermark:
+                        self._cond.notify()
+                    return code, images[image_format]
+                self._misses += 1
+                self._cond.notify()
+        else:
+            with self._cond:
+                self._misses += 1
+
+        code, images = self.captcha.render((image_format,))
+        return code, images[image_format]
+
+    def stats(self):
+        """返回预渲染池的统计信息"""
+        with self._cond:
+            total = self._hits + self._misses
+            return {
+                'size': self.size,
+                'low_watermark': self.low_watermark,
+                'image_formats': list(self.image_formats),
+                'available': len(self._items),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'produced': self._produced,
+                'errors': self._errors,
+                # 生产线程每秒可渲染的验证码数量
+                'refill_rate': self._produced / self._produce_seconds if self._produce_seconds else 0.0,
+            }
+
+
+def setup_captcha_pool(app: Flask):
+    """
+    根据配置创建验证码预渲染池，挂载到 app.captcha_pool。
+    生产线程在首次取用时才启动，避免在 fork 之前的主进程中创建线程。
+    """
+    if not app.config.get('CAPTCHA_POOL_ENABLED'):
+        app.captcha_pool = None
+        return None
+
+    pool = CaptchaPool(
+        Captcha(store=None),
+        size=app.config['CAPTCHA_POOL_SIZE'],
+        low_watermark=app.config['CAPTCHA_POOL_LOW_WATERMARK'],
+        image_formats=app.config['CAPTCHA_POOL_FORMATS'],
+        logger=app.logger
+    )
+    app.captcha_pool = pool
+    app.logger.info(
+        f"Captcha pool enabled: size={pool.size}, low_watermark={pool.low_watermark}, "
+        f"formats={','.join(pool.image_formats)}"
+    )
+    return pool
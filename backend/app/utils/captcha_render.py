@@ -0,0 +1,164 @@
+import io
+import random
+from functools import lru_cache
+
+# 噪点与干扰线的颜色范围、数量，两种渲染器保持一致
+NOISE_POINTS = 200
+NOISE_LINES = 4
+NOISE_COLOR_RANGE = (100, 200)
+# AtlasRenderer 的噪点颜色数量，同色噪点一次绘制
+NOISE_COLOR_BUCKETS = 8
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """按字号缓存字体对象，避免每次请求重新加载默认字体"""
+    # Pillow 导入耗时较多，本模块都在首次渲染时才导入，应用启动和 CLI 命令不承担这部分开销
+    from PIL import ImageFont
+    return ImageFont.load_default().font_variant(size=size)
+
+
+# 验证码图片编码格式 -> MIME 类型
+# png8 为调色板压缩的 PNG，体积约为 RGB PNG 的三分之一，任何 PNG 解码器都能识别
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'png8': 'image/png',
+    'webp': 'image/webp',
+}
+# 调色板 PNG 的颜色数量，足以保留黑色字形、白色底色和噪点的区分度
+PALETTE_COLORS = 16
+
+
+def encode_image(image, image_format='png'):
+    """将 PIL Image 编码为指定格式的字节串"""
+    from PIL import Image
+    image_io = io.BytesIO()
+    if image_format == 'png':
+        image.save(image_io, format="PNG")
+    elif image_format == 'png8':
+        image.quantize(PALETTE_COLORS, method=Image.Quantize.FASTOCTREE).save(image_io, format="PNG")
+    elif image_format == 'webp':
+        image.save(image_io, format="WEBP", quality=70)
+    else:
+        raise ValueError(f"Unsupported captcha image format: {image_format}")
+    return image_io.getvalue()
+
+
+def _random_color():
+    low, high = NOISE_COLOR_RANGE
+    return random.randint(low, high), random.randint(low, high), random.randint(low, high)
+
+
+class SimpleRenderer:
+    """
+    逐次渲染：每张图片重新加载字体、逐个绘制字符和噪点。
+    保留用于对比基准测试。
+    """
+
+    def __init__(self, width=120, height=40):
+        self.width = width
+        self.height = height
+
+    def _add_noise(self, draw):
+        """添加噪点和干扰线"""
+        for _ in range(NOISE_POINTS):
+            x = random.randint(0, self.width)
+            y = random.randint(0, self.height)
+            draw.point((x, y), fill=_random_color())
+        for _ in range(NOISE_LINES):
+            start = (random.randint(0, self.width), random.randint(0, self.height))
+            end = (random.randint(0, self.width), random.randint(0, self.height))
+            draw.line([start, end], fill=_random_color(), width=2)
+
+    def render(self, code):
+        """根据验证码文本生成 PIL Image 对象"""
+        from PIL import Image, ImageDraw, ImageFont
+        image = Image.new("RGB", (self.width, self.height), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+
+        # 计算每个字符的平均宽度
+        font_size = int(self.height * random.uniform(0.8, 0.9))
+        font = ImageFont.load_default().font_variant(size=font_size)  # 通过 font_variant 设置验证码字体大小
+
+        avg_width = self.width // len(code)
+
+        for i, char in enumerate(code):
+            x = i * avg_width + random.randint(0, avg_width // 4)
+            y = random.randint(0, self.height - font_size)
+            draw.text((x, y), char, font=font, fill=(0, 0, 0))
+
+        self._add_noise(draw)
+        return image
+
+
+class AtlasRenderer:
+    """
+    高吞吐渲染：
+    - 字体按字号缓存；
+    - 每个 (字号, 字符) 预先光栅化为灰度蒙版（字形图集），渲染时直接 paste；
+    - 噪点分成 NOISE_COLOR_BUCKETS 种颜色，每种颜色的噪点用一次 draw.point 绘制。
+    输出尺寸、字号范围、字符布局和噪点数量与 SimpleRenderer 一致。
+    """
+
+    def __init__(self, width=120, height=40):
+        self.width = width
+        self.height = height
+        # 与 SimpleRenderer 相同的字号范围：int(height * uniform(0.8, 0.9))
+        self.font_sizes = list(range(int(height * 0.8), int(height * 0.9) + 1))
+        # (字号, 字符) -> 灰度蒙版；并发构建同一字形只会重复计算，不影响结果
+        self._atlas = {}
+
+    def _glyph(self, size, char):
+        mask = self._atlas.get((size, char))
+        if mask is None:
+            from PIL import Image, ImageDraw
+            font = get_font(size)
+            # 以 (0, 0) 为原点绘制，paste 到 (x, y) 时与 draw.text((x, y)) 位置一致
+            _, _, right, bottom = font.getbbox(char)
+            mask = Image.new("L", (max(right, 1), max(bottom, 1)), 0)
+            ImageDraw.Draw(mask).text((0, 0), char, font=font, fill=255)
+            self._atlas[(size, char)] = mask
+        return mask
+
+    def warm_up(self, characters):
+        """预先光栅化所有字号下的字符，避免首个请求承担构建开销"""
+        for size in self.font_sizes:
+            for char in characters:
+                self._glyph(size, char)
+
+    def _background(self):
+        """白色底图 + 噪点，每种颜色一次 draw.point"""
+        from PIL import Image, ImageDraw
+        image = Image.new("RGB", (self.width, self.height), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        points = list(zip(random.choices(range(self.width), k=NOISE_POINTS),
+                          random.choices(range(self.height), k=NOISE_POINTS)))
+        for bucket in range(NOISE_COLOR_BUCKETS):
+            draw.point(points[bucket::NOISE_COLOR_BUCKETS], fill=_random_color())
+        return image
+
+    def render(self, code):
+        """根据验证码文本生成 PIL Image 对象"""
+        image = self._background()
+
+        font_size = int(self.height * random.uniform(0.8, 0.9))
+        avg_width = self.width // len(code)
+
+        for i, char in enumerate(code):
+            x = i * avg_width + random.randint(0, avg_width // 4)
+            y = random.randint(0, self.height - font_size)
+            image.paste((0, 0, 0), (x, y), self._glyph(font_size, char))
+
+        from PIL import ImageDraw
+        draw = ImageDraw.Draw(image)
+        for _ in range(NOISE_LINES):
+            start = (random.randint(0, self.width), random.randint(0, self.height))
+            end = (random.randint(0, self.width), random.randint(0, self.height))
+            draw.line([start, end], fill=_random_color(), width=2)
+        return image
+
+
+@lru_cache(maxsize=None)
+def get_renderer(width, height):
+    """同一尺寸在进程内共享一个 AtlasRenderer，图集只构建一次"""
+    return AtlasRenderer(width, height)
@@ -0,0 +1,139 @@
+import heapq
+from abc import ABC, abstractmethod
+import threading
+import time
+from flask import Flask
+from redis.exceptions import ResponseError
+
+# 不支持 GETDEL 的旧版 Redis 使用的原子读取并删除脚本
+_GETDEL_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('DEL', KEYS[1])
+end
+return value
+"""
+
+
+class CaptchaStore(ABC):
+    """
+    验证码存储接口：写入带过期时间的值，以及原子地读取并删除。
+    子类必须实现全部方法，否则实例化时抛出 TypeError。
+    """
+
+    @abstractmethod
+    def setex(self, key, expire, value):
+        """写入 key，expire 秒后过期"""
+
+    @abstractmethod
+    def take(self, key):
+        """读取并删除 key，不存在或已过期时返回 None；并发调用时只有一个调用方能取到值"""
+
+
+class RedisCaptchaStore(CaptchaStore):
+    """
+    基于 Redis 的验证码存储，多进程、多节点共享。
+    """
+    # 首次遇到不支持 GETDEL 的 Redis 后，进程内后续请求直接使用 Lua 脚本
+    _getdel_supported = True
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    def setex(self, key, expire, value):
+        return self.redis_client.setex(key, expire, value)
+
+    def take(self, key):
+        """
+        一次往返完成读取和删除。
+        Redis >= 6.2 使用 GETDEL，旧版本回退到等价的 Lua 脚本。
+        """
+        if RedisCaptchaStore._getdel_supported:
+            try:
+                return self.redis_client.getdel(key)
+            except ResponseError as e:
+                if 'unknown command' not in str(e).lower():
+                    raise
+                RedisCaptchaStore._getdel_supported = False
+        return self.redis_client.eval(_GETDEL_SCRIPT, 1, key)
+
+
+class MemoryCaptchaStore(CaptchaStore):
+    """
+    进程内的 TTL 存储，线程安全、容量有界，省去每个验证码的网络往返。
+    只适用于单进程部署：验证码必须由签发它的进程校验。
+
+    过期时间记录在最小堆中，写入时先清理已过期的 key；
+    仍然超出容量时，淘汰最早过期的 key。
+    """
+
+    def __init__(self, max_size=10000, clock=time.monotonic):
+        if max_size <= 0:
+            raise ValueError("max_size must be a positive number")
+        self.max_size = max_size
+        self._clock = clock
+        self._data = {}  # key -> (value, expire_at)
+        self._heap = []  # (expire_at, key)，key 被覆盖或删除后旧记录惰性丢弃
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def _evict(self, now):
+        """清理过期 key；容量已满时淘汰最早过期的 key。调用方需持有锁"""
+        heap, data = self._heap, self._data
+        while heap:
+            expire_at, key = heap[0]
+            entry = data.get(key)
+            if entry is None or entry[1] != expire_at:
+                # 已被删除或覆盖的旧记录
+                heapq.heappop(heap)
+            elif expire_at <= now or len(data) >= self.max_size:
+                heapq.heappop(heap)
+                del data[key]
+            else:
+                break
+
+        # 旧记录过多时重建堆，避免频繁覆盖同一个 key 导致堆无限增长
+        if len(heap) > 2 * len(data) + 64:
+            self._heap = [(expire_at, key) for key, (_, expire_at) in data.items()]
+            heapq.heapify(self._heap)
+
+    def setex(self, key, expire, value):
+        if not isinstance(expire, (int, float)) or expire <= 0:
+            raise ValueError("expire time must be a positive number")
+        with self._lock:
+            now = self._clock()
+            self._data.pop(key, None)
+            self._evict(now)
+            expire_at = now + expire
+            self._data[key] = (value, expire_at)
+            heapq.heappush(self._heap, (expire_at, key))
+        return True
+
+    def take(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return None
+            value, expire_at = entry
+            return value if expire_at > self._clock() else None
+
+
+def setup_captcha_store(app: Flask):
+    """
+    根据 CAPTCHA_STORE 配置创建验证码存储，挂载到 app.captcha_store。
+    redis：使用 app.redis_client；memory：进程内 TTL 存储。
+    """
+    backend = app.config.get('CAPTCHA_STORE', 'redis')
+    if backend == 'redis':
+        store = RedisCaptchaStore(app.redis_client)
+    elif backend == 'memory':
+        store = MemoryCaptchaStore(max_size=app.config['CAPTCHA_STORE_MAX_SIZE'])
+    else:
+        raise ValueError(f"Invalid CAPTCHA_STORE: {backend}. Must be 'redis' or 'memory'.")
+
+    app.captcha_store = store
+    app.logger.info(f"Captcha store: {backend}")
+    return store
@@ -0,0 +1,76 @@
+from flask import Flask
+from sqlalchemy import event
+from ..extensions import db
+
+
+def sqlite_pragmas(config, in_memory=False):
+    """
+    每个新 SQLite 连接上执行的 PRAGMA，按执行顺序返回 [(名称, 值), ...]。
+    内存数据库不支持 WAL，也没有可映射的文件，只设置其余项。
+    """
+    pragmas = [
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+    ]
+    if not in_memory:
+        pragmas.insert(0, ('journal_mode', config['SQLITE_JOURNAL_MODE']))
+        pragmas.append(('mmap_size', config['SQLITE_MMAP_SIZE']))
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """在 DBAPI 连接上执行 PRAGMA，返回 journal_mode 实际生效的值（未设置时为 None）"""
+    cursor = dbapi_connection.cursor()
+    try:
+        journal_mode = None
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+            if name == 'journal_mode':
+                # 文件系统不支持时 SQLite 会保留原模式，返回值才是实际生效的模式
+                journal_mode = cursor.fetchone()[0]
+        return journal_mode
+    finally:
+        cursor.close()
+
+
+def _is_memory_database(url):
+    return url.database in (None, '', ':memory:') or 'mode=memory' in str(url)
+
+
+def configure_engine(app: Flask, engine):
+    """为引擎注册连接参数（SQLite PRAGMA），返回用于日志输出的生效配置"""
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    settings = {key: value for key, value in options.items() if key != 'connect_args'}
+    settings['pool'] = type(engine.pool).__name__
+    # connect_args 中不含密码，但只输出超时相关的项
+    settings.update({key: value for key, value in options.get('connect_args', {}).items() if key.endswith('timeout')})
+
+    if engine.dialect.name == 'sqlite':
+        pragmas = sqlite_pragmas(app.config, in_memory=_is_memory_database(engine.url))
+        expected_mode = dict(pragmas).get('journal_mode')
+        warned = []
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            journal_mode = apply_sqlite_pragmas(dbapi_connection, pragmas)
+            if journal_mode is not None and journal_mode.lower() != expected_mode.lower() and not warned:
+                warned.append(journal_mode)
+                app.logger.warning(f"SQLite journal_mode={expected_mode} not applied, using {journal_mode}")
+
+        settings.update(pragmas)
+    return settings
+
+
+def describe_engine(engine, settings):
+    return f"{engine.url.render_as_string(hide_password=True)} " + ', '.join(
+        f'{key}={value}' for key, value in settings.items()
+    )
+
+
+def setup_engine(app: Flask):
+    """为 SQLite 连接注册 PRAGMA，并输出实际生效的引擎配置"""
+    with app.app_context():
+        engine = db.engine
+    app.logger.info(f"Database engine: {describe_engine(engine, configure_engine(app, engine))}")
+    return engine
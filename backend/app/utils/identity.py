@@ -0,0 +1,185 @@
+import json
+from flask import Flask, current_app, g, has_app_context
+from redis.exceptions import RedisError
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.dml import UpdateBase
+from ..extensions import db, jwt
+from ..models.department import Department
+from ..models.role import Role
+from ..models.user import User, user_role_association
+from .redis_client import deferred
+from .serializer import serializer_for
+
+# 用户信息的公开字段
+user_fields = serializer_for(User, fields=(
+    'id', 'username', 'nickname', 'email', 'phone_number', 'gender', 'status', 'is_admin', 'create_time'
+))
+department_fields = serializer_for(Department, fields=('id', 'name'))
+role_fields = serializer_for(Role, fields=('id', 'role_code', 'name'))
+
+# 这些表的任意变化都可能影响多个用户的身份信息，直接让全部缓存失效
+SHARED_TABLES = (Role.__table__, Department.__table__, user_role_association)
+
+
+def serialize_user(user):
+    """用户信息及所属部门、角色，roles 和 department 需要提前批量加载"""
+    data = user_fields(user)
+    data['department'] = department_fields(user.department) if user.department else None
+    data['roles'] = role_fields.many(user.roles)
+    return data
+
+
+def identity_claims(user, permission_version):
+    """
+    登录时写入令牌的附加声明：角色编码、部门 ID 和签发时的权限版本号。
+    其他服务可以直接从令牌读取角色和部门，pv 与当前权限版本号不同说明签发后权限有过变化。
+    """
+    return {
+        'roles': sorted(role.role_code for role in user.roles),
+        'dept': user.department_id,
+        'pv': permission_version,
+    }
+
+
+def load_identity(user_id):
+    """从数据库加载用户身份信息，用户不存在、已删除或已禁用时返回 None"""
+    user = db.session.execute(
+        select(User)
+        .options(joinedload(User.department), selectinload(User.roles))
+        .where(User.id == user_id, User.status == 1)
+    ).scalar_one_or_none()
+    return None if user is None else serialize_user(user)
+
+
+class IdentityCache:
+    """
+    当前用户身份信息缓存，内容与 serialize_user 相同。
+
+    - Redis 中按用户缓存 {prefix}user:<id>，过期时间 ttl 秒；
+    - 每个用户有自己的版本号 {prefix}user:<id>:v，另有全局版本号 {prefix}version，
+      与缓存条目用一次 MGET 同时读出，条目中记录的两个版本号都与当前一致才算命中；
+    - 用户自身变化时递增该用户的版本号；角色、部门或用户角色关联变化时递增全局版本号；
+      回填使用查库前读到的版本号，与同时发生的失效交错时写入的条目会立即失效，不会让已禁用的用户继续通过；
+    - Redis 不可用时直接查库。
+    """
+
+    def __init__(self, redis_client, key_prefix='identity:', ttl=60, version_ttl=86400):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        # 用户版本号的保留时间，需要远大于一次请求的耗时
+        self.version_ttl = version_ttl
+
+    @property
+    def version_key(self):
+        return f'{self.key_prefix}version'
+
+    def _user_key(self, user_id):
+        return f'{self.key_prefix}user:{user_id}'
+
+    def _user_version_key(self, user_id):
+        return f'{self.key_prefix}user:{user_id}:v'
+
+    def get(self, user_id):
+        """返回用户身份信息：Redis -> 数据库，用户不可用时返回 None"""
+        try:
+            cached, version, user_version = self.redis_client.mget(
+                [self._user_key(user_id), self.version_key, self._user_version_key(user_id)]
+            )
+            versions = [int(version or 0), int(user_version or 0)]
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to read identity from Redis: {e}")
+            cached, versions = None, None
+        if cached:
+            payload = json.loads(cached)
+            if payload['v'] == versions:
+                return payload['u']
+
+        identity = load_identity(user_id)
+        if identity is None:
+            return None
+        # 经过一次 JSON 编码，命中与未命中时返回的值类型一致（datetime 等已编码为字符串）
+        raw = current_app.json.dumps({'v': versions, 'u': identity})
+        if versions is not None:
+            try:
+                deferred(self.redis_client).set(self._user_key(user_id), raw, ex=self.ttl)
+            except RedisError as e:
+                current_app.logger.warning(f"Failed to cache identity in Redis: {e}")
+        return json.loads(raw)['u']
+
+    def invalidate(self, user_ids=(), everyone=False):
+        """递增指定用户的版本号；everyone 为 True 时递增全局版本号，使全部缓存失效"""
+        if not user_ids and not everyone:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for user_id in sorted(user_ids):
+                pipe.incr(self._user_version_key(user_id))
+                pipe.expire(self._user_version_key(user_id), self.version_ttl)
+            if user_ids:
+                pipe.delete(*(self._user_key(user_id) for user_id in sorted(user_ids)))
+            if everyone:
+                pipe.incr(self.version_key)
+            pipe.execute()
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to invalidate identity cache: {e}")
+
+
+def _lookup_user(jwt_header, jwt_data):
+    # 同一请求中多次校验令牌（如 jwt_required 和 require_permission）只加载一次
+    user_id = int(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+    identities = g.setdefault('identities', {})
+    if user_id not in identities:
+        identities[user_id] = current_app.identity_cache.get(user_id)
+    return identities[user_id]
+
+
+def _clear_identities(exc=None):
+    # 应用上下文跨越多个请求时（如测试中），不把上一个请求的结果带到下一个请求
+    g.pop('identities', None)
+
+
+def _before_flush(session, flush_context, instances):
+    changed_users = session.info.setdefault('identity_users', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, (Role, Department)):
+            session.info['identity_everyone'] = True
+        elif isinstance(obj, User) and obj.id is not None and (obj in session.deleted or session.is_modified(obj)):
+            changed_users.add(obj.id)
+
+
+def _do_orm_execute(orm_execute_state):
+    # 批量 update/delete（如批量逻辑删除）不经过 flush，无法确定涉及的用户
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase) and (statement.table in SHARED_TABLES or statement.table is User.__table__):
+        orm_execute_state.session.info['identity_everyone'] = True
+
+
+def _after_commit(session):
+    user_ids = session.info.pop('identity_users', None)
+    everyone = session.info.pop('identity_everyone', False)
+    if (user_ids or everyone) and has_app_context():
+        cache = getattr(current_app, 'identity_cache', None)
+        if cache is not None:
+            cache.invalidate(user_ids or (), everyone)
+
+
+def _after_rollback(session):
+    session.info.pop('identity_users', None)
+    session.info.pop('identity_everyone', None)
+
+
+def setup_identity_cache(app: Flask):
+    """创建身份信息缓存，注册 user_lookup_loader 和失效事件，挂载到 app.identity_cache"""
+    app.identity_cache = IdentityCache(app.redis_client, ttl=app.config['IDENTITY_CACHE_TTL'])
+    jwt.user_lookup_loader(_lookup_user)
+    app.teardown_request(_clear_identities)
+
+    # 会话事件注册在 db.session 上，对所有应用实例只注册一次
+    for name, listener in (('before_flush', _before_flush), ('do_orm_execute', _do_orm_execute),
+                           ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+    return app.identity_cache
@@ -0,0 +1,79 @@
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+from enum import Enum
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+
+def _default(obj):
+    """标准库和 orjson 都无法直接编码的类型"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    应用的 JSON provider：安装了 orjson 时使用 orjson，否则使用标准库 json。
+
+    - datetime/date/time 编码为 ISO 8601 字符串，Enum 编码为其 value，两种实现结果一致；
+    - 输出紧凑且不转义非 ASCII 字符；
+    - orjson 直接生成字节，响应时不再经过 str 编码。
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+    compact = True
+
+    @property
+    def backend(self):
+        return 'orjson' if orjson is not None else 'json'
+
+    def dumpb(self, obj, **kwargs):
+        """序列化为 UTF-8 字节"""
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return self.dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumpb(obj), mimetype=self.mimetype)
+
+
+def setup_json(app: Flask):
+    """替换应用的 JSON provider，jsonify、request.get_json 等都会使用它"""
+    app.json = FastJSONProvider(app)
+    app.logger.info(f"JSON provider: {app.json.backend}")
+    return app.json
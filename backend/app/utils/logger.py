@@ -1,53 +1,149 @@
+import atexit
+import gzip
+import json
 import logging
-from logging.handlers import RotatingFileHandler
 import os
+import queue
+import shutil
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from flask import Flask
 
+# 每个日志器当前的后台监听器，重复初始化（如测试中多次 create_app）时先停止旧的
+_listeners = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于日志采集系统解析"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    写入有界队列的 QueueHandler，队列满时按策略处理：
+    - drop：丢弃这条日志并计数，请求线程从不等待；
+    - block：等待队列有空位，不丢日志，但日志线程跟不上时会拖慢请求。
+    """
+
+    def __init__(self, log_queue, policy='drop'):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Invalid log queue policy: {policy}. Must be 'drop' or 'block'.")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _gzip_rotator(source, dest):
+    """轮转时压缩旧日志文件，在后台日志线程中执行"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _rotating_handler(path, formatter, level, compress):
+    handler = RotatingFileHandler(path, maxBytes=10_000_000, backupCount=5, encoding='utf-8')
+    # backupCount 指定日志文件轮转时保留的备份文件数量，app.log.1 到 app.log.5
+    # 如果超过 backupCount，最早的备份文件（app.log.5）会被删除
+    if compress:
+        handler.namer = lambda name: f'{name}.gz'
+        handler.rotator = _gzip_rotator
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+    return handler
+
+
+def shutdown_logger(app: Flask):
+    """停止后台日志线程，队列中剩余的日志全部写出后返回"""
+    listener = _listeners.pop(app.logger.name, None)
+    if listener is not None:
+        for handler in list(app.logger.handlers):
+            if isinstance(handler, BoundedQueueHandler):
+                app.logger.removeHandler(handler)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+    app.log_listener = None
+
 
 def setup_logger(app: Flask):
     log_level = logging.DEBUG if app.config.get('FLASK_ENV') == 'development' else logging.INFO
 
     # 创建日志文件
-    log_dir = os.path.join(os.path.dirname(__file__), '../../logs')
+    log_dir = app.config.get('LOG_DIR') or os.path.join(os.path.dirname(__file__), '../../logs')
     os.makedirs(log_dir, exist_ok=True)
 
     # 配置文件格式
-    formatter = logging.Formatter(
-        '{asctime} {filename} {levelname}: {message} [in {pathname}:{lineno}]',
-        style='{'
-    )
+    if app.config.get('LOG_FORMAT') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '{asctime} {filename} {levelname}: {message} [in {pathname}:{lineno}]',
+            style='{'
+        )
     # 修改 Flask 在 DEBUG 模式默认日志输出格式
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(log_level)
-
-    app.logger.handlers.clear()
-    app.logger.addHandler(console_handler)
+    handlers = [console_handler]
 
     # 服务器环境记录日志文件
     if app.config.get('FLASK_ENV') != 'development':
-        file_handler = RotatingFileHandler(
-            os.path.join(log_dir, 'app.log'),
-            maxBytes=10_000_000,
-            backupCount=5
-        )
-        # backupCount 指定日志文件轮转时保留的备份文件数量，app.log.1 到 app.log.5
-        # 如果超过 backupCount，最早的备份文件（app.log.5）会被删除
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(log_level)
-        app.logger.addHandler(file_handler)
-
-        error_handler = RotatingFileHandler(
-            os.path.join(log_dir, 'error.log'),
-            maxBytes=10_000_000,
-            backupCount=5
-        )
-        error_handler.setFormatter(formatter)
-        error_handler.setLevel(log_level)
-        app.logger.addHandler(error_handler)
+        # 压缩在触发轮转的线程中执行，只有日志走后台线程时才压缩，否则会落在请求线程上
+        compress = app.config.get('LOG_COMPRESS', True) and app.config.get('LOG_QUEUE_ENABLED', False)
+        handlers.append(_rotating_handler(os.path.join(log_dir, 'app.log'), formatter, log_level, compress))
+        handlers.append(_rotating_handler(os.path.join(log_dir, 'error.log'), formatter, log_level, compress))
+
+    shutdown_logger(app)
+    app.logger.handlers.clear()
+
+    if app.config.get('LOG_QUEUE_ENABLED'):
+        # 请求线程只把日志放入队列，格式化后的输出、文件写入、轮转和压缩都在后台线程中完成
+        log_queue = queue.Queue(maxsize=app.config.get('LOG_QUEUE_SIZE', 10000))
+        queue_handler = BoundedQueueHandler(log_queue, app.config.get('LOG_QUEUE_POLICY', 'drop'))
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners[app.logger.name] = listener
+        app.log_listener = listener
+        app.logger.addHandler(queue_handler)
+    else:
+        app.log_listener = None
+        for handler in handlers:
+            app.logger.addHandler(handler)
 
     app.logger.setLevel(log_level)
     # 获取 SQLAlchemy 引擎的日志器（sqlalchemy.engine），并将其日志级别设置为 WARNING，默认是 DEBUG 级别
     logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
     return app.logger
+
+
+@atexit.register
+def _stop_listeners():
+    """进程退出前写出队列中剩余的日志"""
+    for listener in list(_listeners.values()):
+        listener.stop()
+    _listeners.clear()
@@ -0,0 +1,109 @@
+import math
+from flask import Flask
+from .redis_client import deferred
+
+
+class LoginGuard:
+    """
+    按账号统计登录失败次数，超过阈值后按指数退避锁定账号。
+
+    锁定检查在查询数据库和计算密码哈希之前进行，被拒绝的请求只花费一次 Redis 调用。
+    Redis 中的数据（运维可直接读取）：
+    - {prefix}fail:<username>：窗口期内的连续失败次数，过期时间为 window；
+    - {prefix}lock:<username>：锁定标记，过期时间即剩余锁定时长；
+    - {prefix}stats：全局计数（failures 失败次数、lockouts 锁定次数、rejected 锁定期间被拒绝次数）。
+    """
+
+    def __init__(self, redis_client, threshold=5, window=900, lockout_base=30, lockout_max=3600,
+                 key_prefix='login:'):
+        self.redis_client = redis_client
+        self.threshold = threshold
+        self.window = window
+        self.lockout_base = lockout_base
+        self.lockout_max = lockout_max
+        self.key_prefix = key_prefix
+
+    def _fail_key(self, username):
+        return f'{self.key_prefix}fail:{username}'
+
+    def _lock_key(self, username):
+        return f'{self.key_prefix}lock:{username}'
+
+    @property
+    def stats_key(self):
+        return f'{self.key_prefix}stats'
+
+    def lockout_seconds(self, failures):
+        """第 failures 次失败后的锁定时长，达到阈值后每多失败一次翻倍，不超过 lockout_max"""
+        if failures < self.threshold:
+            return 0
+        return min(self.lockout_base * 2 ** (failures - self.threshold), self.lockout_max)
+
+    def locked_for(self, username):
+        """
+        返回账号剩余的锁定秒数，未锁定返回 0。只需要一次 PTTL 调用。
+        """
+        remaining_ms = self.redis_client.pttl(self._lock_key(username))
+        if remaining_ms is None or remaining_ms < 0:
+            return 0
+        return max(1, math.ceil(remaining_ms / 1000))
+
+    def record_rejected(self):
+        """记录一次锁定期间被拒绝的登录，请求内在请求结束时写入"""
+        deferred(self.redis_client).hincrby(self.stats_key, 'rejected', 1)
+
+    def record_failure(self, username):
+        """
+        记录一次失败，返回触发的锁定秒数（未触发为 0）。
+        """
+        fail_key = self._fail_key(username)
+        pipe = self.redis_client.pipeline()
+        pipe.incr(fail_key)
+        pipe.expire(fail_key, self.window)
+        pipe.hincrby(self.stats_key, 'failures', 1)
+        failures = int(pipe.execute()[0])
+
+        seconds = self.lockout_seconds(failures)
+        if seconds:
+            pipe = self.redis_client.pipeline()
+            pipe.set(self._lock_key(username), failures, ex=seconds)
+            # 失败计数至少保留到锁定结束，下一次失败会继续翻倍
+            pipe.expire(fail_key, max(self.window, seconds))
+            pipe.hincrby(self.stats_key, 'lockouts', 1)
+            pipe.execute()
+        return seconds
+
+    def record_success(self, username):
+        """登录成功后清空该账号的失败计数，请求内在请求结束时写入"""
+        deferred(self.redis_client).delete(self._fail_key(username), self._lock_key(username))
+
+    def stats(self, username=None):
+        """返回全局计数；指定 username 时附带该账号的失败次数和剩余锁定秒数"""
+        raw = self.redis_client.hgetall(self.stats_key)
+        result = {
+            (key.decode('utf-8') if isinstance(key, bytes) else key): int(value)
+            for key, value in raw.items()
+        }
+        for field in ('failures', 'lockouts', 'rejected'):
+            result.setdefault(field, 0)
+        if username is not None:
+            failures = self.redis_client.get(self._fail_key(username))
+            result['account'] = {
+                'username': username,
+                'failures': int(failures) if failures else 0,
+                'locked_for': self.locked_for(username),
+            }
+        return result
+
+
+def setup_login_guard(app: Flask):
+    """根据配置创建登录失败保护，挂载到 app.login_guard"""
+    guard = LoginGuard(
+        app.redis_client,
+        threshold=app.config['LOGIN_FAIL_THRESHOLD'],
+        window=app.config['LOGIN_FAIL_WINDOW'],
+        lockout_base=app.config['LOGIN_LOCKOUT_BASE'],
+        lockout_max=app.config['LOGIN_LOCKOUT_MAX']
+    )
+    app.login_guard = guard
+    return guard
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from flask import Flask, current_app
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from ..extensions import db
+from ..models.menu import Menu
+from ..models.role import Role, role_menu_association
+from ..models.user import User, user_role_association
+from .redis_client import deferred
+from .response import ApiResponse
+
+# 管理员的角色集合标识，可见全部启用的菜单
+ADMIN_ROLE_KEY = 'admin'
+
+
+def user_role_key(user_id):
+    """
+    一次查询得到用户的角色集合标识：管理员为 'admin'，其他用户为排序后的启用角色 ID，如 '1,3'。
+    用户不存在、已禁用或已删除时返回 None。
+    """
+    active_role = (Role.id == user_role_association.c.role_id) & (Role.status == 1) & (Role.is_delete.is_(False))
+    rows = db.session.execute(
+        select(User.is_admin, Role.id)
+        .select_from(User)
+        .outerjoin(user_role_association, user_role_association.c.user_id == User.id)
+        .outerjoin(Role, active_role)
+        .where(User.id == user_id, User.status == 1, User.is_delete.is_(False))
+    ).all()
+    if not rows:
+        return None
+    if rows[0].is_admin:
+        return ADMIN_ROLE_KEY
+    return ','.join(str(role_id) for role_id in sorted({row.id for row in rows if row.id is not None}))
+
+
+def build_menu_tree(role_key):
+    """
+    一次查询取出角色集合可见的启用菜单，再在内存中按 parent_id 组装成树。
+    同级菜单按 sort_order（空值排最后）、id 排序；上级菜单不可见的菜单提升为顶级菜单。
+    """
+    query = select(
+        Menu.id, Menu.parent_id, Menu.name, Menu.icon, Menu.sort_order, Menu.permission_id, Menu.component_path
+    ).where(Menu.status == 1, Menu.is_delete.is_(False))
+    if role_key != ADMIN_ROLE_KEY:
+        role_ids = [int(role_id) for role_id in role_key.split(',') if role_id]
+        if not role_ids:
+            return []
+        query = query.where(Menu.id.in_(
+            select(role_menu_association.c.menu_id).where(role_menu_association.c.role_id.in_(role_ids))
+        ))
+    rows = db.session.execute(query.order_by(Menu.sort_order.is_(None), Menu.sort_order, Menu.id)).all()
+
+    nodes = {
+        row.id: {
+            'id': row.id,
+            'name': row.name,
+            'icon': row.icon,
+            'sort_order': row.sort_order,
+            'permission': row.permission_id,
+            'component_path': row.component_path,
+            'children': [],
+        }
+        for row in rows
+    }
+    tree = []
+    for row in rows:
+        parent = nodes.get(row.parent_id)
+        (parent['children'] if parent is not None else tree).append(nodes[row.id])
+    return tree
+
+
+class MenuTreeCache:
+    """
+    按角色集合缓存序列化后的菜单树响应。
+
+    - 角色相同的用户共享同一份缓存，缓存值为完整的响应体字节和对应的 ETag；
+    - 进程内 LRU 缓存 role_key -> (version, body, etag)，Redis 中按 {prefix}tree:<version>:<role_key> 多进程共享；
+    - 版本号取自权限缓存，角色、菜单或关联关系变化时一起失效；
+    - 用户到角色集合的映射同样按版本号缓存在进程内，命中时整个请求不访问数据库。
+    """
+
+    def __init__(self, redis_client, permission_cache, key_prefix='menu:', ttl=3600, local_size=10000):
+        self.redis_client = redis_client
+        self.permission_cache = permission_cache
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.local_size = local_size
+        self._trees = OrderedDict()
+        self._role_keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tree_key(self, version, role_key):
+        return f'{self.key_prefix}tree:{version}:{role_key or "-"}'
+
+    def _get_local(self, cache, key, version):
+        with self._lock:
+            entry = cache.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            cache.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, cache, key, version, value):
+        with self._lock:
+            cache[key] = (version, value)
+            cache.move_to_end(key)
+            while len(cache) > self.local_size:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def serialize(tree):
+        """序列化为统一响应格式的 JSON 字节，并计算 ETag"""
+        data, _ = ApiResponse.success(tree)
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def role_key_for_user(self, user_id, version=None):
+        if version is None:
+            version = self.permission_cache.current_version()
+        role_key = self._get_local(self._role_keys, user_id, version)
+        if role_key is None:
+            role_key = user_role_key(user_id)
+            if role_key is not None:
+                self._set_local(self._role_keys, user_id, version, role_key)
+        return role_key
+
+    def get(self, role_key, version=None):
+        """返回角色集合对应的 (body, etag)：进程内缓存 -> Redis -> 数据库"""
+        if version is None:
+            version = self.permission_cache.current_version()
+        entry = self._get_local(self._trees, role_key, version)
+        if entry is not None:
+            return entry
+
+        key = self._tree_key(version, role_key)
+        try:
+            body = self.redis_client.get(key)
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to read menu tree from Redis: {e}")
+            body = None
+
+        if body:
+            entry = body, hashlib.blake2b(body, digest_size=16).hexdigest()
+        else:
+            entry = self.serialize(build_menu_tree(role_key))
+            try:
+                deferred(self.redis_client).setex(key, self.ttl, entry[0])
+            except RedisError as e:
+                current_app.logger.warning(f"Failed to cache menu tree in Redis: {e}")
+
+        self._set_local(self._trees, role_key, version, entry)
+        return entry
+
+    def get_for_user(self, user_id):
+        """返回用户菜单树的 (body, etag)，用户不可用时返回 None"""
+        version = self.permission_cache.current_version()
+        role_key = self.role_key_for_user(user_id, version)
+        if role_key is None:
+            return None
+        return self.get(role_key, version)
+
+
+def setup_menu_tree(app: Flask):
+    """创建菜单树缓存，挂载到 app.menu_tree_cache"""
+    app.menu_tree_cache = MenuTreeCache(
+        app.redis_client,
+        app.permission_cache,
+        ttl=app.config['MENU_TREE_CACHE_TTL'],
+        local_size=app.config['MENU_TREE_LOCAL_CACHE_SIZE']
+    )
+    return app.menu_tree_cache
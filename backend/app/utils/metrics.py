@@ -0,0 +1,266 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from flask import Flask, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 请求耗时直方图的分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 未配置 METRICS_TOKEN 时只在这些环境中开放 /api/metrics
+OPEN_METRICS_ENVS = ('development', 'testing')
+
+# 当前请求的 SQL/Redis 统计，请求开始时设置，结束时汇总到 app.metrics
+_request_stats = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """单个请求内的 SQL 和 Redis 调用次数与耗时"""
+    __slots__ = ('started', 'sql_count', 'sql_time', 'redis_count', 'redis_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.redis_count = 0
+        self.redis_time = 0.0
+
+
+class Histogram:
+    """累计分桶直方图，按 Prometheus 的 le（小于等于）语义计数"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Metrics:
+    """
+    进程内指标汇总，输出 Prometheus 文本格式。
+
+    - 请求结束时按 (endpoint, method, status) 记录耗时直方图，按 endpoint 累加 SQL/Redis 的次数和耗时；
+    - 每个请求只在结束时加一次锁，SQL 和 Redis 的计时累加在请求自己的 RequestStats 上，不加锁；
+    - 其他模块可以用 add_collector 注册额外的指标（如限流同步延迟、日志丢弃数）。
+    多进程部署时每个进程各自输出，由 Prometheus 按实例汇总。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._requests = {}
+        self._sql = {}
+        self._redis = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe_request(self, endpoint, method, status, stats):
+        duration = time.perf_counter() - stats.started
+        with self._lock:
+            histogram = self._requests.get((endpoint, method, status))
+            if histogram is None:
+                histogram = self._requests[(endpoint, method, status)] = Histogram(self.buckets)
+            histogram.observe(duration)
+            if stats.sql_count:
+                totals = self._sql.setdefault(endpoint, [0, 0.0])
+                totals[0] += stats.sql_count
+                totals[1] += stats.sql_time
+            if stats.redis_count:
+                totals = self._redis.setdefault(endpoint, [0, 0.0])
+                totals[0] += stats.redis_count
+                totals[1] += stats.redis_time
+
+    def add_collector(self, collector):
+        """collector() 返回 [(指标名, 类型, 说明, [(标签字典, 值), ...]), ...]"""
+        self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            requests = [(key, list(h.counts), h.sum, h.count) for key, h in sorted(self._requests.items())]
+            sql = sorted((endpoint, tuple(totals)) for endpoint, totals in self._sql.items())
+            redis = sorted((endpoint, tuple(totals)) for endpoint, totals in self._redis.items())
+
+        lines = [
+            '# HELP http_request_duration_seconds HTTP request latency by endpoint.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (endpoint, method, status), counts, total, count in requests:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                labels = _labels(endpoint=endpoint, method=method, status=status, le=bound)
+                lines.append(f'http_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = _labels(endpoint=endpoint, method=method, status=status)
+            lines.append(f'http_request_duration_seconds_sum{labels} {total}')
+            lines.append(f'http_request_duration_seconds_count{labels} {count}')
+
+        for name, help_text, rows in (
+            ('db_queries', 'Database queries executed by endpoint.', sql),
+            ('redis_commands', 'Redis commands and pipelines executed by endpoint.', redis),
+        ):
+            lines.append(f'# HELP {name}_total {help_text}')
+            lines.append(f'# TYPE {name}_total counter')
+            lines.extend(f'{name}_total{_labels(endpoint=endpoint)} {count}' for endpoint, (count, _) in rows)
+            lines.append(f'# HELP {name}_duration_seconds_total Time spent in {name.replace("_", " ")} by endpoint.')
+            lines.append(f'# TYPE {name}_duration_seconds_total counter')
+            lines.extend(f'{name}_duration_seconds_total{_labels(endpoint=endpoint)} {seconds}'
+                         for endpoint, (_, seconds) in rows)
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.extend(f'{name}{_labels(**labels) if labels else ""} {value}' for labels, value in samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间记在本次执行的上下文上，语句失败时随上下文丢弃，不会残留在池化连接中
+    if _request_stats.get() is not None and context is not None:
+        context.metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    started = getattr(context, 'metrics_query_start', None)
+    if stats is not None and started is not None:
+        stats.sql_time += time.perf_counter() - started
+        stats.sql_count += 1
+
+
+def _timed(func):
+    """统计 Redis 调用次数和耗时，计入当前请求"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _request_stats.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.redis_time += time.perf_counter() - started
+            stats.redis_count += 1
+    return wrapper
+
+
+def instrument_redis(client):
+    """
+    为 Redis 客户端实例加上计时：单条命令包装 execute_command，pipeline 在 execute 时计为一次调用。
+    只修改这个实例，已经持有该实例的其他模块同样生效。
+    """
+    if getattr(client, '_metrics_instrumented', False):
+        return client
+    client.execute_command = _timed(client.execute_command)
+    create_pipeline = client.pipeline
+
+    @wraps(create_pipeline)
+    def pipeline(*args, **kwargs):
+        pipe = create_pipeline(*args, **kwargs)
+        pipe.execute = _timed(pipe.execute)
+        return pipe
+
+    client.pipeline = pipeline
+    client._metrics_instrumented = True
+    return client
+
+
+def _start_request():
+    request.metrics_token = _request_stats.set(RequestStats())
+
+
+def _finish_request(app, status):
+    token = getattr(request, 'metrics_token', None)
+    if token is None:
+        return
+    request.metrics_token = None
+    stats = _request_stats.get()
+    _request_stats.reset(token)
+    if stats is not None and app.metrics is not None:
+        # 未匹配路由的请求统一记为 unknown，避免任意路径产生大量标签
+        app.metrics.observe_request(request.endpoint or 'unknown', request.method, status, stats)
+
+
+def _extension_collector(app):
+    """限流两级存储、令牌撤销列表和队列日志的运行指标"""
+    def collect():
+        from ..extensions import limiter
+        storage = getattr(limiter, '_storage', None)
+        if hasattr(storage, 'stats'):
+            stats = storage.stats()
+            yield 'ratelimit_sync_lag_seconds', 'gauge', 'Age of the oldest unsynced rate limit hit.', \
+                [({}, stats['sync_lag'])]
+            yield 'ratelimit_pending_hits', 'gauge', 'Rate limit hits not yet synced to the shared store.', \
+                [({}, stats['pending'])]
+            yield 'ratelimit_local_hits_total', 'counter', 'Rate limit hits decided locally.', \
+                [({}, stats['local_hits'])]
+            yield 'ratelimit_backend_calls_total', 'counter', 'Calls to the shared rate limit store.', \
+                [({}, stats['backend_calls'])]
+            yield 'ratelimit_sync_errors_total', 'counter', 'Failed rate limit syncs.', \
+                [({}, stats['sync_errors'])]
+        blocklist = getattr(app, 'token_blocklist', None)
+        if blocklist is not None:
+            stats = blocklist.stats()
+            yield 'jwt_blocklist_checks_total', 'counter', 'Token revocation checks by how they were decided.', [
+                ({'result': 'filter_pass'}, stats['filter_passes']),
+                ({'result': 'redis_lookup'}, stats['redis_lookups']),
+            ]
+            yield 'jwt_blocklist_filter_error_rate', 'gauge', 'Estimated false positive rate of the local filter.', \
+                [({}, stats['filter_error_rate'])]
+        dropped = sum(getattr(handler, 'dropped', 0) for handler in app.logger.handlers)
+        yield 'log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full.', \
+            [({}, dropped)]
+    return collect
+
+
+def setup_metrics(app: Flask):
+    """注册请求、SQL 和 Redis 的计时钩子，挂载到 app.metrics；未启用时为 None"""
+    if not app.config['METRICS_ENABLED']:
+        app.metrics = None
+        return None
+
+    app.metrics = Metrics()
+    app.metrics.add_collector(_extension_collector(app))
+
+    # 放在最前面，限流等其他 before_request 钩子的耗时和拒绝的请求也计入统计
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+
+    @app.after_request
+    def record_response(response):
+        _finish_request(app, response.status_code)
+        return response
+
+    @app.teardown_request
+    def record_error(exc):
+        # 未处理的异常不会经过 after_request
+        if exc is not None:
+            _finish_request(app, 500)
+
+    # 引擎事件注册在 Engine 类上，对所有应用实例只注册一次；只在请求内计数
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+    instrument_redis(app.redis_client)
+    if not app.config.get('METRICS_TOKEN') and app.config.get('FLASK_ENV') not in OPEN_METRICS_ENVS:
+        app.logger.warning("METRICS_TOKEN is not set, /api/metrics is disabled; metrics are still collected")
+    return app.metrics
@@ -0,0 +1,122 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import Flask
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class PasswordHasherBusy(RuntimeError):
+    """工作池过载：等待中的哈希任务超过上限，或任务未在超时时间内完成；retry_after 为建议的重试间隔（秒）"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    密码哈希服务。
+
+    - 哈希算法和成本参数由配置决定（werkzeug 的 method 字符串，如 scrypt:32768:8:1、pbkdf2:sha256:600000）；
+    - 校验和生成在有界的工作池中执行：process 使用进程池利用多核，thread 使用线程池，inline 在当前线程执行；
+    - needs_rehash 判断已存储的哈希是否与当前配置一致，供登录成功后透明地重新哈希。
+    """
+
+    def __init__(self, method='scrypt', executor='inline', workers=None, max_pending=None, timeout=None):
+        self.configure(method, executor, workers, max_pending, timeout)
+
+    def configure(self, method='scrypt', executor='inline', workers=None, max_pending=None, timeout=None):
+        if executor not in ('process', 'thread', 'inline'):
+            raise ValueError(f"Invalid password hash executor: {executor}. Must be 'process', 'thread' or 'inline'.")
+        self.shutdown()
+        self.method = method
+        self.executor_type = executor
+        self.workers = workers or os.cpu_count() or 1
+        # 排队中的任务上限，超过时等待 timeout 秒后拒绝，避免突发流量无限堆积
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self._prefix = None
+        self._executor = None
+        self._pid = None
+        self._pending = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        self.configure(
+            method=app.config['PASSWORD_HASH_METHOD'],
+            executor=app.config['PASSWORD_HASH_EXECUTOR'],
+            workers=app.config['PASSWORD_HASH_WORKERS'],
+            max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+            timeout=app.config['PASSWORD_HASH_TIMEOUT']
+        )
+
+    def _get_executor(self):
+        # 进程池和线程不会跨 fork 存活，子进程中重新创建
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    if self.executor_type == 'process':
+                        # 请求进程中已有其他线程，使用 spawn 启动工作进程，避免 fork 多线程进程带来的死锁
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context('spawn')
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, func, *args):
+        if self.executor_type == 'inline':
+            return func(*args)
+
+        retry_after = max(1, math.ceil(self.timeout or 1))
+        if not self._pending.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy("Too many pending password hash tasks", retry_after)
+        try:
+            return self._get_executor().submit(func, *args).result(self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy("Password hash task timed out", retry_after) from None
+        finally:
+            self._pending.release()
+
+    def shutdown(self):
+        """关闭工作池，未完成的任务会执行完毕"""
+        executor = getattr(self, '_executor', None)
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True)
+        self._executor = None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """
+        批量哈希，供批量导入使用：一次性分发到工作池并行计算，按输入顺序返回。
+        不占用 max_pending 名额，调用方负责控制每批的数量。
+        """
+        passwords = list(passwords)
+        if self.executor_type == 'inline' or len(passwords) <= 1:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_executor().map(
+            generate_password_hash, passwords, [self.method] * len(passwords), chunksize=chunksize
+        ))
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    @property
+    def method_prefix(self):
+        """当前配置对应的哈希前缀（$ 之前的部分），如 scrypt:32768:8:1"""
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method, salt_length=1).split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, password_hash):
+        """已存储的哈希算法或成本参数与当前配置不一致时返回 True"""
+        return password_hash.split('$', 1)[0] != self.method_prefix
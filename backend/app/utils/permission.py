@@ -0,0 +1,242 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Flask, current_app, has_app_context, jsonify
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect, literal, select, union
+from sqlalchemy.sql.dml import Delete, Update, UpdateBase
+from ..extensions import db
+from ..models.menu import Menu
+from ..models.role import Role, role_menu_association
+from ..models.user import User, user_role_association
+from .redis_client import deferred
+from .response import ApiResponse, ResponseCode
+
+# 管理员拥有全部权限
+ALL_PERMISSIONS = '*'
+
+# 影响权限计算和菜单树的模型字段，这些字段变化后需要让权限缓存和菜单树缓存失效
+# 关联关系从任意一侧修改（如 role.users.append(user)）都会被检测到
+WATCHED_ATTRIBUTES = {
+    User: ('roles', 'is_admin', 'status', 'is_delete'),
+    Role: ('users', 'menus', 'permission_char', 'status', 'is_delete'),
+    Menu: ('roles', 'permission_id', 'status', 'is_delete',
+           'parent_id', 'name', 'icon', 'sort_order', 'component_path'),
+}
+WATCHED_TABLES = (user_role_association, role_menu_association)
+# 批量 UPDATE/DELETE（如批量逻辑删除）不经过 flush，直接按表检测
+WATCHED_MODEL_TABLES = (User.__table__, Role.__table__, Menu.__table__)
+
+
+def compile_permissions(user_id):
+    """
+    一次查询编译用户的有效权限：角色关联菜单的 permission_id、角色的 permission_char，
+    管理员额外包含 '*'。禁用或逻辑删除的用户、角色、菜单不计入。
+    """
+    active_user = (User.id == user_id) & (User.status == 1) & (User.is_delete.is_(False))
+    active_role = (Role.status == 1) & (Role.is_delete.is_(False))
+
+    menu_permissions = (
+        select(Menu.permission_id.label('permission'))
+        .join(role_menu_association, role_menu_association.c.menu_id == Menu.id)
+        .join(Role, Role.id == role_menu_association.c.role_id)
+        .join(user_role_association, user_role_association.c.role_id == Role.id)
+        .join(User, User.id == user_role_association.c.user_id)
+        .where(active_user, active_role, Menu.status == 1, Menu.is_delete.is_(False),
+               Menu.permission_id.is_not(None))
+    )
+    role_permissions = (
+        select(Role.permission_char.label('permission'))
+        .join(user_role_association, user_role_association.c.role_id == Role.id)
+        .join(User, User.id == user_role_association.c.user_id)
+        .where(active_user, active_role, Role.permission_char.is_not(None))
+    )
+    admin_permission = select(literal(ALL_PERMISSIONS).label('permission')).where(active_user, User.is_admin.is_(True))
+
+    rows = db.session.execute(union(menu_permissions, role_permissions, admin_permission)).scalars()
+    return frozenset(permission for permission in rows if permission)
+
+
+class PermissionCache:
+    """
+    用户有效权限缓存。
+
+    - 进程内 LRU 缓存 user_id -> (version, frozenset)，命中时权限判断为 O(1) 集合查找；
+    - Redis 中按用户缓存编译结果，多进程共享，避免每个进程各自查库；
+    - 全局版本号 {prefix}version 在角色/菜单/关联表变化时递增，旧版本的缓存自然失效，
+      菜单树缓存同样以该版本号区分；
+      进程内最多每 version_check_interval 秒读取一次 Redis 中的版本号。
+    """
+
+    def __init__(self, redis_client, key_prefix='perm:', ttl=3600, local_size=10000, version_check_interval=1.0):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.local_size = local_size
+        self.version_check_interval = version_check_interval
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_checked_at = None
+
+    @property
+    def version_key(self):
+        return f'{self.key_prefix}version'
+
+    def _user_key(self, user_id):
+        return f'{self.key_prefix}user:{user_id}'
+
+    def current_version(self):
+        """当前权限版本号，进程内按间隔刷新"""
+        now = time.monotonic()
+        if self._version_checked_at is None or now - self._version_checked_at >= self.version_check_interval:
+            try:
+                self._version = int(self.redis_client.get(self.version_key) or 0)
+            except RedisError as e:
+                current_app.logger.warning(f"Failed to read permission version from Redis: {e}")
+            self._version_checked_at = now
+        return self._version
+
+    def invalidate(self):
+        """角色/菜单/关联关系变化后调用：递增全局版本号并清空本进程缓存"""
+        with self._lock:
+            self._local.clear()
+        try:
+            self._version = int(self.redis_client.incr(self.version_key))
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to bump permission version in Redis: {e}")
+            self._version += 1
+        self._version_checked_at = time.monotonic()
+
+    def _get_local(self, user_id, version):
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._local.move_to_end(user_id)
+            return entry[1]
+
+    def _set_local(self, user_id, version, permissions):
+        with self._lock:
+            self._local[user_id] = (version, permissions)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, user_id):
+        """返回用户的有效权限集合：进程内缓存 -> Redis -> 数据库"""
+        version = self.current_version()
+        permissions = self._get_local(user_id, version)
+        if permissions is not None:
+            return permissions
+
+        try:
+            cached = self.redis_client.get(self._user_key(user_id))
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to read permissions from Redis: {e}")
+            cached = None
+        if cached:
+            payload = json.loads(cached)
+            if payload['v'] == version:
+                permissions = frozenset(payload['p'])
+
+        if permissions is None:
+            permissions = compile_permissions(user_id)
+            try:
+                payload = json.dumps({'v': version, 'p': sorted(permissions)})
+                deferred(self.redis_client).setex(self._user_key(user_id), self.ttl, payload)
+            except RedisError as e:
+                current_app.logger.warning(f"Failed to cache permissions in Redis: {e}")
+
+        self._set_local(user_id, version, permissions)
+        return permissions
+
+    def has_permissions(self, user_id, *required):
+        permissions = self.get(user_id)
+        return ALL_PERMISSIONS in permissions or all(permission in permissions for permission in required)
+
+
+def require_permission(*permissions):
+    """
+    视图权限校验装饰器，要求当前 JWT 用户拥有全部指定权限。
+    用法：@require_permission('system:user:list')
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            user_id = int(get_jwt_identity())
+            if not current_app.permission_cache.has_permissions(user_id, *permissions):
+                data, status_code = ApiResponse.error(ResponseCode.FORBIDDEN)
+                return jsonify(data), status_code
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _watched_changes(session):
+    """本次 flush 中是否有影响权限的对象变化"""
+    for obj in session.new:
+        if isinstance(obj, (Role, Menu)):
+            return True
+    # 物理删除用户后，其缓存的权限不能在 TTL 内继续生效
+    for obj in session.deleted:
+        if isinstance(obj, (User, Role, Menu)):
+            return True
+    for obj in session.dirty:
+        for model, attributes in WATCHED_ATTRIBUTES.items():
+            if isinstance(obj, model):
+                state = inspect(obj)
+                if any(state.attrs[name].history.has_changes() for name in attributes):
+                    return True
+    return False
+
+
+def _mark_changed(session):
+    session.info['permissions_changed'] = True
+
+
+def _before_flush(session, flush_context, instances):
+    if _watched_changes(session):
+        _mark_changed(session)
+
+
+def _do_orm_execute(orm_execute_state):
+    # 直接对关联表执行的 insert/update/delete 语句，以及对用户、角色、菜单表的批量 update/delete
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase) and statement.table in WATCHED_TABLES:
+        _mark_changed(orm_execute_state.session)
+    elif isinstance(statement, (Update, Delete)) and statement.table in WATCHED_MODEL_TABLES:
+        _mark_changed(orm_execute_state.session)
+
+
+def _after_commit(session):
+    if session.info.pop('permissions_changed', False) and has_app_context():
+        cache = getattr(current_app, 'permission_cache', None)
+        if cache is not None:
+            cache.invalidate()
+
+
+def _after_rollback(session):
+    session.info.pop('permissions_changed', None)
+
+
+def setup_permissions(app: Flask):
+    """创建权限缓存并注册失效事件，挂载到 app.permission_cache"""
+    app.permission_cache = PermissionCache(
+        app.redis_client,
+        ttl=app.config['PERMISSION_CACHE_TTL'],
+        local_size=app.config['PERMISSION_LOCAL_CACHE_SIZE'],
+        version_check_interval=app.config['PERMISSION_VERSION_CHECK_INTERVAL']
+    )
+
+    # 会话事件注册在 db.session 上，对所有应用实例只注册一次
+    for name, listener in (('before_flush', _before_flush), ('do_orm_execute', _do_orm_execute),
+                           ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+    return app.permission_cache
@@ -0,0 +1,205 @@
+import re
+import sysconfig
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from flask import Flask, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 当前生效的记录器，请求级和测试中的 track_queries 可以同时生效
+_recorders = ContextVar('query_recorders', default=())
+
+# 查找 N+1 来源时跳过的目录：标准库、第三方库和本文件
+_SKIP_PATHS = tuple({sysconfig.get_path(name) for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement):
+    """
+    SQL 语句的形状：字面量和各驱动的占位符统一为 ?，IN 列表折叠为 IN (?)，空白合并。
+    只有参数不同的语句得到相同的形状。
+    """
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _origin_frame():
+    """调用栈中最近一个项目代码的帧，即触发查询的代码位置"""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename != __file__ and not frame.filename.startswith(_SKIP_PATHS):
+            return frame
+    return None
+
+
+def _explain(conn, statement, parameters):
+    """在同一个连接上执行 EXPLAIN，使用 DBAPI 游标，不再触发引擎事件"""
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return '\n'.join(' | '.join(str(value) for value in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        cursor.close()
+
+
+class ShapeStats:
+    """同一形状语句的执行次数、总耗时，以及达到 N+1 阈值时的调用位置"""
+    __slots__ = ('count', 'time', 'origin')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.origin = None
+
+
+class QueryRecorder:
+    """
+    记录一段代码执行的 SQL：
+    - 按形状分组计数，同一形状达到 n_plus_one_threshold 次视为 N+1，记录此时的调用位置；
+    - 耗时超过 slow_threshold 秒的 SELECT 记为慢查询，explain=True 时附带执行计划。
+    """
+
+    def __init__(self, n_plus_one_threshold=5, slow_threshold=None, explain=True):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.queries = 0
+        self.total_time = 0.0
+        self.shapes = {}
+        self.slow = []
+
+    def record(self, conn, statement, parameters, duration, executemany):
+        shape = normalize_statement(statement)
+        stats = self.shapes.get(shape)
+        if stats is None:
+            stats = self.shapes[shape] = ShapeStats()
+        stats.count += 1
+        stats.time += duration
+        self.queries += 1
+        self.total_time += duration
+        if stats.count == self.n_plus_one_threshold:
+            # 只在达到阈值时取一次调用栈
+            stats.origin = _origin_frame()
+
+        if (self.slow_threshold is not None and duration >= self.slow_threshold and not executemany
+                and statement.lstrip()[:6].upper() == 'SELECT'):
+            plan = _explain(conn, statement, parameters) if self.explain else None
+            self.slow.append((statement, duration, plan))
+
+    def n_plus_one(self):
+        """达到阈值的形状，按次数倒序：[(形状, ShapeStats), ...]"""
+        found = [(shape, stats) for shape, stats in self.shapes.items() if stats.count >= self.n_plus_one_threshold]
+        return sorted(found, key=lambda item: item[1].count, reverse=True)
+
+    def report(self):
+        """各形状的次数和耗时，N+1 附带调用位置"""
+        lines = [f'{self.queries} queries in {self.total_time * 1000:.1f} ms']
+        for shape, stats in sorted(self.shapes.items(), key=lambda item: item[1].count, reverse=True):
+            lines.append(f'  {stats.count:>4} x {stats.time * 1000:>8.1f} ms  {shape}')
+            if stats.origin is not None:
+                origin = stats.origin
+                lines.append(f'         N+1 from {origin.filename}:{origin.lineno} in {origin.name}: {origin.line}')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def track_queries(n_plus_one_threshold=5, slow_threshold=None, explain=True):
+    """
+    记录代码块内执行的 SQL，可以嵌套，也可以在请求内使用：
+        with track_queries() as recorder:
+            ...
+        print(recorder.report())
+    """
+    recorder = QueryRecorder(n_plus_one_threshold, slow_threshold, explain)
+    token = _start(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+def _start(recorder):
+    _ensure_listeners()
+    return _recorders.set(_recorders.get() + (recorder,))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _recorders.get():
+        conn.info.setdefault('profiler_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorders = _recorders.get()
+    starts = conn.info.get('profiler_query_start')
+    if recorders and starts:
+        duration = time.perf_counter() - starts.pop()
+        for recorder in recorders:
+            recorder.record(conn, statement, parameters, duration, executemany)
+
+
+def _ensure_listeners():
+    # 引擎事件注册在 Engine 类上，对所有引擎只注册一次
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+
+
+def _log_request(app, recorder):
+    endpoint = request.endpoint or request.path
+    for shape, stats in recorder.n_plus_one():
+        origin = stats.origin
+        location = f'{origin.filename}:{origin.lineno} in {origin.name}' if origin else 'unknown'
+        app.logger.warning(f"N+1 query on {endpoint}: {stats.count} x {shape} (from {location})")
+    for statement, duration, plan in recorder.slow:
+        message = f"Slow query on {endpoint}: {duration * 1000:.1f} ms\n{statement}"
+        if plan is not None:
+            message += f"\nEXPLAIN:\n{plan}"
+        app.logger.warning(message)
+
+
+def setup_query_profiler(app: Flask):
+    """
+    开发和测试用的 SQL 分析：按请求统计语句形状，记录 N+1 和慢查询（附执行计划）到日志。
+    未启用时不注册任何钩子，app.query_profiler 为 None。
+    """
+    if not app.config['QUERY_PROFILER_ENABLED']:
+        app.query_profiler = None
+        return None
+
+    app.query_profiler = {
+        'n_plus_one_threshold': app.config['QUERY_N_PLUS_ONE_THRESHOLD'],
+        'slow_threshold': app.config['QUERY_SLOW_THRESHOLD_MS'] / 1000,
+        'explain': app.config['QUERY_EXPLAIN_SLOW'],
+    }
+
+    @app.before_request
+    def start_profiling():
+        request.query_recorder = QueryRecorder(**app.query_profiler)
+        request.query_recorder_token = _start(request.query_recorder)
+
+    @app.teardown_request
+    def finish_profiling(exc):
+        token = getattr(request, 'query_recorder_token', None)
+        if token is None:
+            return
+        request.query_recorder_token = None
+        _recorders.reset(token)
+        _log_request(app, request.query_recorder)
+
+    _ensure_listeners()
+    return app.query_profiler
@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from limits.storage import Storage, storage_from_string
+
+# 两级限流存储的 URI 前缀，如 tiered+redis://host:6379/0
+TIERED_PREFIX = 'tiered+'
+
+logger = logging.getLogger(__name__)
+
+
+class _Counter:
+    """某个限流键在本进程内的计数：最近一次同步得到的全局计数 + 尚未同步的本地计数"""
+    __slots__ = ('expiry', 'window_end', 'synced', 'pending', 'pending_since')
+
+    def __init__(self, expiry, window_end, synced):
+        self.expiry = expiry
+        self.window_end = window_end
+        self.synced = synced
+        self.pending = 0
+        self.pending_since = None
+
+
+class TieredStorage(Storage):
+    """
+    Flask-Limiter（limits）的两级存储：进程内计数在前，Redis 等共享存储在后。
+
+    - 每个限流键在每个窗口内第一次命中时同步访问共享存储，取得全局计数和窗口结束时间；
+    - 之后的命中只在本地累加，返回 “最近一次全局计数 + 本地未同步计数” 作为当前计数，由限流策略与上限比较；
+    - 本地未同步计数达到 sync_batch 时在当前请求中同步一次，后台线程每 sync_interval 秒把所有键的增量批量同步，
+      同步时用 incr(amount=增量) 写入共享存储并取回最新的全局计数；
+    - 多进程下全局计数只是近似值，超出上限的量不超过 进程数 × sync_batch，换来大部分请求不访问 Redis。
+    stats() 返回本地命中、共享存储访问次数和同步延迟等指标。
+    """
+
+    STORAGE_SCHEME = ['tiered+redis', 'tiered+rediss', 'tiered+redis+unix', 'tiered+memory']
+    # 同步失败日志的最小间隔（秒），共享存储持续不可用时不会每轮同步都打印
+    ERROR_LOG_INTERVAL = 60.0
+
+    def __init__(self, uri=None, wrap_exceptions=False, sync_interval=0.5, sync_batch=10, clock=time.monotonic,
+                 **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.backend = storage_from_string(uri[len(TIERED_PREFIX):], wrap_exceptions=wrap_exceptions, **options)
+        self.sync_interval = float(sync_interval)
+        self.sync_batch = int(sync_batch)
+        self.clock = clock
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._stats = {'local_hits': 0, 'backend_calls': 0, 'syncs': 0, 'sync_errors': 0}
+        self._last_sync = None
+        self._last_error_log = None
+        self._suppressed_errors = 0
+
+    @property
+    def base_exceptions(self):
+        return self.backend.base_exceptions
+
+    def _ensure_sync_thread(self):
+        # 线程不会跨 fork 存活，子进程中重新启动
+        if self.sync_interval <= 0 or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._sync_loop, name='ratelimit-sync', daemon=True)
+                self._thread.start()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                # 后台线程不能退出，下一轮重试
+                with self._lock:
+                    self._stats['sync_errors'] += 1
+                self._log_sync_error(e)
+
+    def _log_sync_error(self, error):
+        """按 ERROR_LOG_INTERVAL 限频记录同步失败，期间省略的次数在下一条日志中给出"""
+        now = self.clock()
+        with self._lock:
+            if self._last_error_log is not None and now - self._last_error_log < self.ERROR_LOG_INTERVAL:
+                self._suppressed_errors += 1
+                return
+            self._last_error_log = now
+            suppressed, self._suppressed_errors = self._suppressed_errors, 0
+        logger.warning(f"Rate limit sync to shared storage failed ({suppressed} similar errors suppressed): {error!r}")
+
+    def close(self):
+        """停止后台同步线程并同步剩余的增量"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+        self.sync()
+
+    def _open_window(self, key, expiry, amount):
+        """窗口内第一次命中：同步写入共享存储"""
+        count = self.backend.incr(key, expiry, amount)
+        window_end = self.backend.get_expiry(key)
+        now = self.clock()
+        with self._lock:
+            self._stats['backend_calls'] += 2
+            # 共享存储返回的是 time.time() 时间戳，换算到本地时钟
+            self._counters[key] = _Counter(expiry, now + max(0.0, window_end - time.time()), count)
+        return count
+
+    def incr(self, key, expiry, amount=1):
+        self._ensure_sync_thread()
+        now = self.clock()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and now < counter.window_end:
+                counter.pending += amount
+                if counter.pending_since is None:
+                    counter.pending_since = now
+                self._stats['local_hits'] += 1
+                count = counter.synced + counter.pending
+                flush = counter.pending >= self.sync_batch
+            else:
+                counter = None
+        if counter is None:
+            return self._open_window(key, expiry, amount)
+        if flush:
+            self._sync_key(key)
+        return count
+
+    def _take_pending(self, key):
+        counter = self._counters.get(key)
+        if counter is None or not counter.pending:
+            return None
+        pending, counter.pending, counter.pending_since = counter.pending, 0, None
+        return counter, pending
+
+    def _sync_key(self, key):
+        with self._lock:
+            taken = self._take_pending(key)
+        if taken is not None:
+            self._push(key, *taken)
+
+    def _push(self, key, counter, pending):
+        try:
+            total = self.backend.incr(key, counter.expiry, pending)
+        except Exception:
+            with self._lock:
+                # 放回本地，下一次同步重试
+                counter.pending += pending
+                if counter.pending_since is None:
+                    counter.pending_since = self.clock()
+                self._stats['sync_errors'] += 1
+            raise
+        with self._lock:
+            counter.synced = total
+            self._stats['backend_calls'] += 1
+
+    def sync(self):
+        """把所有键的本地增量同步到共享存储，并清理已结束窗口的计数，返回同步的键数量"""
+        now = self.clock()
+        with self._lock:
+            batch = []
+            for key in list(self._counters):
+                taken = self._take_pending(key)
+                if taken is not None:
+                    batch.append((key, *taken))
+                elif now >= self._counters[key].window_end:
+                    del self._counters[key]
+        errors = 0
+        for key, counter, pending in batch:
+            try:
+                self._push(key, counter, pending)
+            except Exception as e:
+                # 增量已放回本地，下一次同步重试
+                errors += 1
+                self._log_sync_error(e)
+        with self._lock:
+            self._stats['syncs'] += 1
+            if not errors:
+                self._last_sync = now
+        return len(batch)
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and now < counter.window_end:
+                return counter.synced + counter.pending
+        return self.backend.get(key)
+
+    def get_expiry(self, key):
+        now = self.clock()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and now < counter.window_end:
+                return time.time() + (counter.window_end - now)
+        return self.backend.get_expiry(key)
+
+    def check(self):
+        return self.backend.check()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+        return self.backend.reset()
+
+    def clear(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+        self.backend.clear(key)
+
+    def stats(self):
+        """
+        本地命中次数、共享存储访问次数、同步次数和失败次数，以及同步延迟：
+        - pending：尚未同步的命中数；
+        - sync_lag：最早一个未同步命中至今的秒数；
+        - last_sync_age：距上次成功同步的秒数。
+        """
+        now = self.clock()
+        with self._lock:
+            pending_since = [c.pending_since for c in self._counters.values() if c.pending_since is not None]
+            result = dict(self._stats)
+            result['keys'] = len(self._counters)
+            result['pending'] = sum(c.pending for c in self._counters.values())
+        result['sync_lag'] = now - min(pending_since) if pending_since else 0.0
+        result['last_sync_age'] = now - self._last_sync if self._last_sync is not None else None
+        return result
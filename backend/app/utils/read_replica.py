@@ -0,0 +1,187 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import Flask, current_app, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.selectable import CompoundSelect
+
+# 只读的请求方法，这些请求中的查询默认发往只读副本
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# 会话中已有写操作时记录在 session.info 中，之后的读也走主库（读己之写）
+WROTE_KEY = 'read_replica_wrote'
+
+# 当前上下文中的查询是否允许发往只读副本
+_use_replica = ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def read_replica():
+    """
+    代码块内的只读查询发往只读副本，可以用于请求之外（CLI、后台任务）：
+        with read_replica():
+            rows = User.query.all()
+    会话中已有写操作时仍然读主库。
+    """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def primary():
+    """代码块内的查询全部发往主库，用于 GET 请求中需要读取最新数据的地方"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaSet:
+    """
+    一组只读副本引擎，轮询选择健康的副本。
+
+    - 每个副本距上次检查超过 check_interval 秒时，在选中前执行一次 SELECT 1；
+    - 检查失败或查询中出现连接错误的副本在 retry_interval 秒内不再使用，全部不健康时返回 None，由调用方读主库。
+    """
+
+    def __init__(self, engines, check_interval=5.0, retry_interval=30.0, clock=time.monotonic):
+        self.engines = list(engines)
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.clock = clock
+        # 引擎 -> [是否健康, 下次检查时间]
+        self._health = {engine: [True, 0.0] for engine in self.engines}
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+        for engine in self.engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect and context.engine in self._health:
+            self.mark_unhealthy(context.engine)
+
+    def mark_unhealthy(self, engine):
+        with self._lock:
+            self._health[engine] = [False, self.clock() + self.retry_interval]
+
+    def _ping(self, engine):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            return True
+        except Exception as e:
+            if has_app_context():
+                current_app.logger.warning(
+                    f"Read replica {engine.url.render_as_string(hide_password=True)} unavailable: {e}"
+                )
+            return False
+
+    def _is_healthy(self, engine):
+        now = self.clock()
+        with self._lock:
+            healthy, next_check = self._health[engine]
+            if now < next_check:
+                return healthy
+            # 先推迟下次检查，其他线程在检查期间沿用当前状态
+            self._health[engine][1] = now + self.check_interval
+        healthy = self._ping(engine)
+        with self._lock:
+            self._health[engine] = [healthy, now + (self.check_interval if healthy else self.retry_interval)]
+        return healthy
+
+    def choose(self):
+        """返回一个健康的副本引擎，没有时返回 None"""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = next(self._cycle)
+            if self._is_healthy(engine):
+                return engine
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {engine.url.render_as_string(hide_password=True): healthy
+                    for engine, (healthy, _) in self._health.items()}
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+def _is_read(clause):
+    return isinstance(clause, (Select, CompoundSelect))
+
+
+class RoutingSession(Session):
+    """
+    按语句选择主库或只读副本的会话：
+    - 只有在只读请求或 read_replica() 代码块中，且会话尚未写过数据时，SELECT 才发往副本；
+    - flush、DML、原生 SQL 等其他语句都走主库，并标记会话已写，之后同一会话的读也走主库；
+    - 未配置副本或副本都不健康时读主库。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _use_replica.get() and has_app_context():
+            replicas = getattr(current_app, 'read_replicas', None)
+            if replicas is not None:
+                if self._flushing or not _is_read(clause):
+                    self.info[WROTE_KEY] = True
+                elif not self.info.get(WROTE_KEY):
+                    engine = replicas.choose()
+                    if engine is not None:
+                        return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def close(self):
+        super().close()
+        self.info.pop(WROTE_KEY, None)
+
+
+def _start_request():
+    if request.method in SAFE_METHODS:
+        request.read_replica_token = _use_replica.set(True)
+
+
+def _finish_request(exc):
+    token = getattr(request, 'read_replica_token', None)
+    if token is not None:
+        request.read_replica_token = None
+        _use_replica.reset(token)
+
+
+def setup_read_replicas(app: Flask):
+    """
+    根据 SQLALCHEMY_REPLICA_URIS 创建只读副本引擎，挂载到 app.read_replicas；未配置时为 None。
+    副本使用与主库相同的 SQLALCHEMY_ENGINE_OPTIONS 和 SQLite PRAGMA。
+    """
+    uris = app.config['SQLALCHEMY_REPLICA_URIS']
+    if not uris:
+        app.read_replicas = None
+        return None
+
+    # db_engine 依赖 extensions，而 extensions 导入本模块中的 RoutingSession
+    from .db_engine import configure_engine, describe_engine
+
+    engines = []
+    for uri in uris:
+        engine = create_engine(uri, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        settings = configure_engine(app, engine)
+        app.logger.info(f"Read replica engine: {describe_engine(engine, settings)}")
+        engines.append(engine)
+
+    app.read_replicas = ReplicaSet(
+        engines,
+        check_interval=app.config['REPLICA_HEALTH_CHECK_INTERVAL'],
+        retry_interval=app.config['REPLICA_RETRY_INTERVAL']
+    )
+    app.before_request(_start_request)
+    app.teardown_request(_finish_request)
+    return app.read_replicas
@@ -0,0 +1,80 @@
+from flask import Flask, current_app, g, has_request_context
+from redis import BlockingConnectionPool, Connection, Redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, RedisError
+from redis.retry import Retry
+
+
+class DisabledConnection(Connection):
+    """REDIS_ENABLED 为 False 时使用的连接：不访问网络，每条命令立即以 ConnectionError 失败"""
+
+    def connect(self):
+        raise ConnectionError("Redis is disabled (REDIS_ENABLED=False)")
+
+
+def create_redis_pool(config):
+    """
+    根据配置创建有界的阻塞连接池：
+    - 连接数达到 REDIS_MAX_CONNECTIONS 时最多等待 REDIS_POOL_TIMEOUT 秒，不会无限创建连接；
+    - 建立连接和读写都有超时，Redis 不可达时在 REDIS_CONNECT_TIMEOUT 秒内报错，不会挂起请求和启动；
+    - 连接错误和超时最多重试 REDIS_RETRIES 次，退避时间很短；
+    - 空闲超过 REDIS_HEALTH_CHECK_INTERVAL 秒的连接在使用前先 PING，替换已被服务端断开的连接。
+    连接池在 fork 后的子进程中使用时会自动重建，每个进程各自持有一个。
+    REDIS_ENABLED 为 False 时连接池不建立任何连接，依赖 Redis 的各组件按 Redis 不可用处理。
+    """
+    pool = BlockingConnectionPool.from_url(
+        config['REDIS_URI'],
+        max_connections=config['REDIS_MAX_CONNECTIONS'],
+        timeout=config['REDIS_POOL_TIMEOUT'],
+        socket_timeout=config['REDIS_SOCKET_TIMEOUT'],
+        socket_connect_timeout=config['REDIS_CONNECT_TIMEOUT'],
+        health_check_interval=config['REDIS_HEALTH_CHECK_INTERVAL'],
+        retry=Retry(ExponentialBackoff(cap=0.5, base=0.05), config['REDIS_RETRIES']),
+    )
+    if not config['REDIS_ENABLED']:
+        pool.connection_class = DisabledConnection
+    return pool
+
+
+def deferred(redis_client):
+    """
+    延迟执行的 Redis 写入：请求内返回请求级 pipeline，命令在请求结束（teardown）时一次性发送；
+    请求外返回客户端本身，命令立即执行。
+    只用于结果不影响本次响应的写入（缓存回填、统计计数、清理键），返回值不可用：
+        deferred(self.redis_client).setex(key, ttl, value)
+    """
+    if not has_request_context():
+        return redis_client
+    pipelines = g.setdefault('redis_pipelines', {})
+    entry = pipelines.get(id(redis_client))
+    if entry is None:
+        # 保存客户端引用，避免 id 被回收后复用
+        entry = pipelines[id(redis_client)] = (redis_client, redis_client.pipeline(transaction=False))
+    return entry[1]
+
+
+def flush_deferred(exc=None):
+    """执行本次请求中排队的 Redis 写入，失败只记录日志"""
+    pipelines = g.pop('redis_pipelines', None)
+    if not pipelines:
+        return
+    for _, pipe in pipelines.values():
+        try:
+            pipe.execute()
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to flush deferred Redis commands: {e}")
+
+
+def setup_redis(app: Flask):
+    """创建进程内共享的 Redis 连接池和客户端，挂载到 app.redis_pool 和 app.redis_client"""
+    app.redis_pool = create_redis_pool(app.config)
+    app.redis_client = Redis(connection_pool=app.redis_pool)
+    app.teardown_request(flush_deferred)
+    kwargs = app.redis_pool.connection_kwargs
+    app.logger.info(
+        f"Redis pool: max_connections={app.redis_pool.max_connections}, pool_timeout={app.redis_pool.timeout}, "
+        f"connect_timeout={kwargs['socket_connect_timeout']}, socket_timeout={kwargs['socket_timeout']}, "
+        f"health_check_interval={kwargs['health_check_interval']}, retries={app.config['REDIS_RETRIES']}, "
+        f"enabled={app.config['REDIS_ENABLED']}"
+    )
+    return app.redis_client
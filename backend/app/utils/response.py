@@ -1,6 +1,8 @@
 from enum import Enum, unique
 from functools import wraps
-from flask import jsonify, make_response
+from flask import Response, jsonify, make_response
+from ..models.base import BaseModelMixin
+from .serializer import to_dict, to_dicts
 
 
 class ResponseCode(Enum):
@@ -11,6 +13,7 @@ class ResponseCode(Enum):
     BAD_REQUEST = (1001, "请求参数错误", 400)
     UNAUTHORIZED = (1002, "未授权访问", 401)
     NOT_FOUND = (1003, "资源不存在", 404)
+    FORBIDDEN = (1006, "没有访问权限", 403)
     INTERNAL_ERROR = (5001, "服务器内部错误", 500)
 
     # 业务自定义状态码示例
@@ -42,6 +45,15 @@ class ApiResponse:
         return cls._create_response(code, msg, http_status_code, data)
 
 
+def serializable(data):
+    """模型对象及模型列表转换为字典，其他数据原样返回"""
+    if isinstance(data, BaseModelMixin):
+        return to_dict(data)
+    if isinstance(data, (list, tuple)) and data and isinstance(data[0], BaseModelMixin):
+        return to_dicts(data)
+    return data
+
+
 def uniform_response(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -49,23 +61,23 @@ def uniform_response(func):
         result = func(*args, **kwargs)
 
         # 如果返回值已经是一个 Flask Response 对象，则直接返回
-        if isinstance(result, (jsonify.__wrapped__, )) or result is None:
+        if isinstance(result, Response) or result is None:
             return result
 
         # 如果返回值是一个元组 (data, http_status_code)
         if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int):
             data, status_code = result
             # 自动封装为成功响应
-            return make_response(jsonify(ApiResponse.success(data)[0]), status_code)
+            return make_response(jsonify(ApiResponse.success(serializable(data))[0]), status_code)
 
         # 如果返回值是 (data, message)，则封装为成功响应，默认 HTTP 状态码为 200
         if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], str):
             data, message = result
-            data, status_code = ApiResponse.success(data, message)
+            data, status_code = ApiResponse.success(serializable(data), message)
             return make_response(jsonify(data), status_code)
 
         # 否则，将原始数据封装为成功的响应
-        data, status_code = ApiResponse.success(data=result)
+        data, status_code = ApiResponse.success(data=serializable(result))
         return make_response(jsonify(data), status_code)
 
     return wrapper
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import time
+from functools import wraps
+from flask import Flask, current_app, has_app_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from ..extensions import db
+
+# 可以缓存的请求方法
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+class CachedEntry:
+    """缓存的响应：响应体、状态码、MIME 类型，以及写入时的标签版本号和过期时间"""
+
+    def __init__(self, body, status, mimetype, versions, expires_at):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.versions = versions
+        self.expires_at = expires_at
+
+    def dumps(self):
+        header = json.dumps({'s': self.status, 'm': self.mimetype, 't': self.versions, 'x': self.expires_at})
+        return header.encode('utf-8') + b'\n' + self.body
+
+    @classmethod
+    def loads(cls, raw):
+        header, body = raw.split(b'\n', 1)
+        header = json.loads(header)
+        return cls(body, header['s'], header['m'], header['t'], header['x'])
+
+    def to_response(self):
+        return current_app.response_class(self.body, status=self.status, mimetype=self.mimetype)
+
+
+class ResponseCache:
+    """
+    Redis 响应缓存，按标签失效。
+
+    - 每个标签（通常是表名）在 Redis 中有一个版本号 {prefix}tag:<tag>，失效即 INCR，无需扫描删除缓存键；
+    - 缓存条目记录写入时各标签的版本号，读取时用一次 MGET 同时取出条目和当前版本号，不一致即视为失效；
+    - 条目在 ttl 之后还会保留 stale_ttl 秒：过期后只有拿到重建锁的 worker 重新计算，其他 worker 直接返回旧内容；
+      条目不存在或已失效时，其他 worker 最多等待 lock_timeout 秒读取重建结果，避免同时击穿到数据库；
+    - Redis 不可用时退化为直接执行视图。
+    """
+
+    def __init__(self, redis_client, key_prefix='cache:', stale_ttl=60, lock_timeout=5.0, poll_interval=0.05,
+                 clock=time.time):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+
+    def _tag_key(self, tag):
+        return f'{self.key_prefix}tag:{tag}'
+
+    def _entry_key(self, key):
+        return f'{self.key_prefix}resp:{key}'
+
+    def _lock_key(self, key):
+        return f'{self.key_prefix}lock:{key}'
+
+    def _read(self, key, tags):
+        """一次 MGET 读取条目和标签的当前版本号，返回 (条目或 None, 当前版本号列表)"""
+        try:
+            values = self.redis_client.mget([self._entry_key(key), *(self._tag_key(tag) for tag in tags)])
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to read response cache from Redis: {e}")
+            return None, None
+        versions = [int(value or 0) for value in values[1:]]
+        entry = CachedEntry.loads(values[0]) if values[0] else None
+        if entry is not None and entry.versions != versions:
+            entry = None
+        return entry, versions
+
+    def _write(self, key, response, versions, ttl):
+        entry = CachedEntry(response.get_data(), response.status_code, response.mimetype, versions, self.clock() + ttl)
+        try:
+            self.redis_client.set(self._entry_key(key), entry.dumps(), ex=ttl + self.stale_ttl)
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to write response cache to Redis: {e}")
+
+    def _acquire(self, key):
+        """获取重建锁，锁在 lock_timeout 后自动过期；Redis 不可用时视为获取成功（直接计算）"""
+        try:
+            return bool(self.redis_client.set(self._lock_key(key), 1, px=int(self.lock_timeout * 1000), nx=True))
+        except RedisError:
+            return True
+
+    def _release(self, key):
+        try:
+            self.redis_client.delete(self._lock_key(key))
+        except RedisError:
+            pass
+
+    def fetch(self, key, tags, ttl, compute):
+        """
+        返回 (响应, 状态)，状态为 HIT、STALE 或 MISS。
+        compute() 返回 Flask 响应，只有 200 且非流式的响应会被缓存。
+        """
+        entry, versions = self._read(key, tags)
+        if versions is None:
+            return compute(), 'MISS'
+        if entry is not None and self.clock() < entry.expires_at:
+            return entry.to_response(), 'HIT'
+
+        if self._acquire(key):
+            try:
+                response = compute()
+                if response.status_code == 200 and not response.is_streamed:
+                    # 使用计算前读到的版本号，计算期间发生的失效会让这次写入的条目立即失效
+                    self._write(key, response, versions, ttl)
+                return response, 'MISS'
+            finally:
+                self._release(key)
+
+        if entry is not None:
+            # 其他 worker 正在重建，先返回过期但未失效的旧内容
+            return entry.to_response(), 'STALE'
+
+        deadline = self.clock() + self.lock_timeout
+        while self.clock() < deadline:
+            time.sleep(self.poll_interval)
+            entry, _ = self._read(key, tags)
+            if entry is not None:
+                return entry.to_response(), 'HIT'
+        # 等待超时，自行计算但不写入缓存
+        return compute(), 'MISS'
+
+    def invalidate(self, *tags):
+        """递增标签版本号，使带有这些标签的缓存全部失效"""
+        if not tags:
+            return
+        try:
+            pipe = self.redis_client.pipeline()
+            for tag in tags:
+                pipe.incr(self._tag_key(tag))
+            pipe.execute()
+        except RedisError as e:
+            current_app.logger.warning(f"Failed to invalidate response cache tags {tags}: {e}")
+
+
+def _tag_name(tag):
+    return tag if isinstance(tag, str) else tag.__tablename__
+
+
+def cached_response(ttl=60, tags=(), vary_on_user=False):
+    """
+    GET 响应缓存装饰器。
+    用法：@cached_response(ttl=300, tags=[Role, Menu], vary_on_user=True)
+    - tags：模型类或表名，这些表的数据提交变更后缓存自动失效；
+    - vary_on_user：按 JWT 用户分别缓存，响应内容与当前用户相关时使用。
+    缓存键包含端点、路径和排序后的查询参数，响应头 X-Cache 标明 HIT、STALE 或 MISS。
+    """
+    tag_names = tuple(sorted({_tag_name(tag) for tag in tags}))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = getattr(current_app, 'response_cache', None)
+            if cache is None or request.method not in CACHEABLE_METHODS:
+                return func(*args, **kwargs)
+
+            parts = [request.endpoint, request.path, sorted(request.args.items(multi=True))]
+            if vary_on_user:
+                verify_jwt_in_request(optional=True)
+                parts.append(get_jwt_identity())
+            key = hashlib.blake2b(json.dumps(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+            response, state = cache.fetch(
+                key, tag_names, ttl, lambda: current_app.make_response(func(*args, **kwargs))
+            )
+            response.headers['X-Cache'] = state
+            return response
+        return wrapper
+    return decorator
+
+
+def _changed_tables(session):
+    """本次 flush 中新增、修改或删除的对象所在的表"""
+    tables = session.info.setdefault('cache_tags', set())
+    for obj in session.new | session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tables.add(obj.__table__.name)
+
+
+def _before_flush(session, flush_context, instances):
+    _changed_tables(session)
+
+
+def _do_orm_execute(orm_execute_state):
+    # 批量 insert/update/delete 语句不经过 flush
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase):
+        orm_execute_state.session.info.setdefault('cache_tags', set()).add(statement.table.name)
+
+
+def _after_commit(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags and has_app_context():
+        cache = getattr(current_app, 'response_cache', None)
+        if cache is not None:
+            cache.invalidate(*sorted(tags))
+
+
+def _after_rollback(session):
+    session.info.pop('cache_tags', None)
+
+
+def setup_response_cache(app: Flask):
+    """创建响应缓存并注册自动失效事件，挂载到 app.response_cache"""
+    app.response_cache = ResponseCache(
+        app.redis_client,
+        stale_ttl=app.config['RESPONSE_CACHE_STALE_TTL'],
+        lock_timeout=app.config['RESPONSE_CACHE_LOCK_TIMEOUT']
+    )
+
+    # 会话事件注册在 db.session 上，对所有应用实例只注册一次
+    for name, listener in (('before_flush', _before_flush), ('do_orm_execute', _do_orm_execute),
+                           ('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+    return app.response_cache
@@ -0,0 +1,79 @@
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from sqlalchemy import inspect
+
+
+class ModelSerializer:
+    """
+    模型序列化器，根据 SQLAlchemy mapper 一次性生成列访问器。
+
+    - 字段为模型的全部列属性，可用 fields 指定或 exclude 排除，模型的 __serialize_exclude__ 默认排除；
+    - 已加载的列直接从实例 __dict__ 中用 itemgetter 一次取出，绕过 ORM 属性描述符；
+      有列未加载（过期或延迟加载）时退回 attrgetter，由 ORM 触发加载；
+    - datetime、Enum 等值原样保留，由应用的 JSON provider 统一编码。
+    """
+
+    def __init__(self, model, fields=None, exclude=None):
+        columns = [attr.key for attr in inspect(model).column_attrs]
+        if fields is not None:
+            unknown = set(fields) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown fields for {model.__name__}: {', '.join(sorted(unknown))}")
+            columns = list(fields)
+        excluded = set(getattr(model, '__serialize_exclude__', ())) if exclude is None else set(exclude)
+        if fields is None:
+            columns = [column for column in columns if column not in excluded]
+        if not columns:
+            raise ValueError(f"No fields to serialize for {model.__name__}")
+
+        self.model = model
+        self.fields = tuple(columns)
+        item_getter = itemgetter(*self.fields)
+        attr_getter = attrgetter(*self.fields)
+        # 只有一个字段时 getter 返回单个值而不是元组
+        if len(self.fields) == 1:
+            self._item_getter = lambda values: (item_getter(values),)
+            self._attr_getter = lambda obj: (attr_getter(obj),)
+        else:
+            self._item_getter = item_getter
+            self._attr_getter = attr_getter
+
+    def _values(self, obj):
+        try:
+            return self._item_getter(obj.__dict__)
+        except KeyError:
+            return self._attr_getter(obj)
+
+    def __call__(self, obj):
+        return dict(zip(self.fields, self._values(obj)))
+
+    def many(self, objs):
+        fields, values = self.fields, self._values
+        return [dict(zip(fields, values(obj))) for obj in objs]
+
+
+@lru_cache(maxsize=None)
+def _cached_serializer(model, fields, exclude):
+    return ModelSerializer(model, fields, exclude)
+
+
+def serializer_for(model, fields=None, exclude=None):
+    """按 (模型, 字段, 排除字段) 缓存的序列化器，相同参数只生成一次"""
+    return _cached_serializer(
+        model,
+        tuple(fields) if fields is not None else None,
+        tuple(sorted(exclude)) if exclude is not None else None
+    )
+
+
+def to_dict(obj, fields=None, exclude=None):
+    """把单个模型对象转换为字典"""
+    return serializer_for(type(obj), fields, exclude)(obj)
+
+
+def to_dicts(objs, fields=None, exclude=None):
+    """把同一模型的对象列表转换为字典列表"""
+    objs = list(objs)
+    if not objs:
+        return []
+    return serializer_for(type(objs[0]), fields, exclude).many(objs)
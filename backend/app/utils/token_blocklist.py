@@ -0,0 +1,300 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from flask import Flask, current_app
+from redis.exceptions import RedisError
+from ..extensions import jwt
+
+
+class BloomFilter:
+    """
+    固定容量的布隆过滤器：不在集合中的元素一定返回 False，在集合中的元素以约 error_rate 的概率误报。
+    位数组大小和哈希次数按 capacity 和 error_rate 计算，k 个位置由一次 blake2b 摘要双重哈希得到。
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        if capacity <= 0:
+            raise ValueError("bloom filter capacity must be a positive number")
+        if not 0 < error_rate < 1:
+            raise ValueError("bloom filter error rate must be in (0, 1)")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        # 步长为奇数，避免与位数组大小有公因子时位置重复
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        # 与 __contains__ 中逐步累加的位置一致
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        # 逐个位置检查，不在集合中的元素通常在前一两个位置就返回
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        position = int.from_bytes(digest[:8], 'little') % self.size
+        step = (int.from_bytes(digest[8:], 'little') | 1) % self.size
+        bits = self._bits
+        for _ in range(self.hash_count):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position = (position + step) % self.size
+        return True
+
+    def estimated_error_rate(self):
+        """按当前元素数量估算的误报率，超过容量后会明显上升"""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+
+class TokenBlocklist:
+    """
+    JWT 撤销列表。
+
+    - 撤销的 jti 写入 Redis 键 {prefix}jti:<jti>，过期时间为令牌剩余有效期，同时记入按过期时间排序的
+      索引 {prefix}index，并通过 {prefix}events 频道广播；
+    - 每个进程维护一个布隆过滤器，启动时从索引加载，之后由后台线程订阅频道增量更新，
+      每 resync_interval 秒全量重建一次以剔除已过期的 jti（布隆过滤器不支持删除）；
+    - 检查时过滤器不包含该 jti 即放行，不访问 Redis；命中（真实撤销或误报）时再查 Redis 确认；
+    - 订阅断开期间过滤器可能缺少新撤销的 jti，此时每次检查都查 Redis；Redis 不可用时以过滤器结果为准。
+    """
+
+    def __init__(self, redis_client, key_prefix='jwt:revoked:', capacity=100000, error_rate=0.001,
+                 resync_interval=300.0, retry_interval=5.0, listen=True, clock=time.time, logger=None):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.resync_interval = resync_interval
+        self.retry_interval = retry_interval
+        # 为 False 时不订阅频道，只靠定期全量同步，其他进程撤销的令牌最多延迟 resync_interval 秒生效
+        self.listen = listen
+        self.clock = clock
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        # 全量同步期间在本进程加入的 jti，同步完成后补进新过滤器
+        self._since_sync = None
+        self._synced_at = None
+        # 过滤器与 Redis 保持同步（已订阅或刚完成同步），只有这时才能仅凭过滤器放行
+        self._live = False
+        self._pid = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        # 统计信息
+        self._checks = 0
+        self._filter_passes = 0
+        self._redis_lookups = 0
+        self._revoked = 0
+        self._lookup_errors = 0
+
+    @property
+    def index_key(self):
+        return f'{self.key_prefix}index'
+
+    @property
+    def channel(self):
+        return f'{self.key_prefix}events'
+
+    def _token_key(self, jti):
+        return f'{self.key_prefix}jti:{jti}'
+
+    def _add_local(self, jti):
+        with self._lock:
+            if self._since_sync is not None:
+                self._since_sync.append(jti)
+            # 本进程撤销的 jti 还会从频道再收到一次，已在过滤器中时不重复计数
+            if jti not in self._filter:
+                self._filter.add(jti)
+
+    def revoke(self, jti, expires_at):
+        """撤销令牌，expires_at 为令牌的 exp（Unix 时间戳）；已过期的令牌无需记录，返回 False"""
+        now = self.clock()
+        ttl = math.ceil(expires_at - now)
+        if ttl <= 0:
+            return False
+        self._add_local(jti)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.setex(self._token_key(jti), ttl, 1)
+        pipe.zadd(self.index_key, {jti: expires_at})
+        # 顺带清理索引中已过期的 jti
+        pipe.zremrangebyscore(self.index_key, '-inf', now)
+        pipe.publish(self.channel, jti)
+        pipe.execute()
+        return True
+
+    def sync(self):
+        """从索引全量重建过滤器，返回加载的 jti 数量"""
+        with self._lock:
+            self._since_sync = []
+        try:
+            members = self.redis_client.zrangebyscore(self.index_key, self.clock(), '+inf')
+        except RedisError:
+            with self._lock:
+                self._since_sync = None
+            raise
+        # 撤销数量超过容量时按实际数量扩容，保持误报率
+        bloom = BloomFilter(max(self.capacity, 2 * len(members)), self.error_rate)
+        for member in members:
+            bloom.add(member.decode('utf-8') if isinstance(member, bytes) else member)
+        with self._lock:
+            for jti in self._since_sync:
+                if jti not in bloom:
+                    bloom.add(jti)
+            self._since_sync = None
+            self._filter = bloom
+            self._synced_at = time.monotonic()
+        return len(members)
+
+    def _resync_due(self):
+        return self._synced_at is None or time.monotonic() - self._synced_at >= self.resync_interval
+
+    def start(self):
+        """首次检查时调用：加载过滤器并启动订阅线程；fork 之后的子进程会重新启动自己的线程"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._live = False
+            self._synced_at = None
+            self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._stop.clear()
+        if self.listen:
+            self._thread = threading.Thread(target=self._listen_loop, name='token-blocklist', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """停止订阅线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._live = False
+        self._pid = None
+
+    def _listen_loop(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                # 先订阅再全量同步，同步期间广播的 jti 不会丢失
+                pubsub.subscribe(self.channel)
+                self.sync()
+                self._live = True
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message['type'] == 'message':
+                        data = message['data']
+                        self._add_local(data.decode('utf-8') if isinstance(data, bytes) else data)
+                    if self._resync_due():
+                        self.sync()
+            except RedisError as e:
+                self._live = False
+                self.logger.warning(f"Token blocklist subscription lost, retrying in {self.retry_interval}s: {e}")
+                self._stop.wait(self.retry_interval)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except RedisError:
+                        pass
+
+    def _refresh(self):
+        # 不订阅时由请求线程按间隔全量同步
+        if self._pid != os.getpid():
+            self.start()
+        if not self.listen and self._resync_due():
+            try:
+                self.sync()
+                self._live = True
+            except RedisError as e:
+                self._live = False
+                self._synced_at = time.monotonic()
+                self.logger.warning(f"Failed to sync token blocklist from Redis: {e}")
+
+    def is_revoked(self, jti):
+        """令牌是否已被撤销：过滤器未命中时直接返回 False，命中或过滤器未同步时查 Redis"""
+        self._refresh()
+        with self._lock:
+            self._checks += 1
+            maybe_revoked = jti in self._filter
+            if self._live and not maybe_revoked:
+                self._filter_passes += 1
+                return False
+            self._redis_lookups += 1
+
+        try:
+            revoked = bool(self.redis_client.exists(self._token_key(jti)))
+        except RedisError as e:
+            self.logger.warning(f"Failed to check token blocklist in Redis: {e}")
+            with self._lock:
+                self._lookup_errors += 1
+            revoked = maybe_revoked
+
+        if revoked:
+            with self._lock:
+                self._revoked += 1
+        return revoked
+
+    def stats(self):
+        """返回撤销检查的统计信息"""
+        with self._lock:
+            bloom = self._filter
+            return {
+                'live': self._live,
+                'checks': self._checks,
+                # 仅凭过滤器放行、未访问 Redis 的次数
+                'filter_passes': self._filter_passes,
+                'redis_lookups': self._redis_lookups,
+                'revoked': self._revoked,
+                'lookup_errors': self._lookup_errors,
+                'filter_entries': bloom.count,
+                'filter_bytes': bloom.nbytes,
+                'filter_error_rate': bloom.estimated_error_rate(),
+            }
+
+
+def _check_if_token_revoked(jwt_header, jwt_payload):
+    blocklist = current_app.token_blocklist
+    return blocklist is not None and blocklist.is_revoked(jwt_payload['jti'])
+
+
+def setup_token_blocklist(app: Flask):
+    """
+    创建 JWT 撤销列表并注册 token_in_blocklist_loader，挂载到 app.token_blocklist；未启用时为 None。
+    订阅线程在首次检查时才启动，避免在 fork 之前的主进程中创建线程。
+    """
+    jwt.token_in_blocklist_loader(_check_if_token_revoked)
+    if not app.config['JWT_BLOCKLIST_ENABLED']:
+        app.token_blocklist = None
+        return None
+
+    app.token_blocklist = TokenBlocklist(
+        app.redis_client,
+        capacity=app.config['JWT_BLOCKLIST_CAPACITY'],
+        error_rate=app.config['JWT_BLOCKLIST_ERROR_RATE'],
+        resync_interval=app.config['JWT_BLOCKLIST_RESYNC_INTERVAL'],
+        logger=app.logger
+    )
+    bloom = app.token_blocklist._filter
+    app.logger.info(
+        f"Token blocklist enabled: capacity={bloom.capacity}, error_rate={bloom.error_rate}, "
+        f"filter_bytes={bloom.nbytes}, hash_count={bloom.hash_count}"
+    )
+    return app.token_blocklist
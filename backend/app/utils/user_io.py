@@ -0,0 +1,245 @@
+import csv
+import io
+from itertools import islice
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from ..extensions import db, password_hasher
+from ..models.department import Department
+from ..models.role import Role
+from ..models.user import User, user_role_association
+
+# 导入文件的列，username 和 password 必填；department 为部门名称，roles 为角色编码，多个用 | 分隔
+IMPORT_COLUMNS = ('username', 'password', 'nickname', 'email', 'phone_number', 'gender', 'department', 'roles')
+REQUIRED_COLUMNS = ('username', 'password')
+# 导出文件的列
+EXPORT_COLUMNS = ('id', 'username', 'nickname', 'email', 'phone_number', 'gender', 'status', 'department', 'roles',
+                  'create_time')
+ROLE_SEPARATOR = '|'
+
+
+class ImportResult:
+    """导入结果：总行数、成功行数、每批进度和行级错误 (行号, 原因)"""
+
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.chunks = []
+        self.errors = []
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'created': self.created,
+            'failed': len(self.errors),
+            'chunks': self.chunks,
+            'errors': [{'line': line, 'message': message} for line, message in self.errors],
+        }
+
+
+class UserImporter:
+    """
+    流式导入用户 CSV。
+
+    按 chunk_size 行分批：解析、校验、并行哈希密码，然后用一条 executemany 插入用户、一条插入角色关联，
+    每批单独提交。校验失败的行记录错误后跳过，某一批写入失败只回滚该批，不影响其他批次。
+    progress(chunk) 在每批完成后调用，chunk 为该批的统计信息。
+    """
+
+    def __init__(self, chunk_size=1000, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.result = ImportResult()
+        # 部门名称和角色编码一次性加载，校验时只做字典查找
+        self.departments = dict(db.session.execute(
+            select(Department.name, Department.id).where(Department.is_delete.is_(False))
+        ).all())
+        self.roles = dict(db.session.execute(
+            select(Role.role_code, Role.id).where(Role.is_delete.is_(False))
+        ).all())
+        # 已导入的唯一字段，用于检查文件内的重复
+        self.seen = {'username': set(), 'email': set(), 'phone_number': set()}
+
+    def run(self, lines):
+        """lines 为逐行迭代的文本（文件对象或字符串列表），返回 ImportResult"""
+        reader = csv.DictReader(lines)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        # 数据从第 2 行开始，第 1 行为表头
+        rows = enumerate(reader, start=2)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        return self.result
+
+    def _existing(self, chunk):
+        """一次查询数据库中已存在的用户名、邮箱和手机号，包括已逻辑删除的用户"""
+        values = {field: {row.get(field) for _, row in chunk if row.get(field)} for field in self.seen}
+        existing = {field: set() for field in self.seen}
+        conditions = [getattr(User, field).in_(items) for field, items in values.items() if items]
+        if conditions:
+            query = (
+                select(User.username, User.email, User.phone_number)
+                .where(or_(*conditions))
+                .execution_options(include_deleted=True)
+            )
+            for row in db.session.execute(query):
+                for field in self.seen:
+                    existing[field].add(getattr(row, field))
+        return existing
+
+    def _validate(self, row, existing):
+        """校验单行，返回 (用户字段, 角色 ID 列表)，不合法时抛出 ValueError"""
+        row = {key: (value or '').strip() for key, value in row.items() if key in IMPORT_COLUMNS}
+        if not row.get('username'):
+            raise ValueError("username is required")
+        if not row.get('password'):
+            raise ValueError("password is required")
+        if len(row['username']) > 64:
+            raise ValueError("username is too long")
+
+        for field in self.seen:
+            value = row.get(field)
+            if value and (value in existing[field] or value in self.seen[field]):
+                raise ValueError(f"{field} '{value}' already exists")
+
+        gender = row.get('gender')
+        if gender and gender not in ('0', '1', '2'):
+            raise ValueError(f"invalid gender '{gender}'")
+
+        department_id = None
+        if row.get('department'):
+            department_id = self.departments.get(row['department'])
+            if department_id is None:
+                raise ValueError(f"department '{row['department']}' not found")
+
+        role_ids = []
+        for role_code in filter(None, (code.strip() for code in row.get('roles', '').split(ROLE_SEPARATOR))):
+            if role_code not in self.roles:
+                raise ValueError(f"role '{role_code}' not found")
+            role_ids.append(self.roles[role_code])
+
+        values = {
+            'username': row['username'],
+            'password': row['password'],
+            'nickname': row.get('nickname') or None,
+            'email': row.get('email') or None,
+            'phone_number': row.get('phone_number') or None,
+            'gender': int(gender) if gender else None,
+            'department_id': department_id,
+        }
+        return values, role_ids
+
+    @staticmethod
+    def _insert_users(users):
+        """
+        插入一批用户，按参数顺序返回新行的 id，不依赖 username 唯一（其他导入可能同时写入同名用户）。
+        支持有序 RETURNING 的数据库（SQLite、PostgreSQL）一条 executemany 完成；
+        MySQL 不支持，逐行插入并读取自增 id。
+        """
+        dialect = db.session.get_bind(mapper=User).dialect
+        if dialect.insert_executemany_returning_sort_by_parameter_order:
+            return db.session.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True), users
+            ).scalars().all()
+        return [db.session.execute(insert(User).values(user)).inserted_primary_key[0] for user in users]
+
+    def _import_chunk(self, chunk):
+        result = self.result
+        existing = self._existing(chunk)
+        errors = []
+        valid = []
+        for line, row in chunk:
+            try:
+                values, role_ids = self._validate(row, existing)
+            except ValueError as e:
+                errors.append((line, str(e)))
+                continue
+            for field in self.seen:
+                if values[field]:
+                    self.seen[field].add(values[field])
+            valid.append((line, values, role_ids))
+
+        created = 0
+        if valid:
+            # 整批密码一次性分发到哈希工作池并行计算
+            hashes = password_hasher.hash_many(values['password'] for _, values, _ in valid)
+            users = [dict(values, password=password_hash) for (_, values, _), password_hash in zip(valid, hashes)]
+            try:
+                ids = self._insert_users(users)
+                associations = [
+                    {'user_id': user_id, 'role_id': role_id}
+                    for user_id, (_, _, role_ids) in zip(ids, valid) for role_id in role_ids
+                ]
+                if associations:
+                    db.session.execute(insert(user_role_association), associations)
+                db.session.commit()
+                created = len(users)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                errors.extend((line, f"database error: {e.__class__.__name__}") for line, _, _ in valid)
+
+        result.total += len(chunk)
+        result.created += created
+        result.errors.extend(errors)
+        summary = {
+            'chunk': len(result.chunks) + 1,
+            'rows': len(chunk),
+            'created': created,
+            'failed': len(errors),
+            'total_created': result.created,
+        }
+        result.chunks.append(summary)
+        if self.progress is not None:
+            self.progress(summary)
+
+
+def import_users(lines, chunk_size=1000, progress=None):
+    """流式导入用户 CSV，返回 ImportResult"""
+    return UserImporter(chunk_size, progress).run(lines)
+
+
+def export_users(batch_size=1000):
+    """
+    逐批生成用户 CSV 文本的生成器，配合流式响应使用。
+    使用服务端游标（yield_per）按批读取，角色编码在同一条查询中聚合，内存占用与表大小无关。
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return value
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield flush()
+
+    # 关联子查询聚合角色编码，避免流式读取过程中在同一连接上发起其他查询
+    roles = (
+        select(func.group_concat(Role.role_code))
+        .join(user_role_association, user_role_association.c.role_id == Role.id)
+        .where(user_role_association.c.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        select(User.id, User.username, User.nickname, User.email, User.phone_number, User.gender, User.status,
+               Department.name.label('department'), roles.label('roles'), User.create_time)
+        .outerjoin(Department, Department.id == User.department_id)
+        .where(User.is_delete.is_(False))
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        for row in partition:
+            writer.writerow([
+                row.id, row.username, row.nickname, row.email, row.phone_number, row.gender, row.status,
+                row.department, ROLE_SEPARATOR.join(sorted(row.roles.split(','))) if row.roles else '',
+                row.create_time.isoformat(),
+            ])
+        yield flush()
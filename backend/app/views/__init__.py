@@ -1,35 +1,51 @@
+import importlib
 import os
 from flask import Flask, Blueprint
 
+# 显式蓝图注册表：app/views 下的模块名，约定蓝图实例变量名为 <模块名>_bp
+# 启动时只导入这里列出的模块，新增蓝图时需要在这里登记（设置 BLUEPRINT_AUTO_DISCOVER=true 时改为扫描目录）
+BLUEPRINTS = (
+    'auth',
+    'menu',
+    'user',
+    'metrics',
+)
+
+
+def discover_blueprints():
+    """扫描 app/views 目录，返回所有视图模块名"""
+    # 动态获取蓝图文件所在的目录
+    blueprint_dir = os.path.dirname(__file__)
+    return sorted(
+        item_name[:-3] for item_name in os.listdir(blueprint_dir)
+        if item_name.endswith('.py') and not item_name.startswith('__')
+    )
+
 
 def register_blueprints(app: Flask):
     """
-    动态注册 app/views 目录下的所有蓝图
+    注册 BLUEPRINTS 中列出的蓝图，蓝图模块在这里才被导入
+    BLUEPRINT_AUTO_DISCOVER 为 true 时改为动态注册 app/views 目录下的所有蓝图
     所有蓝图都将自动添加 '/api' 作为 URL 前缀
     """
-    # 动态获取蓝图文件所在的目录
-    blueprint_dir = os.path.dirname(__file__)
-    # 遍历目录下所有文件和子目录
-    for item_name in os.listdir(blueprint_dir):
-        if item_name.endswith('.py') and not item_name.startswith('__'):
-            module_name = item_name[:-3]
-
-            try:
-                # 动态导入蓝图模块
-                module = __import__(f'app.views.{module_name}', fromlist=[''])  # from app.views.user import *
-                # 约定蓝图实例变量名为 <模块名>_bp
-                blueprint_name = f'{module_name}_bp'
+    module_names = discover_blueprints() if app.config.get('BLUEPRINT_AUTO_DISCOVER') else BLUEPRINTS
+    for module_name in module_names:
+        try:
+            # 以当前包名为前缀导入，保证与 app 包内其他模块使用同一份扩展实例
+            module = importlib.import_module(f'{__name__}.{module_name}')  # from app.views.user import *
+            # 约定蓝图实例变量名为 <模块名>_bp
+            blueprint_name = f'{module_name}_bp'
 
-                # 检查 module 对象是否有一个名为 <模块名>_bp 的属性，确保蓝图实例确实存在于模块中
-                if hasattr(module, blueprint_name) and isinstance(getattr(module, blueprint_name), Blueprint):
-                    blueprint_instance = getattr(module, blueprint_name)
-                    # 在这里统一添加 '/api' 前缀
-                    app.register_blueprint(blueprint_instance, url_prefix='/api')
-                    app.logger.info(f"Registered blueprint: {blueprint_instance.name} with prefix '/api'")
-                else:
-                    app.logger.warning(f"文件 '{item_name}' 不包含名为 '{blueprint_name}' 的蓝图实例。")
+            # 检查 module 对象是否有一个名为 <模块名>_bp 的属性，确保蓝图实例确实存在于模块中
+            if hasattr(module, blueprint_name) and isinstance(getattr(module, blueprint_name), Blueprint):
+                blueprint_instance = getattr(module, blueprint_name)
+                # 在这里统一添加 '/api' 前缀
+                app.register_blueprint(blueprint_instance, url_prefix='/api')
+                app.logger.info(f"Registered blueprint: {blueprint_instance.name} with prefix '/api'")
+            else:
+                app.logger.warning(f"模块 '{module_name}' 不包含名为 '{blueprint_name}' 的蓝图实例。")
 
-            except ImportError as e:
-                app.logger.error(f"导入蓝图模块 '{module_name}' 失败: {e}")
-            except Exception as e:
-                app.logger.error(f"注册蓝图 '{module_name}' 时发生错误: {e}")
+        except ImportError as e:
+            app.logger.error(f"导入蓝图模块 '{module_name}' 失败: {e}")
+        except Exception as e:
+            app.logger.error(f"注册蓝图 '{module_name}' 时发生错误: {e}")
@@ -1,25 +1,46 @@
-from flask import Blueprint, current_app, jsonify, request
-from flask_jwt_extended import create_access_token, set_access_cookies, unset_jwt_cookies
+from flask import Blueprint, current_app, jsonify, make_response, request
+from flask_jwt_extended import (
+    create_access_token, exceptions, get_jwt, set_access_cookies, unset_jwt_cookies, verify_jwt_in_request
+)
+from jwt.exceptions import PyJWTError
 from sqlalchemy.exc import SQLAlchemyError
 import redis
-from app.utils.captcha import Captcha
-from app.extensions import limiter, db
-from app.models.user import User
+from ..utils.captcha import Captcha
+from ..extensions import limiter, db
+from ..models.user import User
+from ..utils.identity import identity_claims
+from ..utils.password import PasswordHasherBusy
 
 
 auth_bp = Blueprint('auth', __name__)
 
 
+# 内容协商：客户端可接受的 MIME 类型 -> 验证码图片格式
+# 默认返回 JSON（base64 PNG）；显式请求图片时直接返回图片字节，uuid 放在响应头中
+CAPTCHA_RESPONSE_TYPES = {
+    'application/json': None,
+    'image/png': 'png8',
+    'image/webp': 'webp',
+}
+
+
 @auth_bp.route('/captcha', methods=['POST'])
 @limiter.limit("10 per minute")  # 限制为每分钟 10 次
 def get_captcha():
     """
     生成并返回验证码图片
+    Accept 为 image/png 或 image/webp 时返回图片字节，验证码 ID 放在 X-Captcha-Id 响应头中
     """
+    mimetype = request.accept_mimetypes.best_match(CAPTCHA_RESPONSE_TYPES, default='application/json')
+    image_format = CAPTCHA_RESPONSE_TYPES[mimetype]
+
     try:
         # 使用 Captcha 类生成验证码
-        captcha_gen = Captcha(current_app.redis_client)
-        captcha_id, base64_data = captcha_gen.generate_captcha_base64()
+        captcha_gen = Captcha(current_app.captcha_store, pool=current_app.captcha_pool)
+        if image_format is None:
+            captcha_id, base64_data = captcha_gen.generate_captcha_base64()
+        else:
+            captcha_id, image_bytes = captcha_gen.generate_captcha(image_format)
     except redis.exceptions.ConnectionError:
         current_app.logger.error("Failed to connect to Redis for captcha generation.")
         return jsonify({"message": "获取验证码失败，服务器内部错误。"}), 500
@@ -30,7 +51,16 @@ def get_captcha():
     if not captcha_id:
         return jsonify({"error": "Failed to generate captcha"}), 500
 
-    return jsonify({'code': 0, 'data': {'img': base64_data, 'uuid': captcha_id}, 'message': 'success'})
+    if image_format is not None:
+        response = make_response(image_bytes)
+        response.mimetype = mimetype
+        response.headers['X-Captcha-Id'] = captcha_id
+    else:
+        response = jsonify({'code': 0, 'data': {'img': base64_data, 'uuid': captcha_id}, 'message': 'success'})
+    # 两种表示都按 Accept 协商，共享缓存不能把一种表示返回给另一种请求；验证码一次性使用，不缓存
+    response.headers['Cache-Control'] = 'no-store'
+    response.vary.add('Accept')
+    return response
 
 
 @auth_bp.route('/login', methods=['POST'])
@@ -50,8 +80,17 @@ def login_user():
         return jsonify({"code": -1, "data": None, "message": "用户名、密码、验证码ID和验证码是必填项。"}), 400
 
     try:
+        # 0. 账号锁定检查，在验证码、数据库查询和密码哈希之前，被拒绝的请求只花费一次 Redis 调用
+        guard = current_app.login_guard
+        locked_for = guard.locked_for(username)
+        if locked_for:
+            guard.record_rejected()
+            response = jsonify({"code": -1, "data": None, "message": f"登录失败次数过多，请 {locked_for} 秒后再试。"})
+            response.headers['Retry-After'] = str(locked_for)
+            return response, 429
+
         # 实例化 Captcha 类
-        captcha_gen = Captcha(current_app.redis_client)
+        captcha_gen = Captcha(current_app.captcha_store)
 
         # 1. 验证码验证
         if not captcha_gen.verify_captcha(captcha_id, captcha_code):
@@ -61,9 +100,20 @@ def login_user():
         user = User.query.filter_by(username=username).first()
 
         # 验证用户是否存在且密码正确
-        if user and user.check_password(user.password_hash, password):
+        if user and user.check_password(password):
+            # 哈希参数调整后，借登录成功时拿到的明文按新参数重新哈希
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+
+            guard.record_success(username)
+
             # 密码验证成功，生成 JWT 令牌
-            access_token = create_access_token(identity=str(user.id))
+            # 令牌中附带角色编码、部门和权限版本号，其他服务无需查询即可读取
+            access_token = create_access_token(
+                identity=str(user.id),
+                additional_claims=identity_claims(user, current_app.permission_cache.current_version())
+            )
 
             # 构造响应
             response = jsonify({"code": 0, "data": None, "message": "login successful"})
@@ -73,7 +123,12 @@ def login_user():
 
             return response
         else:
+            guard.record_failure(username)
             return jsonify({"code": -1, "data": None, "message": "用户名或密码不正确。"}), 401
+    except PasswordHasherBusy:
+        # 交给全局错误处理返回 503，不计入登录失败
+        db.session.rollback()
+        raise
     except (redis.exceptions.ConnectionError, SQLAlchemyError):
         current_app.logger.error("Failed to connect to Redis for captcha generation.")
         db.session.rollback()
@@ -96,11 +151,26 @@ def register_user():
 def logout_user():
     """
     用户注销接口
+    请求中带有有效令牌时将其撤销，撤销后的令牌在剩余有效期内不能再访问接口
     """
+    try:
+        verify_jwt_in_request(optional=True)
+        claims = get_jwt()
+    except (exceptions.JWTExtendedException, PyJWTError):
+        # 令牌已过期、已撤销或无效，无需撤销，只清除 Cookie
+        claims = {}
+
+    blocklist = current_app.token_blocklist
+    if claims and blocklist is not None:
+        try:
+            blocklist.revoke(claims['jti'], claims['exp'])
+        except redis.exceptions.RedisError as e:
+            current_app.logger.error(f"Failed to revoke token on logout: {e}")
+            return jsonify({"code": -1, "data": None, "message": "系统错误，请稍后再试。"}), 500
+
     response = jsonify({"msg": "Logout successful"})
     unset_jwt_cookies(response)  # Flask-JWT-Extended 提供的工具方法
     return response
-    pass
 
 
 @auth_bp.route("reset-password", methods=["POST"])
@@ -0,0 +1,25 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from ..utils.response import ApiResponse, ResponseCode
+
+menu_bp = Blueprint('menu', __name__)
+
+
+@menu_bp.route('/menus/tree', methods=['GET'])
+@jwt_required()
+def get_menu_tree():
+    """
+    获取当前用户可见的菜单树（侧边栏）
+    响应带 ETag，客户端携带 If-None-Match 且菜单未变化时返回 304，不返回响应体
+    """
+    entry = current_app.menu_tree_cache.get_for_user(int(get_jwt_identity()))
+    if entry is None:
+        data, status_code = ApiResponse.error(ResponseCode.USER_NOT_FOUND)
+        return jsonify(data), status_code
+
+    body, etag = entry
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # 浏览器可以缓存，但每次使用前都需要向服务端验证
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
@@ -0,0 +1,27 @@
+import hmac
+from flask import Blueprint, abort, current_app, request
+from ..extensions import limiter
+from ..utils.metrics import OPEN_METRICS_ENVS
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Prometheus 文本格式
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@limiter.exempt
+def get_metrics():
+    """
+    Prometheus 指标：各端点的请求耗时直方图、SQL 与 Redis 调用次数和耗时
+    未启用时返回 404；配置了 METRICS_TOKEN 时需要携带 Authorization: Bearer <token>，
+    未配置时只在开发和测试环境开放，其他环境返回 404，避免对外暴露路由和连接池等内部信息
+    """
+    if current_app.metrics is None:
+        abort(404)
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token and current_app.config.get('FLASK_ENV') not in OPEN_METRICS_ENVS:
+        abort(404)
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return current_app.response_class(current_app.metrics.render(), content_type=CONTENT_TYPE)
@@ -1,30 +1,176 @@
-from flask import Blueprint, jsonify
+import base64
+import binascii
+import io
+import json
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+from ..extensions import db
+from ..models.department import Department
+from ..models.role import Role
+from ..models.user import User
+from ..utils.identity import serialize_user
+from ..utils.permission import require_permission
+from ..utils.response_cache import cached_response
+from ..utils.response import ApiResponse, ResponseCode
+from ..utils.user_io import export_users, import_users
 
 user_bp = Blueprint('user', __name__)
 
+# 用户列表每页默认数量和上限
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(user):
+    """把最后一行的 (create_time, id) 编码为不透明的游标"""
+    raw = json.dumps([user.create_time.isoformat(), user.id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        create_time, user_id = json.loads(raw)
+        return datetime.fromisoformat(create_time), int(user_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _int_arg(name):
+    value = request.args.get(name)
+    return None if value in (None, '') else int(value)
+
 
 @user_bp.route('/users/me', methods=['GET'])
+@jwt_required()
 def get_current_user():
     """
-    获取当前登录用户信息
+    获取当前登录用户信息，由 user_lookup_loader 从身份信息缓存中加载，缓存命中时不查询数据库
     :return:
     """
-    return jsonify({'code': 0, 'data': 'asdf', 'message': 'success'})
+    data, status_code = ApiResponse.success(dict(current_user))
+    return jsonify(data), status_code
 
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
+@require_permission('system:user:list')
+@cached_response(ttl=60, tags=[User, Department, Role])
 def get_user(user_id):
     """
     获取指定用户信息
     :param user_id:
     :return:
     """
+    user = db.session.execute(
+        select(User)
+        .options(joinedload(User.department), selectinload(User.roles))
+        .where(User.id == user_id, User.is_delete.is_(False))
+    ).scalar_one_or_none()
+    if user is None:
+        data, status_code = ApiResponse.error(ResponseCode.USER_NOT_FOUND)
+        return jsonify(data), status_code
+
+    data, status_code = ApiResponse.success(serialize_user(user))
+    return jsonify(data), status_code
 
 
 @user_bp.route('/users', methods=['GET'])
+@require_permission('system:user:list')
 def list_users():
     """
-    获取用户列表
+    获取用户列表，按创建时间倒序，使用游标分页
+    查询参数：
+    - limit：每页数量，默认 20，最大 100；
+    - cursor：上一页返回的 next_cursor，为空时从第一页开始；
+    - status：按状态过滤；
+    - department_id：按部门过滤，包含所有下级部门；
+    - role_id：按角色过滤。
+    每页固定两次查询：用户（连同部门）一次，角色一次
+    :return:
+    """
+    try:
+        limit = min(max(_int_arg('limit') or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        status = _int_arg('status')
+        department_id = _int_arg('department_id')
+        role_id = _int_arg('role_id')
+        cursor = request.args.get('cursor')
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        data, status_code = ApiResponse.error(ResponseCode.BAD_REQUEST, message=str(e))
+        return jsonify(data), status_code
+
+    query = (
+        select(User)
+        .options(joinedload(User.department), selectinload(User.roles))
+        .where(User.is_delete.is_(False))
+    )
+    if status is not None:
+        query = query.where(User.status == status)
+    if department_id is not None:
+        query = query.where(User.department_id.in_(
+            select(Department.id).where(Department.subtree_condition(department_id))
+        ))
+    if role_id is not None:
+        query = query.where(User.roles.any(Role.id == role_id))
+    if position is not None:
+        # 展开的行值比较，MySQL 和 SQLite 都能利用 (create_time, id) 索引
+        create_time, user_id = position
+        query = query.where(
+            (User.create_time < create_time) | ((User.create_time == create_time) & (User.id < user_id))
+        )
+
+    # 多取一行判断是否还有下一页
+    users = db.session.execute(
+        query.order_by(User.create_time.desc(), User.id.desc()).limit(limit + 1)
+    ).scalars().all()
+    has_more = len(users) > limit
+    users = users[:limit]
+
+    data, status_code = ApiResponse.success({
+        'items': [serialize_user(user) for user in users],
+        'next_cursor': encode_cursor(users[-1]) if has_more else None,
+    })
+    return jsonify(data), status_code
+
+
+@user_bp.route('/users/import', methods=['POST'])
+@require_permission('system:user:import')
+def import_users_file():
+    """
+    批量导入用户，上传字段名为 file 的 UTF-8 CSV 文件
+    列：username、password（必填）、nickname、email、phone_number、gender、department（部门名称）、
+    roles（角色编码，多个用 | 分隔）
+    逐批写入，返回每批进度和行级错误，部分行失败不影响其他行
+    :return:
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        data, status_code = ApiResponse.error(ResponseCode.BAD_REQUEST, message="请上传 CSV 文件。")
+        return jsonify(data), status_code
+
+    lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    try:
+        result = import_users(lines, chunk_size=current_app.config['USER_IMPORT_CHUNK_SIZE'])
+    except (ValueError, UnicodeDecodeError) as e:
+        data, status_code = ApiResponse.error(ResponseCode.BAD_REQUEST, message=str(e))
+        return jsonify(data), status_code
+
+    data, status_code = ApiResponse.success(result.to_dict())
+    return jsonify(data), status_code
+
+
+@user_bp.route('/users/export', methods=['GET'])
+@require_permission('system:user:export')
+def export_users_file():
+    """
+    以 CSV 流式导出全部用户，边查询边输出，内存占用与用户数量无关
     :return:
     """
-    pass
+    rows = export_users(batch_size=current_app.config['USER_EXPORT_BATCH_SIZE'])
+    response = current_app.response_class(stream_with_context(rows), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=users.csv'
+    return response
@@ -0,0 +1,44 @@
+"""
+验证码渲染基准测试：对比 SimpleRenderer 与 AtlasRenderer 的每秒出图数量。
+
+运行方式（在 backend 目录下）：
+    python -m tests.benchmark.bench_captcha_render [次数]
+"""
+import io
+import random
+import string
+import sys
+import time
+from app.utils.captcha_render import SimpleRenderer, AtlasRenderer
+
+WIDTH, HEIGHT, CODE_LENGTH = 120, 40, 4
+CHARACTERS = string.ascii_uppercase + string.digits
+
+
+def bench(renderer, rounds, encode):
+    codes = [''.join(random.choices(CHARACTERS, k=CODE_LENGTH)) for _ in range(rounds)]
+    started = time.perf_counter()
+    for code in codes:
+        image = renderer.render(code)
+        if encode:
+            image.save(io.BytesIO(), format="PNG")
+    elapsed = time.perf_counter() - started
+    return rounds / elapsed
+
+
+def main(rounds=2000):
+    atlas = AtlasRenderer(WIDTH, HEIGHT)
+    atlas.warm_up(CHARACTERS)
+    renderers = [('simple', SimpleRenderer(WIDTH, HEIGHT)), ('atlas', atlas)]
+
+    print(f"captcha {WIDTH}x{HEIGHT}, {CODE_LENGTH} chars, {rounds} rounds")
+    for encode in (False, True):
+        label = 'render + png' if encode else 'render only'
+        results = {name: bench(renderer, rounds, encode) for name, renderer in renderers}
+        for name, rate in results.items():
+            print(f"  {label:<13} {name:<7} {rate:10.1f} images/sec")
+        print(f"  {label:<13} speedup {results['atlas'] / results['simple']:9.2f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,63 @@
+"""
+密码哈希基准测试：不同哈希方法/成本参数下，每个核心每秒可完成的登录校验次数。
+
+运行方式（在 backend 目录下）：
+    python -m tests.benchmark.bench_password_hash [秒数] [工作进程数]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash
+from app.utils.password import PasswordHasher
+
+METHODS = [
+    'pbkdf2:sha256:100000',
+    'pbkdf2:sha256:300000',
+    'pbkdf2:sha256:600000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+    'scrypt:65536:8:1',
+]
+
+
+def bench(hasher, password_hash, seconds, concurrency):
+    """并发调用 verify，统计每秒完成次数"""
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        count = 0
+        while time.perf_counter() < deadline:
+            hasher.verify(password_hash, 'benchmark-password')
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        total = sum(executor.map(lambda _: worker(), range(concurrency)))
+    return total / (time.perf_counter() - started)
+
+
+def main(seconds=2.0, workers=None):
+    workers = workers or os.cpu_count() or 1
+    print(f"password hash verify, {seconds}s per setting, process pool of {workers} workers")
+    print(f"  {'method':<24}{'inline/s':>12}{'pool/s':>12}{'pool/s/core':>14}{'latency ms':>12}")
+    for method in METHODS:
+        password_hash = generate_password_hash('benchmark-password', method)
+
+        inline = PasswordHasher(method=method, executor='inline')
+        inline_rate = bench(inline, password_hash, seconds, 1)
+
+        pool = PasswordHasher(method=method, executor='process', workers=workers)
+        pool.verify(password_hash, 'warm-up')  # 启动工作进程不计入
+        pool_rate = bench(pool, password_hash, seconds, workers * 2)
+        pool.shutdown()
+
+        print(f"  {method:<24}{inline_rate:>12.1f}{pool_rate:>12.1f}{pool_rate / workers:>14.1f}{1000 / inline_rate:>12.1f}")
+
+
+if __name__ == '__main__':
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 2.0,
+        int(sys.argv[2]) if len(sys.argv) > 2 else None
+    )
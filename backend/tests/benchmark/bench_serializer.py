@@ -0,0 +1,86 @@
+"""
+序列化基准测试：从数据库加载的 10k 个 User 对象经旧路径（逐属性 getattr 拼字典 + Flask 默认 JSON provider）
+和新路径（预编译列访问器 + FastJSONProvider）序列化为 JSON 的耗时。
+
+运行方式（在 backend 目录下）：
+    FLASK_ENV=testing python -m tests.benchmark.bench_serializer [行数] [轮数]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from app import create_app
+from app.extensions import db
+from app.models.user import User
+from app.utils import json_provider
+from app.utils.serializer import serializer_for
+
+FIELDS = ('id', 'username', 'nickname', 'department_id', 'phone_number', 'email', 'is_admin', 'gender',
+          'login_ip', 'status', 'is_delete', 'create_time', 'update_time', 'create_by', 'update_by', 'remark')
+
+
+def load_users(count):
+    """写入 count 个用户后重新从数据库加载，所有列都已加载到实例中"""
+    created = datetime(2024, 1, 1)
+    db.session.execute(insert(User), [
+        dict(username=f'user{i}', nickname=f'用户{i}', phone_number=f'138{i:08d}', email=f'user{i}@example.com',
+             is_admin=False, gender=i % 3, login_ip='10.0.0.1', create_time=created + timedelta(seconds=i),
+             password='hash')
+        for i in range(count)
+    ])
+    db.session.commit()
+    return User.query.order_by(User.id).all()
+
+
+def old_to_dict(user):
+    """视图中手写的 to_dict：逐个属性访问"""
+    return {field: getattr(user, field) for field in FIELDS}
+
+
+def bench(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(count=10000, rounds=5):
+    # 使用测试配置（内存 SQLite）
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        run(app, load_users(count), rounds)
+
+
+def run(app, users, rounds):
+    old_provider = DefaultJSONProvider(app)
+    new_provider = app.json
+    serializer = serializer_for(User, fields=FIELDS)
+
+    paths = [
+        ('old: getattr + jsonify', lambda: old_provider.dumps([old_to_dict(user) for user in users]).encode('utf-8')),
+        ('new: serializer + provider', lambda: new_provider.dumpb(serializer.many(users))),
+        ('  dict only (old)', lambda: [old_to_dict(user) for user in users]),
+        ('  dict only (new)', lambda: serializer.many(users)),
+    ]
+    print(f"serialize {len(users)} users, best of {rounds} rounds, JSON backend: {new_provider.backend}")
+    baseline = None
+    for name, func in paths:
+        elapsed = bench(func, rounds)
+        baseline = baseline or elapsed
+        print(f"  {name:<30}{elapsed * 1000:>10.1f} ms{baseline / elapsed:>8.2f}x")
+
+    if json_provider.orjson is None:
+        print("  (install orjson to enable the fast JSON backend)")
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    )
@@ -0,0 +1,78 @@
+"""
+JWT 撤销列表基准测试：
+- 布隆过滤器在容量内装满撤销的 jti 后，对未撤销 jti 的实测误报率与目标误报率、内存占用；
+- 单次检查耗时：仅过滤器放行（未撤销令牌的常见路径）与每次都查 Redis 的朴素撤销列表。
+
+运行方式（在 backend 目录下）：
+    python -m tests.benchmark.bench_token_blocklist [容量] [探测次数]
+Redis 使用 REDIS_URI，不可达时只输出过滤器的数据。
+"""
+import os
+import sys
+import time
+import uuid
+from redis import Redis
+from redis.exceptions import RedisError
+from app.utils.token_blocklist import BloomFilter, TokenBlocklist
+
+
+def per_call(func, items):
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items)
+
+
+def measure_filters(capacity, probes):
+    revoked = [uuid.uuid4().hex for _ in range(capacity)]
+    active = [uuid.uuid4().hex for _ in range(probes)]
+    print(f"bloom filter, {capacity} revoked jti, {probes} unrevoked probes")
+    print(f"  {'target':>8}{'measured':>10}{'estimated':>11}{'bytes':>10}{'k':>4}{'check':>10}")
+    for error_rate in (0.01, 0.001, 0.0001):
+        bloom = BloomFilter(capacity, error_rate)
+        for jti in revoked:
+            bloom.add(jti)
+        false_positives = sum(jti in bloom for jti in active)
+        check = per_call(bloom.__contains__, active)
+        print(f"  {error_rate:>8}{false_positives / probes:>10.5f}{bloom.estimated_error_rate():>11.5f}"
+              f"{bloom.nbytes:>10}{bloom.hash_count:>4}{check * 1e6:>8.2f}us")
+
+
+def measure_checks(redis_client, capacity, probes):
+    blocklist = TokenBlocklist(redis_client, key_prefix='bench:jwt:', capacity=capacity, listen=False)
+    revoked = [uuid.uuid4().hex for _ in range(min(capacity, 1000))]
+    expires_at = time.time() + 60
+    for jti in revoked:
+        blocklist.revoke(jti, expires_at)
+    blocklist.sync()
+    active = [uuid.uuid4().hex for _ in range(probes)]
+    sample = active[:min(probes, 2000)]
+
+    paths = [
+        ('redis EXISTS per check', lambda jti: redis_client.exists(f'bench:jwt:jti:{jti}'), sample),
+        ('blocklist, unrevoked', blocklist.is_revoked, active),
+        ('blocklist, revoked', blocklist.is_revoked, revoked),
+    ]
+    print(f"per-check latency, {len(revoked)} revoked jti")
+    for name, func, items in paths:
+        print(f"  {name:<28}{per_call(func, items) * 1e6:>10.2f} us")
+    stats = blocklist.stats()
+    print(f"  redis lookups for {stats['checks']} checks: {stats['redis_lookups']}")
+    redis_client.delete(*(f'bench:jwt:jti:{jti}' for jti in revoked), 'bench:jwt:index')
+
+
+def main(capacity=100000, probes=200000):
+    measure_filters(capacity, probes)
+
+    redis_client = Redis.from_url(os.getenv('REDIS_URI', 'redis://localhost:6379/0'),
+                                  socket_connect_timeout=1, socket_timeout=2)
+    try:
+        redis_client.ping()
+    except RedisError as e:
+        print(f"Redis unavailable, skipping per-check latency with Redis: {e}")
+        return
+    measure_checks(redis_client, capacity, probes)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -2,7 +2,10 @@ import os
 import pytest
 from unittest.mock import MagicMock
 import time
+import threading
+from contextlib import contextmanager
 from backend.app import create_app
+from backend.app.utils.query_profiler import track_queries
 
 
 @pytest.fixture(scope="module")
@@ -27,11 +30,14 @@ def app():
 @pytest.fixture
 def redis_mock():
     """
-    模拟 Redis 客户端，支持 set、setex、get 和 delete，并模拟过期时间。
+    模拟 Redis 客户端，支持 set（含 nx、px）、setex、get、mget、delete、getdel、eval、incr、expire、pttl、
+    hincrby、hgetall、exists、zadd、zrangebyscore、zremrangebyscore、publish 和 pipeline，并模拟过期时间。
+    Redis 单线程执行命令，这里用一把锁保证每个命令的原子性。
     """
     mock_client = MagicMock()
     mock_data = {}  # 存储键值对
     mock_expiry = {}  # 存储键的过期时间
+    lock = threading.RLock()
 
     def normalize_key(key):
         """规范化键为字符串"""
@@ -41,11 +47,17 @@ def redis_mock():
         """规范化值为字节串，模仿 Redis 行为"""
         return value.encode('utf-8') if isinstance(value, str) else value
 
-    def set_mock(name, value, ex=None):
-        """模拟 Redis 的 set 方法"""
+    def set_mock(name, value, ex=None, px=None, nx=False):
+        """模拟 Redis 的 set 方法，nx=True 时键已存在则不写入并返回 None"""
         key = normalize_key(name)
+        purge_expired(key)
+        if nx and key in mock_data:
+            return None
         value = normalize_value(value)
         mock_data[key] = value
+        mock_expiry.pop(key, None)
+        if px is not None:
+            ex = px / 1000
         if ex is not None:
             if not isinstance(ex, (int, float)) or ex <= 0:
                 raise ValueError("expire time must be a positive number")
@@ -56,25 +68,174 @@ def redis_mock():
         """模拟 Redis 的 setex 方法"""
         return set_mock(name, value, ex=expire_time)
 
-    def get_mock(name):
-        """模拟 Redis 的 get 方法，检查过期时间"""
-        key = normalize_key(name)
+    def purge_expired(key):
+        """惰性删除已过期的键"""
         if key in mock_expiry and time.time() > mock_expiry[key]:
             mock_data.pop(key, None)
             mock_expiry.pop(key, None)
-            return None
+
+    def get_mock(name):
+        """模拟 Redis 的 get 方法，检查过期时间"""
+        key = normalize_key(name)
+        purge_expired(key)
         return mock_data.get(key)
 
-    def delete_mock(name):
-        """模拟 Redis 的 delete 方法"""
+    def mget_mock(names):
+        """模拟 Redis 的 mget 方法"""
+        return [get_mock(name) for name in names]
+
+    def delete_mock(*names):
+        """模拟 Redis 的 delete 方法，返回删除的键数量"""
+        deleted = 0
+        for name in names:
+            key = normalize_key(name)
+            purge_expired(key)
+            mock_expiry.pop(key, None)
+            deleted += mock_data.pop(key, None) is not None
+        return deleted
+
+    def incr_mock(name, amount=1):
+        """模拟 Redis 的 incr 方法"""
         key = normalize_key(name)
-        mock_expiry.pop(key, None)
-        return mock_data.pop(key, None) is not None
+        purge_expired(key)
+        value = int(mock_data.get(key, b'0')) + amount
+        mock_data[key] = str(value).encode('utf-8')
+        return value
+
+    def expire_mock(name, seconds):
+        """模拟 Redis 的 expire 方法"""
+        key = normalize_key(name)
+        purge_expired(key)
+        if key not in mock_data:
+            return False
+        mock_expiry[key] = time.time() + seconds
+        return True
+
+    def pttl_mock(name):
+        """模拟 Redis 的 pttl 方法：不存在返回 -2，没有过期时间返回 -1"""
+        key = normalize_key(name)
+        purge_expired(key)
+        if key not in mock_data:
+            return -2
+        if key not in mock_expiry:
+            return -1
+        return int((mock_expiry[key] - time.time()) * 1000)
+
+    def hincrby_mock(name, field, amount=1):
+        """模拟 Redis 的 hincrby 方法"""
+        key = normalize_key(name)
+        purge_expired(key)
+        field = normalize_value(field)
+        hash_value = mock_data.setdefault(key, {})
+        hash_value[field] = str(int(hash_value.get(field, b'0')) + amount).encode('utf-8')
+        return int(hash_value[field])
+
+    def hgetall_mock(name):
+        """模拟 Redis 的 hgetall 方法"""
+        key = normalize_key(name)
+        purge_expired(key)
+        return dict(mock_data.get(key, {}))
 
-    mock_client.set.side_effect = set_mock
-    mock_client.setex.side_effect = setex_mock
-    mock_client.get.side_effect = get_mock
-    mock_client.delete.side_effect = delete_mock
+    def exists_mock(*names):
+        """模拟 Redis 的 exists 方法，返回存在的键数量"""
+        return sum(get_mock(name) is not None for name in names)
+
+    def zadd_mock(name, mapping):
+        """模拟 Redis 的 zadd 方法，有序集合存为 {成员: 分数}"""
+        key = normalize_key(name)
+        purge_expired(key)
+        zset = mock_data.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            member = normalize_value(member)
+            added += member not in zset
+            zset[member] = float(score)
+        return added
+
+    def zrangebyscore_mock(name, min, max):
+        """模拟 Redis 的 zrangebyscore 方法，按分数升序返回成员"""
+        key = normalize_key(name)
+        purge_expired(key)
+        zset = mock_data.get(key, {})
+        return [member for member, score in sorted(zset.items(), key=lambda item: item[1])
+                if float(min) <= score <= float(max)]
+
+    def zremrangebyscore_mock(name, min, max):
+        """模拟 Redis 的 zremrangebyscore 方法，返回删除的成员数量"""
+        key = normalize_key(name)
+        zset = mock_data.get(key, {})
+        removed = [member for member, score in zset.items() if float(min) <= score <= float(max)]
+        for member in removed:
+            del zset[member]
+        return len(removed)
+
+    def publish_mock(channel, message):
+        """模拟 Redis 的 publish 方法，消息记录在 mock_client.published 中"""
+        mock_client.published.append((normalize_key(channel), normalize_value(message)))
+        return 0
+
+    def getdel_mock(name):
+        """模拟 Redis 的 getdel 方法，读取并删除在一个原子操作内完成"""
+        with lock:
+            value = get_mock(name)
+            delete_mock(name)
+            return value
+
+    def eval_mock(script, numkeys, *keys_and_args):
+        """模拟 Redis 的 eval 方法，仅支持验证码使用的读取并删除脚本"""
+        return getdel_mock(keys_and_args[0])
+
+    def atomic(func):
+        def wrapper(*args, **kwargs):
+            with lock:
+                return func(*args, **kwargs)
+        return wrapper
+
+    mock_client.set.side_effect = atomic(set_mock)
+    mock_client.setex.side_effect = atomic(setex_mock)
+    mock_client.get.side_effect = atomic(get_mock)
+    mock_client.mget.side_effect = atomic(mget_mock)
+    mock_client.delete.side_effect = atomic(delete_mock)
+    mock_client.getdel.side_effect = getdel_mock
+    mock_client.eval.side_effect = eval_mock
+    mock_client.incr.side_effect = atomic(incr_mock)
+    mock_client.expire.side_effect = atomic(expire_mock)
+    mock_client.pttl.side_effect = atomic(pttl_mock)
+    mock_client.hincrby.side_effect = atomic(hincrby_mock)
+    mock_client.hgetall.side_effect = atomic(hgetall_mock)
+    mock_client.exists.side_effect = atomic(exists_mock)
+    mock_client.zadd.side_effect = atomic(zadd_mock)
+    mock_client.zrangebyscore.side_effect = atomic(zrangebyscore_mock)
+    mock_client.zremrangebyscore.side_effect = atomic(zremrangebyscore_mock)
+    mock_client.published = []
+    mock_client.publish.side_effect = atomic(publish_mock)
+
+    def pipeline_mock(transaction=True):
+        """模拟 Redis 的 pipeline：命令先排队，execute 时在一把锁内依次执行并返回结果列表"""
+        pipe = MagicMock()
+        commands = []
+
+        def queue(command):
+            def wrapper(*args, **kwargs):
+                commands.append((command, args, kwargs))
+                return pipe
+            return wrapper
+
+        for command in ('set', 'setex', 'get', 'delete', 'incr', 'expire', 'pttl', 'hincrby', 'hgetall',
+                        'exists', 'zadd', 'zremrangebyscore', 'publish'):
+            getattr(pipe, command).side_effect = queue(command)
+
+        def execute():
+            with lock:
+                results = [getattr(mock_client, command)(*args, **kwargs) for command, args, kwargs in commands]
+            commands.clear()
+            return results
+
+        pipe.execute.side_effect = execute
+        pipe.__enter__.return_value = pipe
+        return pipe
+
+    mock_client.pipeline.side_effect = pipeline_mock
 
     return mock_client
 
@@ -88,6 +249,22 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture
+def query_budget(app):
+    """
+    限制代码块内执行的 SQL 数量，超出时测试失败，并列出各形状语句的次数和 N+1 的来源：
+        with query_budget(2):
+            client.get('/api/users')
+    """
+    @contextmanager
+    def budget(max_queries, n_plus_one_threshold=5):
+        with track_queries(n_plus_one_threshold, explain=False) as recorder:
+            yield recorder
+        if recorder.queries > max_queries:
+            pytest.fail(f"Query budget exceeded: {recorder.queries} > {max_queries}\n{recorder.report()}")
+    return budget
+
+
 # @pytest.fixture
 # def authenticated_client(client):
 #     """已认证的测试客户端"""
@@ -0,0 +1,175 @@
+import io
+import base64
+import pytest
+from PIL import Image
+from flask_jwt_extended import decode_token
+from werkzeug.security import generate_password_hash
+from backend.app.extensions import db, limiter, password_hasher
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.captcha_store import MemoryCaptchaStore
+from backend.app.utils.login_guard import LoginGuard
+from backend.app.utils.password import PasswordHasherBusy
+
+
+@pytest.fixture
+def captcha_client(app, client, monkeypatch):
+    """使用进程内验证码存储的测试客户端"""
+    monkeypatch.setattr(app, 'captcha_store', MemoryCaptchaStore())
+    return client
+
+
+def test_captcha_default_json(app, captcha_client):
+    """默认返回 JSON，图片为 base64 PNG"""
+    response = captcha_client.post('/api/captcha')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert 'Accept' in response.vary
+    assert response.headers['Cache-Control'] == 'no-store'
+    data = response.get_json()['data']
+    image = Image.open(io.BytesIO(base64.b64decode(data['img'])))
+    assert image.format == 'PNG'
+    assert app.captcha_store.take(f"captcha:{data['uuid']}") is not None, "Captcha code should be stored"
+
+
+def test_captcha_binary_png(app, captcha_client):
+    """Accept: image/png 时直接返回调色板 PNG 字节，uuid 在响应头中"""
+    response = captcha_client.post('/api/captcha', headers={'Accept': 'image/png'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert 'Accept' in response.vary
+    image = Image.open(io.BytesIO(response.data))
+    assert image.format == 'PNG'
+    assert image.mode == 'P', "Binary PNG should be palette-reduced"
+
+    captcha_id = response.headers['X-Captcha-Id']
+    assert app.captcha_store.take(f"captcha:{captcha_id}") is not None, "Captcha code should be stored"
+
+
+def test_captcha_binary_webp(captcha_client):
+    """只接受 webp 时返回 webp 图片"""
+    response = captcha_client.post('/api/captcha', headers={'Accept': 'image/webp'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert Image.open(io.BytesIO(response.data)).format == 'WEBP'
+
+
+def test_captcha_binary_smaller_than_json(captcha_client):
+    """二进制响应体积明显小于 JSON 响应"""
+    json_response = captcha_client.post('/api/captcha')
+    binary_response = captcha_client.post('/api/captcha', headers={'Accept': 'image/png'})
+
+    assert len(binary_response.data) * 2 < len(json_response.data)
+
+
+@pytest.fixture
+def login_guard(app, redis_mock, monkeypatch):
+    """使用 mock redis 的登录失败保护"""
+    guard = LoginGuard(redis_mock, threshold=3, lockout_base=30)
+    monkeypatch.setattr(app, 'login_guard', guard)
+    return guard
+
+
+@pytest.fixture
+def login_user(app, login_guard):
+    """创建数据表和一个测试用户，测试结束后清理"""
+    limiter.reset()
+    db.create_all()
+    user = User(username='tester')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    yield user
+    db.session.remove()
+    db.drop_all()
+
+
+def issue_captcha(app, code='ABCD'):
+    app.captcha_store.setex('captcha:login-test', 60, code)
+    return {'captcha_id': 'login-test', 'captcha_code': code}
+
+
+def test_login_success_sets_cookie(app, client, login_user):
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+
+    assert response.status_code == 200
+    assert response.get_json()['code'] == 0
+    assert 'access_token_cookie' in response.headers.get('Set-Cookie', '')
+
+
+def test_login_token_carries_claims(app, client, login_user):
+    role = Role(role_code='editor', name='编辑')
+    login_user.roles.append(role)
+    db.session.commit()
+
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+
+    cookie = next(value for value in response.headers.getlist('Set-Cookie') if value.startswith('access_token_cookie='))
+    claims = decode_token(cookie.split(';', 1)[0].split('=', 1)[1])
+    assert claims['sub'] == str(login_user.id)
+    assert claims['roles'] == ['editor']
+    assert claims['dept'] is None
+    assert isinstance(claims['pv'], int)
+
+
+def test_login_wrong_password(app, client, login_user):
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'wrong', **issue_captcha(app)})
+
+    assert response.status_code == 401
+
+
+def test_login_rehashes_outdated_hash(app, client, login_user):
+    """哈希参数变化后，登录成功会按当前配置重新哈希"""
+    login_user.password = generate_password_hash('secret', 'pbkdf2:sha256:500')
+    db.session.commit()
+    assert login_user.password_needs_rehash()
+
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+
+    assert response.status_code == 200
+    user = db.session.get(User, login_user.id)
+    assert user.password.startswith(password_hasher.method_prefix + '$'), "Password should be rehashed"
+    assert not user.password_needs_rehash()
+
+
+def test_login_failure_counted_and_success_resets(app, client, login_user, login_guard):
+    """失败计入账号计数，成功登录后清空"""
+    client.post('/api/login', json={'username': 'tester', 'password': 'wrong', **issue_captcha(app)})
+    assert login_guard.stats('tester')['account']['failures'] == 1
+
+    client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+    assert login_guard.stats('tester')['account']['failures'] == 0
+
+
+def test_login_hasher_overloaded_returns_503(app, client, login_user, login_guard, monkeypatch):
+    """哈希工作池过载时返回 503 和 Retry-After，不计入登录失败"""
+    def busy(*args, **kwargs):
+        raise PasswordHasherBusy("Too many pending password hash tasks", retry_after=3)
+
+    monkeypatch.setattr(password_hasher, 'verify', busy)
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert login_guard.stats('tester')['account']['failures'] == 0
+
+
+def test_login_locked_account_rejected_before_db_and_hash(app, client, login_user, login_guard, monkeypatch):
+    """账号锁定期间直接拒绝，不校验验证码、不查询数据库、不计算哈希"""
+    for _ in range(login_guard.threshold):
+        login_guard.record_failure('tester')
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should not be called while locked")
+
+    monkeypatch.setattr(password_hasher, 'verify', fail)
+    monkeypatch.setattr(app.captcha_store, 'take', fail)
+
+    response = client.post('/api/login', json={'username': 'tester', 'password': 'secret', **issue_captcha(app)})
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) == login_guard.lockout_base
+    assert login_guard.stats()['rejected'] == 1
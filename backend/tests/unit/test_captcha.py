@@ -1,22 +1,30 @@
 import pytest
 import io
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-from backend.app import Captcha
+from backend.app.utils.captcha import Captcha
+from backend.app.utils.captcha_store import MemoryCaptchaStore, RedisCaptchaStore
 
 
 @pytest.fixture
-def test_captcha_instance(redis_mock):
-    """每次测试生成一个新的 Captcha 实例，注入 mock redis"""
-    return Captcha(redis_client=redis_mock)
+def captcha_store():
+    """进程内验证码存储，替代手写的 mock redis"""
+    return MemoryCaptchaStore()
+
+
+@pytest.fixture
+def test_captcha_instance(captcha_store):
+    """每次测试生成一个新的 Captcha 实例，注入进程内存储"""
+    return Captcha(captcha_store)
 
 # ====================
 # Unit Tests
 # ====================
 
 
-def test_generate_captcha_base64_and_store(test_captcha_instance, redis_mock):
-    base64_data, captcha_id = test_captcha_instance.generate_captcha_base64()
+def test_generate_captcha_base64_and_store(test_captcha_instance, captcha_store):
+    captcha_id, base64_data = test_captcha_instance.generate_captcha_base64()
 
     # 1. 验证返回值类型
     assert isinstance(base64_data, str), "Base64 data should be a string"
@@ -33,125 +41,124 @@ def test_generate_captcha_base64_and_store(test_captcha_instance, redis_mock):
     except Exception as e:
         pytest.fail(f"Base64 string is not a valid image: {e}")
 
-    # 3. 验证 Redis 的 setex 方法是否被调用
-    redis_mock.setex.assert_called_once()
+    # 3. 验证验证码已写入存储
+    stored_code = captcha_store.take(f"{test_captcha_instance.key_prefix}{captcha_id}")
+    assert isinstance(stored_code, str), "Stored captcha code should be a string"
+    assert len(stored_code) == 4, "Stored captcha code should be 4 characters long"
+
+
+def test_generate_captcha_store_expiry(redis_mock):
+    """
+    测试 Redis 存储写入的 key 和过期时间
+    """
+    captcha_instance = Captcha(redis_mock)
+    captcha_instance.generate_captcha_base64()
 
-    # 4. 获取 setex 的调用参数
+    redis_mock.setex.assert_called_once()
     call_args = redis_mock.setex.call_args
-    assert call_args.args[0].startswith(test_captcha_instance.key_prefix), "Redis key should start with prefix"
-    assert call_args.args[1] == test_captcha_instance.expire, "Redis expiry time should match configuration"
-    assert isinstance(call_args.args[2], str), "Stored captcha code should be a string"
-    assert len(call_args.args[2]) == 4, "Stored captcha code should be 4 characters long"
+    assert call_args.args[0].startswith(captcha_instance.key_prefix), "Redis key should start with prefix"
+    assert call_args.args[1] == captcha_instance.expire, "Redis expiry time should match configuration"
+    assert isinstance(captcha_instance.store, RedisCaptchaStore), "Redis client should be wrapped"
 
 
-def test_validate_captcha_success(redis_mock):
+def test_validate_captcha_success(test_captcha_instance, captcha_store):
     """
     测试验证码验证成功的情况
     """
-    stored_code = "TEST"
-    captcha_id = "test-id"
-
-    captcha_instance = Captcha(redis_client=redis_mock)
-    # redis_mock.get.side_effect = lambda skey: stored_code.encode('utf-8') if skey == f"captcha:{captcha_id}" else None
+    captcha_store.setex("captcha:test-id", 60, "TEST")
 
-    redis_mock.get.return_value = stored_code.encode('utf-8')
+    is_valid = test_captcha_instance.verify_captcha("test-id", "TEST")
 
-    user_input = "test"  # 不区分大小写
+    # 验证结果为 True
+    assert is_valid is True, "Valid captcha should return True"
 
-    # 正确调用方式：需要实际调用 get 方法
-    key = f'captcha:{captcha_id}'
-    result = redis_mock.get(key)  # 正确调用
-    print(f"Redis mock get 返回值: {result}")  # 现在会显示 b'TEST'
+    # 验证码只能使用一次
+    assert test_captcha_instance.verify_captcha("test-id", "TEST") is False, "Captcha should be single-use"
 
-    # is_valid = test_captcha_instance.validate_captcha(captcha_id, user_input)
-    #
-    # 调试：打印输入和存储的验证码
-    # print(f"用户输入: {user_input}, 存储的验证码: {stored_code}, 验证结果: {is_valid}")
-    #
-    # # 验证结果为 True
-    # assert is_valid is True, "Valid captcha should return True"
-    #
-    # # 验证 Redis 方法调用
-    # redis_mock.get.assert_called_with("captcha:test-id")
-    # redis_mock.delete.assert_called_with("captcha:test-id")
 
-
-def test_validate_captcha_case_insensitive(test_captcha_instance, redis_mock):
+def test_validate_captcha_case_insensitive(test_captcha_instance, captcha_store):
     """
     测试验证码验证对大小写不敏感
     """
-    stored_code = "TEST"
-    redis_mock.get.return_value = stored_code.encode('utf-8')
     captcha_id = "test-id"
 
     # 测试不同大小写组合
     for user_input in ["test", "TEST", "TeSt", "tEsT"]:
-        is_valid = test_captcha_instance.validate_captcha(captcha_id, user_input)
+        captcha_store.setex(f"captcha:{captcha_id}", 60, "TEST")
+        is_valid = test_captcha_instance.verify_captcha(captcha_id, user_input)
         assert is_valid is True, f"Validation should be case-insensitive for input: {user_input}"
 
 
-def test_validate_captcha_failure_wrong_input(test_captcha_instance, redis_mock):
+def test_validate_captcha_failure_wrong_input(test_captcha_instance, captcha_store):
     """
     测试用户输入错误验证码的情况
     """
-    stored_code = "TEST"
-    redis_mock.get.return_value = stored_code.encode('utf-8')
-    captcha_id = "test-id"
-    user_input = "WRONG"
+    captcha_store.setex("captcha:test-id", 60, "TEST")
 
-    is_valid = test_captcha_instance.validate_captcha(captcha_id, user_input)
+    is_valid = test_captcha_instance.verify_captcha("test-id", "WRONG")
 
     # 1. 验证结果为 False
     assert is_valid is False, "Invalid captcha input should return False"
 
-    # 2. 验证 Redis 方法调用
-    redis_mock.get.assert_called_with("captcha:test-id")
-    redis_mock.delete.assert_not_called(), "Redis delete should not be called for invalid input"
+    # 2. 验证码只能使用一次，输入错误后也会失效
+    assert test_captcha_instance.verify_captcha("test-id", "TEST") is False, "Captcha should be single-use"
 
 
-def test_validate_captcha_nonexistent_id(test_captcha_instance, redis_mock):
+def test_validate_captcha_nonexistent_id(test_captcha_instance):
     """
     测试验证码 ID 不存在的情况
     """
-    redis_mock.get.return_value = None  # 模拟 Redis 中无此验证码
-    captcha_id = "nonexistent-id"
-    user_input = "TEST"
-
-    is_valid = test_captcha_instance.validate_captcha(captcha_id, user_input)
+    is_valid = test_captcha_instance.verify_captcha("nonexistent-id", "TEST")
 
-    # 1. 验证结果为 False
+    # 验证结果为 False
     assert is_valid is False, "Nonexistent captcha ID should return False"
 
-    # 2. 验证 Redis 方法调用
-    redis_mock.get.assert_called_with("captcha:nonexistent-id")
-    redis_mock.delete.assert_not_called(), "Redis delete should not be called for nonexistent ID"
 
+def test_validate_captcha_expired():
+    """
+    测试验证码过期的情况
+    """
+    now = [1000.0]
+    store = MemoryCaptchaStore(clock=lambda: now[0])
+    captcha_instance = Captcha(store, expire=60)
+    store.setex("captcha:test-id", captcha_instance.expire, "TEST")
+
+    now[0] += 61
 
-def test_validate_captcha_empty_input(test_captcha_instance, redis_mock):
+    assert captcha_instance.verify_captcha("test-id", "TEST") is False, "Expired captcha should return False"
+
+
+def test_validate_captcha_empty_input(test_captcha_instance, captcha_store):
     """
     测试用户输入为空的情况
     """
-    stored_code = "TEST"
-    redis_mock.get.return_value = stored_code.encode('utf-8')
-    captcha_id = "test-id"
-    user_input = ""
+    captcha_store.setex("captcha:test-id", 60, "TEST")
 
-    is_valid = test_captcha_instance.validate_captcha(captcha_id, user_input)
+    is_valid = test_captcha_instance.verify_captcha("test-id", "")
 
-    # 1. 验证结果为 False
+    # 验证结果为 False
     assert is_valid is False, "Empty captcha input should return False"
 
-    # 2. 验证 Redis 方法调用
-    redis_mock.get.assert_called_with("captcha:test-id")
-    redis_mock.delete.assert_not_called(), "Redis delete should not be called for empty input"
 
+@pytest.mark.parametrize("store_name", ["memory", "redis"])
+def test_validate_captcha_concurrent_single_use(store_name, captcha_store, redis_mock):
+    """
+    测试并发校验同一个验证码时只有一个请求能通过
+    """
+    captcha_instance = Captcha(captcha_store if store_name == "memory" else redis_mock)
+    captcha_instance.store.setex("captcha:test-id", 60, "TEST")
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: captcha_instance.verify_captcha("test-id", "TEST"), range(64)))
 
-def test_generate_captcha_redis_failure(test_captcha_instance, redis_mock):
+    assert results.count(True) == 1, "Exactly one concurrent verification should succeed"
+
+
+def test_generate_captcha_redis_failure(redis_mock):
     """
     测试 Redis 存储失败的情况
     """
     redis_mock.setex.side_effect = Exception("Redis connection error")
 
     with pytest.raises(Exception, match="Redis connection error"):
-        test_captcha_instance.generate_captcha_base64()
-
+        Captcha(redis_mock).generate_captcha_base64()
@@ -0,0 +1,162 @@
+import io
+import os
+import threading
+import time
+import pytest
+from PIL import Image
+from backend.app.utils.captcha import Captcha
+from backend.app.utils import captcha_pool as captcha_pool_module
+from backend.app.utils.captcha_pool import CaptchaPool
+from backend.app.utils.captcha_render import encode_image
+
+
+@pytest.fixture
+def captcha_pool():
+    """每次测试生成一个新的预渲染池，测试结束后停止生产线程"""
+    pool = CaptchaPool(Captcha(store=None), size=8, low_watermark=2)
+    yield pool
+    pool.stop(timeout=5)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_pool_refills_to_size(captcha_pool):
+    """启动后生产线程应把池补满"""
+    captcha_pool.start()
+    assert wait_until(lambda: captcha_pool.stats()['available'] == captcha_pool.size), "Pool should be filled up"
+
+    stats = captcha_pool.stats()
+    assert stats['produced'] == captcha_pool.size
+    assert stats['refill_rate'] > 0, "Refill rate should be recorded"
+
+
+def test_pool_acquire_hit_returns_png(captcha_pool):
+    """池中有库存时直接取出预渲染结果，记为 hit"""
+    captcha_pool.start()
+    assert wait_until(lambda: captcha_pool.stats()['available'] == captcha_pool.size)
+
+    code, png_bytes = captcha_pool.acquire()
+
+    assert isinstance(code, str) and len(code) == 4
+    assert Image.open(io.BytesIO(png_bytes)).format == "PNG"
+    assert captcha_pool.stats()['hits'] == 1
+    assert captcha_pool.stats()['misses'] == 0
+
+
+def test_pool_acquire_miss_renders_inline():
+    """生产线程来不及补充时回退到当前线程渲染，记为 miss"""
+    pool = CaptchaPool(Captcha(store=None), size=1, low_watermark=0)
+    # 模拟生产线程已停止，池中没有库存
+    pool._pid = os.getpid()
+    pool._stopped = True
+
+    code, png_bytes = pool.acquire()
+
+    assert len(code) == 4
+    assert png_bytes.startswith(b'\x89PNG')
+    assert pool.stats()['misses'] == 1
+    assert pool.stats()['hits'] == 0
+
+
+def test_pool_refills_below_low_watermark(captcha_pool):
+    """取用到低水位以下时生产线程会重新补满"""
+    captcha_pool.start()
+    assert wait_until(lambda: captcha_pool.stats()['available'] == captcha_pool.size)
+
+    for _ in range(captcha_pool.size - captcha_pool.low_watermark):
+        captcha_pool.acquire()
+
+    assert wait_until(lambda: captcha_pool.stats()['available'] == captcha_pool.size), "Pool should be refilled"
+    assert captcha_pool.stats()['produced'] >= 2 * captcha_pool.size - captcha_pool.low_watermark
+
+
+def test_generate_captcha_uses_pool(captcha_pool, redis_mock):
+    """Captcha 配置了预渲染池时，验证码内容与写入 Redis 的 code 一致"""
+    captcha_pool.start()
+    assert wait_until(lambda: captcha_pool.stats()['available'] == captcha_pool.size)
+    captcha = Captcha(redis_mock, pool=captcha_pool)
+
+    captcha_id, base64_data = captcha.generate_captcha_base64()
+
+    redis_mock.setex.assert_called_once()
+    key, expire, code = redis_mock.setex.call_args.args
+    assert key == f'captcha:{captcha_id}'
+    assert len(code) == 4
+    assert captcha_pool.stats()['hits'] == 1
+
+
+def test_pool_invalid_settings():
+    """低水位必须小于池大小"""
+    with pytest.raises(ValueError):
+        CaptchaPool(Captcha(store=None), size=4, low_watermark=4)
+
+
+class FlakyCaptcha:
+    """前 failures 次渲染抛出异常，之后正常渲染"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.captcha = Captcha(store=None)
+
+    def render(self, image_formats=('png',)):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("font failure")
+        return self.captcha.render(image_formats)
+
+
+def test_pool_survives_render_errors(caplog):
+    """渲染异常被记录，生产线程退避后继续补充"""
+    pool = CaptchaPool(FlakyCaptcha(failures=2), size=4, low_watermark=1)
+    try:
+        pool.start()
+        assert wait_until(lambda: pool.stats()['available'] == pool.size), "Pool should recover after render errors"
+    finally:
+        pool.stop(timeout=5)
+
+    assert pool.stats()['errors'] == 2
+    assert 'Captcha pool render failed' in caplog.text
+
+
+def test_pool_restarts_dead_thread(captcha_pool):
+    """生产线程意外退出后，下一次取用时重新启动"""
+    captcha_pool.start()
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    captcha_pool._thread = dead
+
+    captcha_pool.acquire()
+
+    assert captcha_pool._thread is not dead and captcha_pool._thread.is_alive()
+
+
+def test_pool_formats_validated(monkeypatch, caplog):
+    """未知格式在创建时报错，当前环境无法编码的格式在启动时去掉并记录"""
+    with pytest.raises(ValueError):
+        CaptchaPool(Captcha(store=None), size=4, low_watermark=1, image_formats=('png', 'gif'))
+
+    def encode(image, image_format='png'):
+        if image_format == 'webp':
+            raise OSError("encoder webp not available")
+        return encode_image(image, image_format)
+
+    monkeypatch.setattr(captcha_pool_module, 'encode_image', encode)
+    pool = CaptchaPool(Captcha(store=None), size=4, low_watermark=1, image_formats=('png', 'webp'))
+    try:
+        pool.start()
+        assert pool.image_formats == ('png',)
+        assert 'cannot encode webp' in caplog.text
+    finally:
+        pool.stop(timeout=5)
+
+    monkeypatch.setattr(captcha_pool_module, 'encode_image', lambda image, image_format='png': 1 / 0)
+    with pytest.raises(ValueError):
+        CaptchaPool(Captcha(store=None), size=4, low_watermark=1).start()
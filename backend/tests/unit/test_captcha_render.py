@@ -0,0 +1,36 @@
+from backend.app.utils.captcha_render import AtlasRenderer, SimpleRenderer, get_font, get_renderer
+
+
+def test_atlas_renderer_output_matches_simple_renderer_size():
+    """两种渲染器输出尺寸和模式一致"""
+    atlas_image = AtlasRenderer(120, 40).render('AB12')
+    simple_image = SimpleRenderer(120, 40).render('AB12')
+
+    assert atlas_image.size == simple_image.size == (120, 40)
+    assert atlas_image.mode == simple_image.mode == 'RGB'
+
+
+def test_atlas_renderer_draws_text_and_noise():
+    """图片中应同时包含黑色字形像素和噪点像素"""
+    image = AtlasRenderer(120, 40).render('W8QZ')
+    colors = {color for _, color in image.getcolors(maxcolors=120 * 40)}
+
+    assert (0, 0, 0) in colors, "Glyph pixels should be black"
+    noise = [color for color in colors if all(100 <= channel <= 200 for channel in color)]
+    assert noise, "Noise pixels should be present"
+
+
+def test_glyph_atlas_is_reused():
+    """同一字号和字符的字形只光栅化一次"""
+    renderer = AtlasRenderer(120, 40)
+    renderer.warm_up('AB')
+
+    assert len(renderer._atlas) == 2 * len(renderer.font_sizes)
+    mask = renderer._glyph(renderer.font_sizes[0], 'A')
+    assert renderer._glyph(renderer.font_sizes[0], 'A') is mask
+
+
+def test_font_and_renderer_are_cached():
+    """字体和渲染器按参数缓存"""
+    assert get_font(32) is get_font(32)
+    assert get_renderer(120, 40) is get_renderer(120, 40)
@@ -0,0 +1,144 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from redis.exceptions import ResponseError
+from backend.app.utils.captcha_store import CaptchaStore, MemoryCaptchaStore, RedisCaptchaStore
+
+
+class FakeClock:
+    """可手动拨动的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_incomplete_store_cannot_be_created():
+    """未实现 take 的存储在实例化时报错，而不是在首次校验验证码时"""
+    class SetOnlyStore(CaptchaStore):
+        def setex(self, key, expire, value):
+            pass
+
+    with pytest.raises(TypeError):
+        SetOnlyStore()
+    with pytest.raises(TypeError):
+        CaptchaStore()
+
+
+# ====================
+# MemoryCaptchaStore
+# ====================
+
+
+def test_memory_store_take_is_single_use(clock):
+    store = MemoryCaptchaStore(clock=clock)
+    store.setex("captcha:a", 60, "ABCD")
+
+    assert store.take("captcha:a") == "ABCD"
+    assert store.take("captcha:a") is None, "Value should be removed after take"
+
+
+def test_memory_store_expiry(clock):
+    store = MemoryCaptchaStore(clock=clock)
+    store.setex("captcha:a", 60, "ABCD")
+
+    clock.now += 60
+
+    assert store.take("captcha:a") is None, "Expired value should not be returned"
+
+
+def test_memory_store_purges_expired_on_write(clock):
+    store = MemoryCaptchaStore(clock=clock)
+    for i in range(10):
+        store.setex(f"captcha:{i}", 10, "ABCD")
+
+    clock.now += 11
+    store.setex("captcha:new", 10, "ABCD")
+
+    assert len(store) == 1, "Expired keys should be purged when writing"
+
+
+def test_memory_store_bounded_evicts_earliest_expiry(clock):
+    store = MemoryCaptchaStore(max_size=3, clock=clock)
+    store.setex("captcha:long", 300, "AAAA")
+    store.setex("captcha:short", 10, "BBBB")
+    store.setex("captcha:mid", 60, "CCCC")
+
+    store.setex("captcha:new", 60, "DDDD")
+
+    assert len(store) == 3
+    assert store.take("captcha:short") is None, "Earliest expiring key should be evicted"
+    assert store.take("captcha:long") == "AAAA"
+    assert store.take("captcha:new") == "DDDD"
+
+
+def test_memory_store_overwrite_keeps_latest_expiry(clock):
+    store = MemoryCaptchaStore(clock=clock)
+    store.setex("captcha:a", 10, "OLD")
+    store.setex("captcha:a", 60, "NEW")
+
+    clock.now += 30
+
+    assert store.take("captcha:a") == "NEW", "Overwritten key should use the new expiry"
+
+
+def test_memory_store_concurrent_take():
+    store = MemoryCaptchaStore()
+    store.setex("captcha:a", 60, "ABCD")
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda _: store.take("captcha:a"), range(64)))
+
+    assert results.count("ABCD") == 1, "Exactly one concurrent take should succeed"
+
+
+def test_memory_store_invalid_expire():
+    with pytest.raises(ValueError):
+        MemoryCaptchaStore().setex("captcha:a", 0, "ABCD")
+
+
+# ====================
+# RedisCaptchaStore
+# ====================
+
+
+def test_redis_store_take_uses_getdel(redis_mock):
+    store = RedisCaptchaStore(redis_mock)
+    store.setex("captcha:a", 60, "ABCD")
+
+    assert store.take("captcha:a") == b"ABCD"
+
+    # 一次 GETDEL 完成读取和删除，不再单独调用 get / delete
+    redis_mock.getdel.assert_called_once_with("captcha:a")
+    redis_mock.get.assert_not_called()
+    redis_mock.delete.assert_not_called()
+
+
+def test_redis_store_fallback_to_lua(redis_mock, monkeypatch):
+    """旧版 Redis 不支持 GETDEL 时回退到 Lua 脚本"""
+    monkeypatch.setattr(RedisCaptchaStore, "_getdel_supported", True)
+    redis_mock.getdel.side_effect = ResponseError("unknown command 'GETDEL'")
+    store = RedisCaptchaStore(redis_mock)
+    store.setex("captcha:a", 60, "ABCD")
+
+    assert store.take("captcha:a") == b"ABCD"
+    redis_mock.eval.assert_called_once()
+    assert redis_mock.eval.call_args.args[1:] == (1, "captcha:a")
+
+    # 后续请求直接使用 Lua 脚本，不再尝试 GETDEL
+    store.take("captcha:b")
+    redis_mock.getdel.assert_called_once()
+
+
+def test_redis_store_other_errors_propagate(redis_mock, monkeypatch):
+    monkeypatch.setattr(RedisCaptchaStore, "_getdel_supported", True)
+    redis_mock.getdel.side_effect = ResponseError("WRONGTYPE Operation against a key")
+
+    with pytest.raises(ResponseError):
+        RedisCaptchaStore(redis_mock).take("captcha:a")
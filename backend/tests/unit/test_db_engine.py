@@ -0,0 +1,45 @@
+import sqlite3
+from sqlalchemy import text
+from backend.app.config import Config, get_config
+from backend.app.extensions import db
+from backend.app.utils.db_engine import apply_sqlite_pragmas, sqlite_pragmas
+
+
+def test_mysql_engine_options(monkeypatch):
+    for key, value in {'DB_TYPE': 'mysql', 'MYSQL_USER': 'boss', 'MYSQL_PASSWORD': 'secret',
+                       'MYSQL_HOST': 'db', 'MYSQL_DB': 'boss'}.items():
+        monkeypatch.setenv(key, value)
+
+    options = get_config().SQLALCHEMY_ENGINE_OPTIONS
+
+    assert options['pool_size'] == 10
+    assert options['max_overflow'] == 5
+    assert options['pool_recycle'] == 1800
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'connect_timeout': 5, 'read_timeout': 30, 'write_timeout': 30}
+
+
+def test_sqlite_engine_options(monkeypatch):
+    monkeypatch.setenv('DB_TYPE', 'sqlite')
+
+    assert get_config().SQLALCHEMY_ENGINE_OPTIONS == {'connect_args': {'timeout': 5.0}}
+
+
+def test_apply_sqlite_pragmas_on_file_database(tmp_path):
+    config = vars(Config)
+    connection = sqlite3.connect(tmp_path / 'boss.db')
+
+    assert apply_sqlite_pragmas(connection, sqlite_pragmas(config)) == 'wal'
+    values = [connection.execute(f'PRAGMA {name}').fetchone()[0]
+              for name in ('synchronous', 'busy_timeout', 'mmap_size', 'cache_size')]
+    assert values == [1, 5000, 268435456, -64000]  # synchronous=NORMAL 即 1
+    connection.close()
+
+
+def test_memory_database_skips_wal_and_mmap(app):
+    config = vars(Config)
+    assert [name for name, _ in sqlite_pragmas(config, in_memory=True)] == ['busy_timeout', 'synchronous', 'cache_size']
+
+    # 测试应用使用内存数据库，连接上已经执行过 PRAGMA
+    assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+    assert db.session.execute(text('PRAGMA cache_size')).scalar() == -64000
@@ -0,0 +1,252 @@
+import pytest
+from sqlalchemy import event, update
+from backend.app.extensions import db
+from backend.app.models.department import Department
+from backend.app.models.user import User
+
+
+@pytest.fixture
+def tree(app):
+    """
+    构建部门树：
+        root
+        ├── sales
+        │   ├── north
+        │   │   └── beijing
+        │   └── south
+        └── rd
+    """
+    db.create_all()
+    root = Department(name='root')
+    sales = Department(name='sales', parent=root)
+    north = Department(name='north', parent=sales)
+    beijing = Department(name='beijing', parent=north)
+    south = Department(name='south', parent=sales)
+    rd = Department(name='rd', parent=root)
+    db.session.add_all([root, sales, north, beijing, south, rd])
+    db.session.commit()
+    yield {d.name: d for d in (root, sales, north, beijing, south, rd)}
+    db.session.remove()
+    db.drop_all()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@pytest.fixture
+def query_counter(app):
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', counter)
+
+
+def names(query):
+    return sorted(d.name for d in query)
+
+
+def test_paths_and_depth_on_insert(tree):
+    assert tree['root'].path == f"/{tree['root'].id}/"
+    assert tree['root'].depth == 0
+    assert tree['beijing'].path == f"/{tree['root'].id}/{tree['sales'].id}/{tree['north'].id}/{tree['beijing'].id}/"
+    assert tree['beijing'].depth == 3
+
+
+def test_insert_with_parent_id(tree):
+    """只设置 parent_id 也能写入路径"""
+    shanghai = Department(name='shanghai', parent_id=tree['south'].id)
+    db.session.add(shanghai)
+    db.session.commit()
+
+    assert shanghai.path == f"{tree['south'].path}{shanghai.id}/"
+    assert shanghai.depth == 3
+
+
+def test_subtree_and_ancestors(tree, query_counter):
+    sales = tree['sales']
+    beijing = tree['beijing']
+
+    assert names(sales.subtree()) == ['beijing', 'north', 'sales', 'south']
+    assert names(sales.subtree(include_self=False)) == ['beijing', 'north', 'south']
+    assert [d.name for d in beijing.ancestors()] == ['root', 'sales', 'north']
+    assert query_counter.count == 3, "Each helper should resolve in a single query"
+
+
+def test_subtree_users_single_query(tree, query_counter):
+    db.session.add_all([
+        User(username='a', password='x', department=tree['sales']),
+        User(username='b', password='x', department=tree['beijing']),
+        User(username='c', password='x', department=tree['rd']),
+    ])
+    db.session.commit()
+    sales_id = tree['sales'].id
+    query_counter.count = 0
+
+    users = Department.subtree_users(sales_id).all()
+
+    assert sorted(u.username for u in users) == ['a', 'b']
+    # 一次主键查询取根路径，一次用户查询
+    assert query_counter.count == 2
+
+
+def test_subtree_condition_uses_constant_prefix(tree):
+    """路径前缀是常量，可以走 path 索引"""
+    sales = tree['sales']
+    condition = Department.subtree_condition(sales.id)
+    compiled = condition.compile(compile_kwargs={'literal_binds': True})
+
+    assert f"'{sales.path}'" in str(compiled)
+    assert 'SELECT' not in str(compiled)
+    assert names(Department.query.filter(condition)) == ['beijing', 'north', 'sales', 'south']
+    assert Department.query.filter(Department.subtree_condition(-1)).count() == 0
+
+
+def test_move_subtree(tree):
+    """移动部门时整棵子树的路径和深度一起更新"""
+    north = tree['north']
+    north.parent = tree['rd']
+    db.session.commit()
+
+    beijing = db.session.get(Department, tree['beijing'].id)
+    assert north.path == f"{tree['rd'].path}{north.id}/"
+    assert north.depth == 2
+    assert beijing.path == f"{north.path}{beijing.id}/"
+    assert beijing.depth == 3
+    assert names(tree['sales'].subtree()) == ['sales', 'south']
+    assert names(tree['rd'].subtree()) == ['beijing', 'north', 'rd']
+
+
+def test_move_to_root(tree):
+    sales = tree['sales']
+    sales.parent_id = None
+    db.session.commit()
+
+    north = db.session.get(Department, tree['north'].id)
+    assert sales.path == f"/{sales.id}/"
+    assert sales.depth == 0
+    assert north.depth == 1
+    assert names(tree['root'].subtree()) == ['rd', 'root']
+
+
+def test_move_into_own_subtree_rejected(tree):
+    tree['sales'].parent = tree['beijing']
+
+    with pytest.raises(ValueError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_delete_parent_promotes_children(tree):
+    """删除部门后，下级部门的 parent_id 被置空，成为新的根部门"""
+    north_id, beijing_id = tree['north'].id, tree['beijing'].id
+    db.session.delete(tree['north'])
+    db.session.commit()
+
+    beijing = db.session.get(Department, beijing_id)
+    assert db.session.get(Department, north_id) is None
+    assert beijing.parent_id is None
+    assert beijing.path == f"/{beijing_id}/"
+    assert beijing.depth == 0
+
+
+def test_delete_parent_promotes_soft_deleted_children(tree):
+    """已逻辑删除的下级部门同样被提升为根部门，不会留下指向不存在部门的 parent_id"""
+    north_id, beijing_id = tree['north'].id, tree['beijing'].id
+    tree['beijing'].soft_delete()
+    db.session.commit()
+    db.session.delete(tree['north'])
+    db.session.commit()
+
+    table = Department.__table__
+    row = db.session.execute(
+        db.select(table.c.parent_id, table.c.path, table.c.depth).where(table.c.id == beijing_id)
+    ).one()
+    assert db.session.get(Department, north_id) is None
+    assert tuple(row) == (None, f"/{beijing_id}/", 0)
+    # 恢复后是一个独立的根部门
+    assert Department.restore_by_ids([beijing_id]) == 1
+    db.session.commit()
+    assert names(db.session.get(Department, beijing_id).subtree()) == ['beijing']
+
+
+def test_restore_with_missing_parent_rejected(tree):
+    """上级部门已不存在（历史数据）时不能恢复"""
+    table = Department.__table__
+    db.session.execute(update(table).where(table.c.id == tree['rd'].id).values(is_delete=True, parent_id=9999))
+    db.session.commit()
+
+    with pytest.raises(ValueError):
+        Department.restore_by_ids([tree['rd'].id])
+    db.session.rollback()
+
+
+def test_rebuild_paths(tree):
+    db.session.execute(db.update(Department).values(path=None, depth=0))
+    db.session.commit()
+    db.session.expire_all()
+
+    assert Department.rebuild_paths() == 6
+    db.session.commit()
+
+    beijing = db.session.get(Department, tree['beijing'].id)
+    assert beijing.path == f"/{tree['root'].id}/{tree['sales'].id}/{tree['north'].id}/{beijing.id}/"
+    assert beijing.depth == 3
+
+
+def test_rebuild_paths_with_soft_deleted_parent(tree):
+    """已逻辑删除的中间部门也参与重建，其下级部门的路径不会丢失"""
+    table = Department.__table__
+    # 直接改表，模拟约束加入之前已存在的数据
+    db.session.execute(update(table).where(table.c.id == tree['north'].id).values(is_delete=True))
+    db.session.execute(update(table).values(path=None, depth=0))
+    db.session.commit()
+    db.session.expire_all()
+
+    assert Department.rebuild_paths() == 6
+    db.session.commit()
+
+    beijing = db.session.get(Department, tree['beijing'].id)
+    assert beijing.path == f"/{tree['root'].id}/{tree['sales'].id}/{tree['north'].id}/{beijing.id}/"
+    assert beijing.ancestor_ids == [tree['root'].id, tree['sales'].id, tree['north'].id]
+    assert names(beijing.subtree()) == ['beijing']
+
+
+def test_soft_delete_with_children_rejected(tree):
+    tree['north'].soft_delete()
+    with pytest.raises(ValueError):
+        db.session.commit()
+    db.session.rollback()
+
+    with pytest.raises(ValueError):
+        Department.soft_delete_by_ids([tree['sales'].id])
+    db.session.rollback()
+
+
+def test_soft_delete_leaf_then_parent(tree):
+    tree['beijing'].soft_delete()
+    db.session.commit()
+    tree['north'].soft_delete()
+    db.session.commit()
+
+    assert names(tree['sales'].subtree()) == ['sales', 'south']
+    # 上级部门已删除时不能单独恢复下级部门
+    with pytest.raises(ValueError):
+        Department.restore_by_ids([tree['beijing'].id])
+    db.session.rollback()
+    # 连同上级部门一起恢复
+    assert Department.restore_by_ids([tree['north'].id, tree['beijing'].id]) == 2
+    db.session.commit()
+    assert names(tree['sales'].subtree()) == ['beijing', 'north', 'sales', 'south']
+
+
+def test_bulk_soft_delete_whole_subtree(tree):
+    ids = [tree[name].id for name in ('sales', 'north', 'beijing', 'south')]
+
+    assert Department.soft_delete_by_ids(ids) == 4
+    db.session.commit()
+    assert names(Department.query) == ['rd', 'root']
@@ -0,0 +1,118 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from backend.app.extensions import db
+from backend.app.models.department import Department
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.identity import IdentityCache, _lookup_user
+from backend.app.utils.permission import PermissionCache
+from backend.app.utils.response_cache import ResponseCache
+
+
+@pytest.fixture
+def identity_cache(app, redis_mock, monkeypatch):
+    cache = IdentityCache(redis_mock, ttl=60)
+    monkeypatch.setattr(app, 'identity_cache', cache)
+    monkeypatch.setattr(app, 'permission_cache', PermissionCache(redis_mock))
+    monkeypatch.setattr(app, 'response_cache', ResponseCache(redis_mock))
+    return cache
+
+
+@pytest.fixture
+def alice(app, identity_cache):
+    """部门 sales、角色 editor 的用户 alice"""
+    db.create_all()
+    sales = Department(name='sales')
+    editor = Role(role_code='editor', name='编辑')
+    user = User(username='alice', nickname='Alice', password='x', department=sales, roles=[editor])
+    db.session.add(user)
+    db.session.commit()
+    yield {
+        'user': user, 'sales': sales, 'editor': editor,
+        'headers': {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'},
+    }
+    db.session.remove()
+    db.drop_all()
+
+
+def get_me(client, alice):
+    response = client.get('/api/users/me', headers=alice['headers'])
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_me_served_from_cache_without_queries(client, alice, query_budget):
+    first = get_me(client, alice)
+    assert first['username'] == 'alice'
+    assert first['department'] == {'id': alice['sales'].id, 'name': 'sales'}
+    assert [role['role_code'] for role in first['roles']] == ['editor']
+
+    with query_budget(0):
+        assert get_me(client, alice) == first
+
+
+def test_user_change_invalidates_only_that_user(client, alice, identity_cache, redis_mock):
+    get_me(client, alice)
+    bob = User(username='bob', password='x')
+    db.session.add(bob)
+    db.session.commit()
+    identity_cache.get(bob.id)
+
+    alice['user'].nickname = 'Alice Liddell'
+    db.session.commit()
+
+    assert redis_mock.get(f'identity:user:{bob.id}') is not None
+    assert redis_mock.get(f"identity:user:{alice['user'].id}") is None
+    assert get_me(client, alice)['nickname'] == 'Alice Liddell'
+
+
+@pytest.mark.parametrize('change', ['rename_role', 'rename_department', 'remove_role'])
+def test_role_and_department_changes_invalidate(client, alice, change):
+    get_me(client, alice)
+    if change == 'rename_role':
+        alice['editor'].name = '主编'
+    elif change == 'rename_department':
+        alice['sales'].name = 'marketing'
+    else:
+        alice['editor'].users.remove(alice['user'])
+    db.session.commit()
+
+    me = get_me(client, alice)
+    if change == 'rename_role':
+        assert me['roles'][0]['name'] == '主编'
+    elif change == 'rename_department':
+        assert me['department']['name'] == 'marketing'
+    else:
+        assert me['roles'] == []
+
+
+def test_disabled_user_token_rejected(client, alice):
+    get_me(client, alice)
+    alice['user'].status = 0
+    db.session.commit()
+
+    assert client.get('/api/users/me', headers=alice['headers']).status_code == 401
+
+
+def test_lookup_memoized_per_request(app, alice, identity_cache, monkeypatch):
+    calls = []
+    original_get = identity_cache.get
+    monkeypatch.setattr(identity_cache, 'get', lambda user_id: calls.append(user_id) or original_get(user_id))
+    claims = {'sub': str(alice['user'].id)}
+
+    with app.test_request_context():
+        assert _lookup_user({}, claims) is _lookup_user({}, claims)
+    assert calls == [alice['user'].id]
+
+
+def test_stale_backfill_after_invalidation_is_ignored(app, alice, identity_cache, redis_mock):
+    """查库后、回填前用户被禁用：请求结束时写入的旧条目不能让该用户继续通过"""
+    user_id = alice['user'].id
+    with app.test_request_context():
+        assert identity_cache.get(user_id)['status'] == 1
+        alice['user'].status = 0
+        db.session.commit()
+    # 旧条目已在请求结束时写入
+    assert redis_mock.get(f'identity:user:{user_id}') is not None
+
+    assert identity_cache.get(user_id) is None
@@ -1,6 +1,7 @@
 import logging
 from backend.app import create_app
 from backend.app import setup_logger
+from backend.app.utils.logger import shutdown_logger
 
 
 # pytest 的内置捕获器：capsys 和 caplog
@@ -10,6 +11,8 @@ def test_logger_config(capsys):
 
     # 设置 FLASK_ENV 配置，以模拟开发环境
     app.config['FLASK_ENV'] = 'development'
+    # 同步写日志，capsys 才能立即捕获到输出
+    app.config['LOG_QUEUE_ENABLED'] = False
 
     # 调用 setup_logger 函数，使其使用最新的配置来设置日志级别
     setup_logger(app)
@@ -42,3 +45,91 @@ def test_logger_error(caplog):
     app.logger.error(test_error)
 
     assert test_error in caplog.text, "Error message should be logged"
+
+
+def queued_app(tmp_path, **config):
+    """使用队列日志、日志目录为临时目录的应用"""
+    app = create_app()
+    app.config.update(LOG_DIR=str(tmp_path), LOG_QUEUE_ENABLED=True, **config)
+    setup_logger(app)
+    return app
+
+
+def test_queue_logger_flushes_on_shutdown(tmp_path):
+    """队列模式下日志在后台线程写出，关闭时队列中的日志全部写入文件"""
+    app = queued_app(tmp_path)
+
+    assert app.log_listener is not None
+    for i in range(500):
+        app.logger.info(f"queued message {i}")
+    app.logger.error("queued error")
+    shutdown_logger(app)
+
+    lines = (tmp_path / 'app.log').read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 501
+    assert "queued message 499" in lines[-2]
+    assert (tmp_path / 'error.log').read_text(encoding='utf-8').count("queued error") == 1
+
+
+def test_queue_logger_json_format(tmp_path):
+    import json
+    app = queued_app(tmp_path, LOG_FORMAT='json')
+
+    app.logger.warning("结构化日志 %s", 42)
+    shutdown_logger(app)
+
+    record = json.loads((tmp_path / 'app.log').read_text(encoding='utf-8').splitlines()[-1])
+    assert record['message'] == "结构化日志 42"
+    assert record['level'] == 'WARNING'
+    assert record['file'] == 'test_logger.py'
+
+
+def test_compress_only_with_queue(tmp_path):
+    """不走队列时不压缩轮转的日志，避免在请求线程中压缩"""
+    from backend.app.utils.logger import _gzip_rotator
+    app = create_app()
+    app.config.update(LOG_DIR=str(tmp_path), LOG_QUEUE_ENABLED=False, LOG_COMPRESS=True)
+    setup_logger(app)
+    file_handlers = [handler for handler in app.logger.handlers if hasattr(handler, 'rotator')]
+    assert file_handlers and all(handler.rotator is None for handler in file_handlers)
+
+    app = queued_app(tmp_path, LOG_COMPRESS=True)
+    assert all(handler.rotator is _gzip_rotator
+               for handler in app.log_listener.handlers if hasattr(handler, 'rotator'))
+    shutdown_logger(app)
+
+
+def test_queue_handler_drop_policy():
+    """队列满时 drop 策略丢弃日志并计数，不阻塞调用方"""
+    import queue
+    from backend.app.utils.logger import BoundedQueueHandler
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2), policy='drop')
+    logger = logging.getLogger('test_queue_handler_drop_policy')
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in range(5):
+        logger.warning(f"message {i}")
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_rotated_logs_compressed(tmp_path):
+    """轮转的旧日志文件在后台线程中 gzip 压缩"""
+    import gzip
+    from backend.app.utils.logger import _rotating_handler
+    handler = _rotating_handler(str(tmp_path / 'app.log'), logging.Formatter('{message}', style='{'),
+                                logging.INFO, compress=True)
+    handler.maxBytes = 100
+    logger = logging.getLogger('test_rotated_logs_compressed')
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in range(10):
+        logger.warning("x" * 40 + str(i))
+    handler.close()
+
+    rotated = tmp_path / 'app.log.1.gz'
+    assert rotated.exists()
+    assert gzip.decompress(rotated.read_bytes()).startswith(b"x" * 40)
@@ -0,0 +1,61 @@
+import pytest
+from backend.app.utils.login_guard import LoginGuard
+
+
+@pytest.fixture
+def guard(redis_mock):
+    return LoginGuard(redis_mock, threshold=3, window=900, lockout_base=30, lockout_max=100)
+
+
+def test_lockout_seconds_exponential_backoff(guard):
+    """达到阈值后锁定时长指数增长，并受上限约束"""
+    assert [guard.lockout_seconds(n) for n in range(1, 7)] == [0, 0, 30, 60, 100, 100]
+
+
+def test_failures_below_threshold_do_not_lock(guard):
+    assert guard.record_failure('alice') == 0
+    assert guard.record_failure('alice') == 0
+
+    assert guard.locked_for('alice') == 0
+    assert guard.stats('alice')['account']['failures'] == 2
+
+
+def test_lock_after_threshold(guard):
+    for _ in range(guard.threshold - 1):
+        guard.record_failure('alice')
+
+    assert guard.record_failure('alice') == 30
+    assert 0 < guard.locked_for('alice') <= 30
+    # 锁定只针对该账号
+    assert guard.locked_for('bob') == 0
+
+
+def test_lock_check_is_single_redis_call(guard, redis_mock):
+    """锁定检查只需要一次 Redis 调用"""
+    redis_mock.reset_mock()
+
+    guard.locked_for('alice')
+
+    assert redis_mock.method_calls == [('pttl', ('login:lock:alice',), {})]
+
+
+def test_success_clears_failures_and_lock(guard):
+    for _ in range(guard.threshold):
+        guard.record_failure('alice')
+
+    guard.record_success('alice')
+
+    assert guard.locked_for('alice') == 0
+    assert guard.stats('alice')['account']['failures'] == 0
+
+
+def test_stats_counters(guard):
+    for _ in range(guard.threshold + 1):
+        guard.record_failure('alice')
+    guard.record_rejected()
+
+    stats = guard.stats()
+
+    assert stats['failures'] == guard.threshold + 1
+    assert stats['lockouts'] == 2
+    assert stats['rejected'] == 1
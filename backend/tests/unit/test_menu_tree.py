@@ -0,0 +1,151 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from backend.app.extensions import db
+from backend.app.models.menu import Menu
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils import menu_tree as menu_tree_module
+from backend.app.utils.menu_tree import MenuTreeCache, build_menu_tree, user_role_key
+from backend.app.utils.permission import PermissionCache
+
+
+@pytest.fixture
+def menu_cache(app, redis_mock, monkeypatch):
+    """使用 mock redis 的权限缓存和菜单树缓存，版本号每次都从 Redis 读取"""
+    permission_cache = PermissionCache(redis_mock, version_check_interval=0)
+    cache = MenuTreeCache(redis_mock, permission_cache)
+    monkeypatch.setattr(app, 'permission_cache', permission_cache)
+    monkeypatch.setattr(app, 'menu_tree_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def menus(app):
+    """
+    菜单树：
+        系统管理 (sort 2)
+        ├── 角色管理 (sort 2)
+        └── 用户管理 (sort 1)
+        首页 (sort 1)
+    """
+    db.create_all()
+    system = Menu(name='系统管理', sort_order=2)
+    user_menu = Menu(name='用户管理', sort_order=1, parent=system, permission_id='system:user:list',
+                     component_path='system/user/index')
+    role_menu = Menu(name='角色管理', sort_order=2, parent=system, permission_id='system:role:list')
+    home = Menu(name='首页', sort_order=1)
+    hidden = Menu(name='已禁用', status=0, parent=system)
+    editor = Role(role_code='editor', name='编辑', menus=[system, user_menu, home, hidden])
+    viewer = Role(role_code='viewer', name='只读', menus=[user_menu])
+    alice = User(username='alice', password='x', roles=[editor])
+    bob = User(username='bob', password='x', roles=[editor])
+    carol = User(username='carol', password='x', roles=[viewer])
+    admin = User(username='boss', password='x', is_admin=True)
+    db.session.add_all([system, user_menu, role_menu, home, hidden, editor, viewer, alice, bob, carol, admin])
+    db.session.commit()
+    yield {
+        'alice': alice, 'bob': bob, 'carol': carol, 'admin': admin,
+        'editor': editor, 'system': system, 'role_menu': role_menu,
+    }
+    db.session.remove()
+    db.drop_all()
+
+
+def tree_names(tree):
+    return [(node['name'], tree_names(node['children'])) for node in tree]
+
+
+def test_build_tree_for_role_set(menus):
+    tree = build_menu_tree(user_role_key(menus['alice'].id))
+
+    assert tree_names(tree) == [('首页', []), ('系统管理', [('用户管理', [])])]
+    user_menu = tree[1]['children'][0]
+    assert user_menu['permission'] == 'system:user:list'
+    assert user_menu['component_path'] == 'system/user/index'
+
+
+def test_admin_sees_all_enabled_menus(menus):
+    tree = build_menu_tree(user_role_key(menus['admin'].id))
+
+    assert tree_names(tree) == [('首页', []), ('系统管理', [('用户管理', []), ('角色管理', [])])]
+
+
+def test_invisible_parent_promotes_child(menus):
+    """上级菜单不可见时，子菜单作为顶级菜单返回"""
+    assert tree_names(build_menu_tree(user_role_key(menus['carol'].id))) == [('用户管理', [])]
+
+
+def test_build_tree_single_query(menus):
+    role_key = user_role_key(menus['alice'].id)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        build_menu_tree(role_key)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert len(statements) == 1
+
+
+def test_cache_shared_per_role_set(menus, menu_cache, monkeypatch):
+    """角色相同的用户共享同一份菜单树，只构建一次"""
+    calls = []
+    original = menu_tree_module.build_menu_tree
+    monkeypatch.setattr(menu_tree_module, 'build_menu_tree', lambda role_key: calls.append(role_key) or original(role_key))
+
+    alice = menu_cache.get_for_user(menus['alice'].id)
+    bob = menu_cache.get_for_user(menus['bob'].id)
+    carol = menu_cache.get_for_user(menus['carol'].id)
+
+    assert alice == bob
+    assert alice[1] != carol[1]
+    assert calls == [str(menus['editor'].id), user_role_key(menus['carol'].id)]
+
+
+def test_cache_invalidated_on_menu_change(menus, menu_cache):
+    body, etag = menu_cache.get_for_user(menus['alice'].id)
+
+    menus['system'].name = '系统设置'
+    db.session.commit()
+
+    new_body, new_etag = menu_cache.get_for_user(menus['alice'].id)
+    assert new_etag != etag
+    assert '系统设置'.encode('utf-8') in new_body
+
+
+def test_cache_invalidated_on_role_change(menus, menu_cache):
+    _, etag = menu_cache.get_for_user(menus['alice'].id)
+
+    menus['editor'].menus.append(menus['role_menu'])
+    db.session.commit()
+
+    assert menu_cache.get_for_user(menus['alice'].id)[1] != etag
+
+
+def test_menu_tree_endpoint_etag(app, menus, menu_cache):
+    client = app.test_client()
+    token = create_access_token(identity=str(menus['alice'].id))
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/api/menus/tree', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert tree_names(response.get_json()['data']) == [('首页', []), ('系统管理', [('用户管理', [])])]
+    etag = response.headers['ETag']
+
+    response = client.get('/api/menus/tree', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    menus['editor'].menus.append(menus['role_menu'])
+    db.session.commit()
+
+    response = client.get('/api/menus/tree', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_menu_tree_endpoint_requires_login(app):
+    assert app.test_client().get('/api/menus/tree').status_code == 401
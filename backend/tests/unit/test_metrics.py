@@ -0,0 +1,167 @@
+import pytest
+from flask import current_app, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from backend.app import create_app
+from backend.app.extensions import db
+from backend.app.utils.metrics import Metrics, RequestStats, _request_stats, instrument_redis
+
+
+class FakeRedis:
+    """只记录命令的 Redis 客户端，用于验证计时包装"""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute_command(self, *args, **options):
+        self.commands.append(args)
+        return b'1'
+
+    def get(self, name):
+        return self.execute_command('GET', name)
+
+    def pipeline(self, transaction=True):
+        client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.stack = []
+
+            def get(self, name):
+                self.stack.append(('GET', name))
+                return self
+
+            def execute(self):
+                client.commands.extend(self.stack)
+                return [b'1'] * len(self.stack)
+        return Pipeline()
+
+
+@pytest.fixture(scope='module')
+def metrics_app(app):
+    """单独的应用实例，注册测试路由（共享的 app 已处理过请求，不能再添加路由）"""
+    metrics_app = create_app()
+    metrics_app.redis_client = instrument_redis(FakeRedis())
+
+    @metrics_app.route('/probe/<int:queries>')
+    def probe(queries):
+        for _ in range(queries):
+            db.session.execute(text('SELECT 1'))
+        current_app.redis_client.get('a')
+        pipe = current_app.redis_client.pipeline()
+        pipe.get('b').get('c')
+        pipe.execute()
+        return jsonify(ok=True)
+
+    @metrics_app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    with metrics_app.app_context():
+        yield metrics_app
+
+
+def sample(body, line_prefix):
+    """返回以 line_prefix 开头的指标行的值"""
+    for line in body.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_prefix} not found in metrics:\n{body}')
+
+
+def test_render_histogram_buckets_are_cumulative():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    for started_ago in (0.05, 0.5, 5.0):
+        stats = RequestStats()
+        stats.started -= started_ago
+        metrics.observe_request('user.get_user', 'GET', 200, stats)
+
+    body = metrics.render()
+    labels = 'endpoint="user.get_user",method="GET",status="200"'
+    assert sample(body, f'http_request_duration_seconds_bucket{{{labels},le="0.1"}}') == 1
+    assert sample(body, f'http_request_duration_seconds_bucket{{{labels},le="1.0"}}') == 2
+    assert sample(body, f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 3
+    assert sample(body, f'http_request_duration_seconds_count{{{labels}}}') == 3
+    assert sample(body, f'http_request_duration_seconds_sum{{{labels}}}') >= 5.55
+
+
+def test_render_escapes_label_values():
+    metrics = Metrics()
+    metrics.observe_request('a"b\\c\nd', 'GET', 200, RequestStats())
+
+    assert 'endpoint="a\\"b\\\\c\\nd"' in metrics.render()
+
+
+def test_request_sql_and_redis_counts(metrics_app):
+    client = metrics_app.test_client()
+    client.get('/probe/3')
+    client.get('/probe/2')
+
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert sample(body, 'http_request_duration_seconds_count{endpoint="probe",method="GET",status="200"}') == 2
+    assert sample(body, 'db_queries_total{endpoint="probe"}') == 5
+    # 每个请求一条 GET 命令和一次 pipeline 执行
+    assert sample(body, 'redis_commands_total{endpoint="probe"}') == 4
+    assert sample(body, 'db_queries_duration_seconds_total{endpoint="probe"}') > 0
+    assert sample(body, 'log_records_dropped_total') == 0
+
+
+def test_failed_query_does_not_skew_timings(metrics_app):
+    """失败的语句不在连接上留下开始时间，之后的语句计时不受影响"""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        with db.engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 1'))
+            assert 'metrics_query_start' not in connection.info
+    finally:
+        _request_stats.reset(token)
+
+    assert stats.sql_count == 1
+    assert 0 < stats.sql_time < 1
+
+
+def test_queries_outside_requests_not_counted(metrics_app):
+    before = metrics_app.metrics.render()
+    db.session.execute(text('SELECT 1'))
+    metrics_app.redis_client.get('a')
+
+    assert metrics_app.metrics.render() == before
+
+
+def test_unhandled_exception_recorded_as_500(metrics_app):
+    client = metrics_app.test_client()
+    with pytest.raises(RuntimeError):
+        client.get('/boom')
+
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert sample(body, 'http_request_duration_seconds_count{endpoint="boom",method="GET",status="500"}') == 1
+
+
+def test_metrics_endpoint_content_type_and_token(metrics_app, monkeypatch):
+    client = metrics_app.test_client()
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+
+    monkeypatch.setitem(metrics_app.config, 'METRICS_TOKEN', 'secret')
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_metrics_endpoint_requires_token_in_production(metrics_app, monkeypatch):
+    """生产环境未配置令牌时不开放指标接口"""
+    client = metrics_app.test_client()
+    monkeypatch.setitem(metrics_app.config, 'FLASK_ENV', 'production')
+    assert client.get('/api/metrics').status_code == 404
+
+    monkeypatch.setitem(metrics_app.config, 'METRICS_TOKEN', 'secret')
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_metrics_disabled(metrics_app, monkeypatch):
+    monkeypatch.setattr(metrics_app, 'metrics', None)
+
+    assert metrics_app.test_client().get('/api/metrics').status_code == 404
@@ -0,0 +1,90 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from backend.app.utils.password import PasswordHasher, PasswordHasherBusy
+
+CHEAP_METHOD = 'pbkdf2:sha256:1000'
+
+
+@pytest.mark.parametrize("executor", ["inline", "thread", "process"])
+def test_hash_and_verify(executor):
+    """三种执行方式的哈希和校验结果一致"""
+    hasher = PasswordHasher(method=CHEAP_METHOD, executor=executor, workers=2)
+    try:
+        password_hash = hasher.hash('secret')
+
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert hasher.verify(password_hash, 'secret') is True
+        assert hasher.verify(password_hash, 'wrong') is False
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.parametrize("executor", ["inline", "thread"])
+def test_hash_many_keeps_order(executor):
+    """批量哈希按输入顺序返回"""
+    hasher = PasswordHasher(method=CHEAP_METHOD, executor=executor, workers=2)
+    try:
+        passwords = [f'secret{i}' for i in range(10)]
+        hashes = hasher.hash_many(passwords)
+
+        assert len(hashes) == 10
+        assert all(hasher.verify(password_hash, password) for password_hash, password in zip(hashes, passwords))
+    finally:
+        hasher.shutdown()
+
+
+def test_verify_empty_hash():
+    assert PasswordHasher(method=CHEAP_METHOD).verify(None, 'secret') is False
+
+
+def test_needs_rehash_on_method_or_cost_change():
+    """算法或成本参数变化时需要重新哈希"""
+    hasher = PasswordHasher(method=CHEAP_METHOD)
+
+    assert hasher.needs_rehash(generate_password_hash('secret', CHEAP_METHOD)) is False
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:2000')) is True
+    assert hasher.needs_rehash(generate_password_hash('secret', 'scrypt:1024:8:1')) is True
+
+
+def test_needs_rehash_scrypt_default_parameters():
+    """scrypt 未显式给出参数时，与 werkzeug 的默认参数比较"""
+    hasher = PasswordHasher(method='scrypt')
+
+    assert hasher.method_prefix.startswith('scrypt:')
+    assert hasher.needs_rehash(generate_password_hash('secret', 'scrypt')) is False
+
+
+def test_bounded_pending_tasks():
+    """排队任务超过上限时在超时后拒绝"""
+    hasher = PasswordHasher(method=CHEAP_METHOD, executor='thread', workers=1, max_pending=1, timeout=0.05)
+    # 模拟已有一个任务占满排队名额
+    assert hasher._pending.acquire(blocking=False)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.verify(generate_password_hash('secret', CHEAP_METHOD), 'secret')
+    finally:
+        hasher._pending.release()
+
+    assert hasher.verify(generate_password_hash('secret', CHEAP_METHOD), 'secret') is True
+    hasher.shutdown()
+
+
+def test_hash_timeout_reported_as_busy():
+    """任务未在超时时间内完成时按过载处理，而不是抛出 TimeoutError"""
+    import threading
+    hasher = PasswordHasher(method=CHEAP_METHOD, executor='thread', workers=1, timeout=0.05)
+    release = threading.Event()
+    # 占住唯一的工作线程
+    hasher._get_executor().submit(release.wait, 5)
+    try:
+        with pytest.raises(PasswordHasherBusy) as excinfo:
+            hasher.hash('secret')
+        assert excinfo.value.retry_after == 1
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        PasswordHasher(executor='gpu')
@@ -0,0 +1,162 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from backend.app import create_app
+from backend.app.extensions import db
+from backend.app.models.menu import Menu
+from backend.app.models.role import Role, role_menu_association
+from backend.app.models.user import User
+from backend.app.utils import permission as permission_module
+from backend.app.utils.permission import PermissionCache, compile_permissions, require_permission
+
+
+@pytest.fixture
+def permission_cache(app, redis_mock, monkeypatch):
+    """使用 mock redis 的权限缓存，版本号每次都从 Redis 读取"""
+    cache = PermissionCache(redis_mock, version_check_interval=0)
+    monkeypatch.setattr(app, 'permission_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def rbac(app):
+    """创建用户、角色、菜单测试数据"""
+    db.create_all()
+    user_menu = Menu(name='用户管理', permission_id='system:user:list')
+    role_menu = Menu(name='角色管理', permission_id='system:role:list')
+    disabled_menu = Menu(name='已禁用', permission_id='system:disabled', status=0)
+    editor = Role(role_code='editor', name='编辑', permission_char='editor', menus=[user_menu, disabled_menu])
+    auditor = Role(role_code='auditor', name='审计', menus=[role_menu])
+    user = User(username='alice', password='x', roles=[editor])
+    admin = User(username='boss', password='x', is_admin=True)
+    db.session.add_all([user_menu, role_menu, disabled_menu, editor, auditor, user, admin])
+    db.session.commit()
+    yield {'user': user, 'admin': admin, 'editor': editor, 'auditor': auditor, 'role_menu': role_menu}
+    db.session.remove()
+    db.drop_all()
+
+
+def test_compile_permissions(rbac):
+    """菜单权限和角色权限字符合并，禁用菜单不计入"""
+    assert compile_permissions(rbac['user'].id) == {'system:user:list', 'editor'}
+    assert compile_permissions(rbac['admin'].id) == {'*'}
+
+
+def test_cache_hit_skips_database(rbac, permission_cache, monkeypatch):
+    """进程内缓存命中后不再查询数据库"""
+    calls = []
+    original = permission_module.compile_permissions
+    monkeypatch.setattr(permission_module, 'compile_permissions', lambda user_id: calls.append(user_id) or original(user_id))
+
+    assert permission_cache.has_permissions(rbac['user'].id, 'system:user:list')
+    assert permission_cache.has_permissions(rbac['user'].id, 'editor')
+    assert not permission_cache.has_permissions(rbac['user'].id, 'system:role:list')
+
+    assert calls == [rbac['user'].id]
+
+
+def test_redis_cache_shared_between_processes(rbac, permission_cache, redis_mock, monkeypatch):
+    """其他进程（新的缓存实例）从 Redis 读取编译结果"""
+    permission_cache.get(rbac['user'].id)
+    monkeypatch.setattr(permission_module, 'compile_permissions', lambda user_id: pytest.fail("should hit Redis"))
+
+    other = PermissionCache(redis_mock, version_check_interval=0)
+
+    assert other.get(rbac['user'].id) == {'system:user:list', 'editor'}
+
+
+def test_admin_has_all_permissions(rbac, permission_cache):
+    assert permission_cache.has_permissions(rbac['admin'].id, 'anything', 'system:role:list')
+
+
+def test_invalidate_on_user_role_change(rbac, permission_cache):
+    user = rbac['user']
+    assert not permission_cache.has_permissions(user.id, 'system:role:list')
+
+    user.roles.append(rbac['auditor'])
+    db.session.commit()
+
+    assert permission_cache.has_permissions(user.id, 'system:role:list')
+
+
+def test_invalidate_on_role_side_change(rbac, permission_cache):
+    """从角色一侧修改用户关联同样使缓存失效"""
+    user = rbac['user']
+    assert not permission_cache.has_permissions(user.id, 'system:role:list')
+
+    rbac['auditor'].users.append(user)
+    db.session.commit()
+
+    assert permission_cache.has_permissions(user.id, 'system:role:list')
+
+
+def test_invalidate_on_core_association_insert(rbac, permission_cache):
+    """直接对关联表执行 insert 同样使缓存失效"""
+    user = rbac['user']
+    assert not permission_cache.has_permissions(user.id, 'system:role:list')
+
+    db.session.execute(role_menu_association.insert().values(role_id=rbac['editor'].id, menu_id=rbac['role_menu'].id))
+    db.session.commit()
+
+    assert permission_cache.has_permissions(user.id, 'system:role:list')
+
+
+def test_invalidate_on_user_hard_delete(rbac, permission_cache):
+    """物理删除用户后缓存的权限立即失效"""
+    admin_id = rbac['admin'].id
+    assert permission_cache.has_permissions(admin_id, 'system:role:list')
+
+    db.session.delete(rbac['admin'])
+    db.session.commit()
+
+    assert permission_cache.get(admin_id) == frozenset()
+
+
+def test_no_invalidation_on_unrelated_change(rbac, permission_cache, redis_mock):
+    permission_cache.get(rbac['user'].id)
+    version = permission_cache.current_version()
+
+    rbac['user'].nickname = 'Alice'
+    db.session.commit()
+
+    assert permission_cache.current_version() == version
+
+
+def test_rollback_does_not_invalidate(rbac, permission_cache):
+    version = permission_cache.current_version()
+
+    rbac['user'].roles.append(rbac['auditor'])
+    db.session.flush()
+    db.session.rollback()
+
+    assert permission_cache.current_version() == version
+
+
+def test_require_permission_decorator(redis_mock):
+    """装饰器按 JWT 用户的权限放行或返回 403"""
+    app = create_app()
+    app.permission_cache = PermissionCache(redis_mock)
+
+    @app.route('/protected')
+    @require_permission('system:user:list')
+    def protected():
+        return {'ok': True}
+
+    with app.app_context():
+        db.create_all()
+        menu = Menu(name='用户管理', permission_id='system:user:list')
+        allowed = User(username='allowed', password='x', roles=[Role(role_code='r1', name='r1', menus=[menu])])
+        denied = User(username='denied', password='x')
+        db.session.add_all([allowed, denied])
+        db.session.commit()
+        allowed_token = create_access_token(identity=str(allowed.id))
+        denied_token = create_access_token(identity=str(denied.id))
+
+        client = app.test_client()
+        assert client.get('/protected', headers={'Authorization': f'Bearer {allowed_token}'}).status_code == 200
+        response = client.get('/protected', headers={'Authorization': f'Bearer {denied_token}'})
+        assert response.status_code == 403
+        assert response.get_json()['code'] == 1006
+        assert client.get('/protected').status_code == 401
+
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,112 @@
+import logging
+import pytest
+from flask import jsonify
+from sqlalchemy import text
+from backend.app import create_app
+from backend.app.config import Config
+from backend.app.extensions import db
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.permission import PermissionCache
+from backend.app.utils.query_profiler import normalize_statement, track_queries
+from backend.app.utils.response_cache import ResponseCache
+
+
+def seed_users():
+    """8 个用户，分属 3 个角色"""
+    db.create_all()
+    roles = [Role(role_code=f'role{i}', name=f'角色{i}') for i in range(3)]
+    db.session.add_all(roles)
+    db.session.add_all(User(username=f'user{i}', password='x', roles=[roles[i % 3]]) for i in range(8))
+    db.session.commit()
+    db.session.expunge_all()
+
+
+@pytest.fixture
+def users(app, redis_mock, monkeypatch):
+    monkeypatch.setattr(app, 'permission_cache', PermissionCache(redis_mock))
+    monkeypatch.setattr(app, 'response_cache', ResponseCache(redis_mock))
+    seed_users()
+    yield
+    db.session.remove()
+    db.drop_all()
+
+
+def test_normalize_statement():
+    assert normalize_statement("SELECT * FROM users WHERE id = 5 AND name = 'it''s'") == \
+        'SELECT * FROM users WHERE id = ? AND name = ?'
+    assert normalize_statement('SELECT *\n  FROM users WHERE id IN (?, ?, ?)') == \
+        normalize_statement('SELECT * FROM users WHERE id IN (%s)') == \
+        'SELECT * FROM users WHERE id IN (?)'
+    assert normalize_statement('SELECT * FROM users WHERE id = %(id_1)s') == \
+        normalize_statement('SELECT * FROM users WHERE id = :id_1')
+
+
+def test_detects_n_plus_one_with_origin(users):
+    with track_queries(n_plus_one_threshold=5) as recorder:
+        for user in User.query.all():
+            [role.role_code for role in user.roles]  # 逐个懒加载角色
+
+    (shape, stats), = recorder.n_plus_one()
+    assert 'user_role_association' in shape
+    assert stats.count == 8
+    assert stats.origin.filename == __file__
+    assert 'user.roles' in stats.origin.line
+    assert 'N+1 from' in recorder.report()
+
+
+def test_eager_loading_is_not_n_plus_one(users):
+    with track_queries(n_plus_one_threshold=5) as recorder:
+        for user in User.query.options(db.selectinload(User.roles)).all():
+            [role.role_code for role in user.roles]
+
+    assert recorder.queries == 2
+    assert recorder.n_plus_one() == []
+
+
+def test_slow_query_explain(users):
+    with track_queries(slow_threshold=0) as recorder:
+        User.query.filter(User.username == 'user1').all()
+
+    (statement, duration, plan), = recorder.slow
+    assert statement.startswith('SELECT')
+    assert 'users' in plan
+
+
+def test_query_budget_passes_and_fails(users, query_budget):
+    with query_budget(1):
+        User.query.all()
+
+    with pytest.raises(pytest.fail.Exception, match=r'Query budget exceeded: 9 > 2(.|\n)*N\+1 from'):
+        with query_budget(2):
+            for user in User.query.all():
+                user.roles
+
+
+def test_request_profiling_logs_n_plus_one_and_slow_queries(app, redis_mock, monkeypatch, caplog):
+    monkeypatch.setattr(Config, 'QUERY_PROFILER_ENABLED', True)
+    monkeypatch.setattr(Config, 'QUERY_SLOW_THRESHOLD_MS', 0)
+    profiled_app = create_app()
+    profiled_app.permission_cache = PermissionCache(redis_mock)
+    profiled_app.response_cache = ResponseCache(redis_mock)
+
+    @profiled_app.route('/probe')
+    def probe():
+        names = [[role.role_code for role in user.roles] for user in User.query.all()]
+        db.session.execute(text('UPDATE users SET remark = remark'))
+        return jsonify(names)
+
+    with profiled_app.app_context():
+        seed_users()
+        with caplog.at_level(logging.WARNING):
+            assert profiled_app.test_client().get('/probe').status_code == 200
+        db.session.remove()
+        db.drop_all()
+
+    n_plus_one = [r.getMessage() for r in caplog.records if r.getMessage().startswith('N+1 query on probe')]
+    assert len(n_plus_one) == 1
+    assert '8 x' in n_plus_one[0] and __file__ in n_plus_one[0]
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Slow query on probe')]
+    # 只有 SELECT 附带执行计划，UPDATE 不计入
+    assert len(slow) == 9
+    assert all('EXPLAIN:' in message for message in slow)
@@ -0,0 +1,200 @@
+import random
+import time
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from backend.app.utils.rate_limit import TieredStorage
+
+LIMIT = RateLimitItemPerMinute(100)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def tiered(shared, clock=None, sync_batch=10):
+    """共享同一个后端存储（模拟 Redis）的两级存储，不启动后台线程，由测试显式同步"""
+    storage = TieredStorage('tiered+memory://', sync_interval=0, sync_batch=sync_batch, clock=clock or Clock())
+    storage.backend = shared
+    return storage
+
+
+def test_storage_scheme_registered():
+    assert isinstance(storage_from_string('tiered+memory://'), TieredStorage)
+
+
+def test_single_process_matches_pure_limiter():
+    """单进程时两级存储的判断与直接使用共享存储完全一致"""
+    pure = FixedWindowRateLimiter(MemoryStorage())
+    local = FixedWindowRateLimiter(tiered(MemoryStorage()))
+
+    pure_decisions = [pure.hit(LIMIT, 'user') for _ in range(150)]
+    local_decisions = [local.hit(LIMIT, 'user') for _ in range(150)]
+
+    assert local_decisions == pure_decisions
+    assert sum(local_decisions) == 100
+
+
+def test_multi_process_load_close_to_pure_limiter():
+    """
+    模拟 4 个进程随机处理 3 个键的请求：
+    两级存储放行的数量不少于纯 Redis 限流，多出的部分不超过 进程数 × sync_batch，
+    访问共享存储的次数远少于请求数。
+    """
+    rng = random.Random(42)
+    processes, sync_batch = 4, 10
+    pure = FixedWindowRateLimiter(MemoryStorage())
+    shared = MemoryStorage()
+    storages = [tiered(shared, sync_batch=sync_batch) for _ in range(processes)]
+    limiters = [FixedWindowRateLimiter(storage) for storage in storages]
+    keys = ['a', 'b', 'c']
+    admitted_pure = dict.fromkeys(keys, 0)
+    admitted_tiered = dict.fromkeys(keys, 0)
+
+    requests = 1500
+    for i in range(requests):
+        key = rng.choice(keys)
+        admitted_pure[key] += pure.hit(LIMIT, key)
+        admitted_tiered[key] += rng.choice(limiters).hit(LIMIT, key)
+        if i % 50 == 0:
+            # 后台线程的周期同步
+            for storage in storages:
+                storage.sync()
+
+    for key in keys:
+        assert admitted_pure[key] == 100
+        assert 100 <= admitted_tiered[key] <= 100 + processes * sync_batch
+    backend_calls = sum(storage.stats()['backend_calls'] for storage in storages)
+    assert backend_calls < requests / 4
+
+
+def test_sync_lag_metrics():
+    clock = Clock()
+    storage = tiered(MemoryStorage(), clock=clock)
+    storage.incr('k', 60)          # 打开窗口，同步访问共享存储
+    clock.now += 1
+    storage.incr('k', 60)
+    storage.incr('k', 60)
+    clock.now += 2
+
+    stats = storage.stats()
+    assert stats['pending'] == 2
+    assert stats['sync_lag'] == pytest.approx(2)
+    assert stats['local_hits'] == 2
+    assert stats['last_sync_age'] is None
+
+    assert storage.sync() == 1
+    clock.now += 0.5
+    stats = storage.stats()
+    assert stats['pending'] == 0
+    assert stats['sync_lag'] == 0
+    assert stats['last_sync_age'] == pytest.approx(0.5)
+    assert storage.backend.get('k') == 3
+
+
+def test_batch_sync_on_hot_key():
+    """本地未同步计数达到 sync_batch 时立即同步"""
+    storage = tiered(MemoryStorage(), sync_batch=5)
+    for _ in range(6):
+        storage.incr('k', 60)
+
+    assert storage.backend.get('k') == 6
+    assert storage.stats()['pending'] == 0
+
+
+def test_sync_failure_keeps_pending():
+    storage = tiered(MemoryStorage())
+    storage.incr('k', 60)
+    storage.incr('k', 60)
+
+    class Broken(MemoryStorage):
+        def incr(self, key, expiry, amount=1):
+            raise ConnectionError("redis down")
+
+    working = storage.backend
+    storage.backend = Broken()
+    storage.sync()
+    assert storage.stats()['pending'] == 1
+    assert storage.stats()['sync_errors'] == 1
+
+    storage.backend = working
+    storage.sync()
+    assert working.get('k') == 2
+    assert storage.get('k') == 2
+
+
+def test_sync_failures_logged_with_rate_limit(caplog):
+    clock = Clock()
+    storage = tiered(MemoryStorage(), clock=clock)
+
+    class Broken(MemoryStorage):
+        def incr(self, key, expiry, amount=1):
+            raise ConnectionError("redis down")
+
+    for key in ('a', 'b'):
+        storage.incr(key, 60)
+        storage.incr(key, 60)
+    storage.backend = Broken()
+    with caplog.at_level('WARNING', logger='backend.app.utils.rate_limit'):
+        storage.sync()
+        clock.now += 1
+        storage.sync()
+        clock.now += TieredStorage.ERROR_LOG_INTERVAL
+        storage.sync()
+
+    assert storage.stats()['sync_errors'] == 6
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert 'redis down' in messages[0] and '3 similar errors suppressed' in messages[1]
+
+
+def test_sync_loop_survives_unexpected_errors(monkeypatch):
+    storage = TieredStorage('tiered+memory://', sync_interval=0.01)
+    calls = []
+
+    def broken_sync():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(storage, 'sync', broken_sync)
+    storage._ensure_sync_thread()
+    try:
+        deadline = time.monotonic() + 2
+        while len(calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(calls) >= 3
+        assert storage._thread.is_alive()
+        assert storage.stats()['sync_errors'] >= 3
+    finally:
+        storage._stop.set()
+        storage._thread.join()
+
+
+def test_window_expiry_reopens_from_backend():
+    clock = Clock()
+    storage = tiered(MemoryStorage(), clock=clock)
+    storage.incr('k', 60)
+    storage.incr('k', 60)
+
+    storage.backend.clear('k')
+    clock.now += 61
+    assert storage.incr('k', 60) == 1
+
+
+def test_background_sync_thread():
+    storage = TieredStorage('tiered+memory://', sync_interval=0.02, sync_batch=100)
+    try:
+        for _ in range(5):
+            storage.incr('k', 60)
+        deadline = time.monotonic() + 2
+        while storage.backend.get('k') < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert storage.backend.get('k') == 5
+    finally:
+        storage.close()
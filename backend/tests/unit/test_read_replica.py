@@ -0,0 +1,115 @@
+import pytest
+from flask import jsonify
+from sqlalchemy import create_engine
+import backend.app as backend_app
+from backend.app import create_app
+from backend.app.config import get_config
+from backend.app.extensions import db
+from backend.app.models.role import Role
+from backend.app.utils.permission import PermissionCache
+from backend.app.utils.read_replica import ReplicaSet, primary, read_replica
+from backend.app.utils.response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def role_codes():
+    return [role.role_code for role in Role.query.order_by(Role.id)]
+
+
+@pytest.fixture
+def replica_app(app, tmp_path, monkeypatch, redis_mock):
+    """主库和只读副本分别是两个 SQLite 文件，各有一个不同的角色，用于区分查询发往了哪里"""
+    config = get_config()
+    config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "primary.db"}'
+    config.SQLALCHEMY_REPLICA_URIS = (f'sqlite:///{tmp_path / "replica.db"}',)
+    monkeypatch.setattr(backend_app, 'get_config', lambda: config)
+    replica_app = create_app()
+    replica_app.permission_cache = PermissionCache(redis_mock)
+    replica_app.response_cache = ResponseCache(redis_mock)
+
+    @replica_app.route('/roles', methods=['GET', 'POST'])
+    def list_roles():
+        return jsonify(role_codes())
+
+    @replica_app.route('/roles/write-then-read')
+    def write_then_read():
+        before = role_codes()
+        db.session.add(Role(role_code='created', name='新建'))
+        db.session.commit()
+        return jsonify(before=before, after=role_codes())
+
+    @replica_app.route('/roles/primary')
+    def read_primary():
+        with primary():
+            return jsonify(role_codes())
+
+    with replica_app.app_context():
+        db.create_all()
+        db.session.add(Role(role_code='on-primary', name='主库'))
+        db.session.commit()
+        replica_engine = replica_app.read_replicas.engines[0]
+        db.metadata.create_all(replica_engine)
+        with replica_engine.begin() as conn:
+            conn.execute(Role.__table__.insert(), [{'role_code': 'on-replica', 'name': '副本'}])
+        yield replica_app
+        db.session.remove()
+        replica_app.read_replicas.dispose()
+        db.engine.dispose()
+
+
+def test_safe_methods_read_from_replica(replica_app):
+    client = replica_app.test_client()
+
+    assert client.get('/roles').get_json() == ['on-replica']
+    assert client.post('/roles').get_json() == ['on-primary']
+
+
+def test_read_after_write_stays_on_primary(replica_app):
+    body = replica_app.test_client().get('/roles/write-then-read').get_json()
+
+    assert body['before'] == ['on-replica']
+    assert body['after'] == ['on-primary', 'created']
+
+
+def test_primary_block_in_get_request(replica_app):
+    assert replica_app.test_client().get('/roles/primary').get_json() == ['on-primary']
+
+
+def test_read_replica_block_outside_requests(replica_app):
+    assert role_codes() == ['on-primary']
+    db.session.remove()
+    with read_replica():
+        assert role_codes() == ['on-replica']
+
+
+def test_unhealthy_replica_falls_back_to_primary(replica_app):
+    client = replica_app.test_client()
+    replicas = replica_app.read_replicas
+    replicas.clock = clock = Clock()
+
+    replicas.mark_unhealthy(replicas.engines[0])
+    assert client.get('/roles').get_json() == ['on-primary']
+
+    clock.now += replicas.retry_interval
+    assert client.get('/roles').get_json() == ['on-replica']
+
+
+def test_replica_set_health_check(tmp_path):
+    broken = create_engine(f'sqlite:///{tmp_path / "missing" / "replica.db"}')
+    healthy = create_engine(f'sqlite:///{tmp_path / "replica.db"}')
+    clock = Clock()
+    replicas = ReplicaSet([broken, healthy], check_interval=5, retry_interval=30, clock=clock)
+
+    assert [replicas.choose() for _ in range(3)] == [healthy, healthy, healthy]
+    assert list(replicas.stats().values()) == [False, True]
+
+    replicas.mark_unhealthy(healthy)
+    assert replicas.choose() is None
+    replicas.dispose()
@@ -0,0 +1,93 @@
+import logging
+import pytest
+from flask import Flask
+from redis import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+import backend.app as backend_app
+from backend.app import create_app
+from backend.app.config import get_config
+from backend.app.utils.redis_client import DisabledConnection, create_redis_pool, deferred, flush_deferred
+
+
+def deferred_app():
+    app = Flask(__name__)
+    app.teardown_request(flush_deferred)
+    return app
+
+
+def test_pool_is_bounded_with_timeouts(app):
+    config = dict(app.config, REDIS_URI='redis://localhost:6379/3', REDIS_MAX_CONNECTIONS=7,
+                  REDIS_POOL_TIMEOUT=0.5, REDIS_CONNECT_TIMEOUT=0.25, REDIS_SOCKET_TIMEOUT=0.75,
+                  REDIS_HEALTH_CHECK_INTERVAL=15, REDIS_RETRIES=2, REDIS_ENABLED=True)
+    pool = create_redis_pool(config)
+
+    assert isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == 7
+    assert pool.timeout == 0.5
+    kwargs = pool.connection_kwargs
+    assert kwargs['db'] == 3
+    assert kwargs['socket_connect_timeout'] == 0.25
+    assert kwargs['socket_timeout'] == 0.75
+    assert kwargs['health_check_interval'] == 15
+    assert kwargs['retry'].get_retries() == 2
+
+
+def test_app_shares_one_pool(app):
+    assert app.redis_client.connection_pool is app.redis_pool
+    assert app.redis_pool.max_connections == app.config['REDIS_MAX_CONNECTIONS']
+
+
+def test_testing_config_does_not_connect(app, monkeypatch):
+    """测试环境不建立 Redis 连接，会话提交时的缓存失效不访问网络"""
+    def no_network(*args, **kwargs):
+        raise AssertionError("tests must not open network connections")
+
+    monkeypatch.setattr('socket.create_connection', no_network)
+    monkeypatch.setattr('socket.getaddrinfo', no_network)
+
+    assert app.redis_pool.connection_class is DisabledConnection
+    with pytest.raises(RedisConnectionError, match='disabled'):
+        app.redis_client.get('any')
+    app.identity_cache.invalidate([1], everyone=True)
+    app.response_cache.invalidate('users')
+
+
+def test_deferred_commands_flush_at_teardown(redis_mock):
+    app = deferred_app()
+    with app.test_request_context():
+        first = deferred(redis_mock)
+        first.setex('cache:a', 60, '1')
+        deferred(redis_mock).hincrby('stats', 'hits')
+        # 同一请求内复用一个 pipeline，命令尚未发送
+        assert deferred(redis_mock) is first
+        assert redis_mock.get('cache:a') is None
+    # 请求结束后一次性执行
+    assert redis_mock.pipeline.call_count == 1
+    assert redis_mock.get('cache:a') == b'1'
+    assert redis_mock.hgetall('stats') == {b'hits': b'1'}
+
+
+def test_deferred_outside_request_runs_immediately(redis_mock):
+    assert deferred(redis_mock) is redis_mock
+    deferred(redis_mock).setex('cache:b', 60, '2')
+    assert redis_mock.get('cache:b') == b'2'
+    redis_mock.pipeline.assert_not_called()
+
+
+def test_flush_error_is_logged(redis_mock, caplog):
+    app = deferred_app()
+    with caplog.at_level(logging.WARNING):
+        with app.test_request_context():
+            deferred(redis_mock).delete('cache:c')
+            g_pipe = deferred(redis_mock)
+            g_pipe.execute.side_effect = RedisConnectionError('down')
+    assert 'Failed to flush deferred Redis commands: down' in caplog.text
+
+
+def test_limiter_reuses_app_pool(monkeypatch):
+    config = get_config()
+    config.RATELIMIT_STORAGE_URI = config.REDIS_URI
+    monkeypatch.setattr(backend_app, 'get_config', lambda: config)
+    redis_app = create_app()
+
+    assert redis_app.config['RATELIMIT_STORAGE_OPTIONS']['connection_pool'] is redis_app.redis_pool
@@ -0,0 +1,162 @@
+import threading
+import time
+import pytest
+from flask import jsonify
+from redis.exceptions import ConnectionError as RedisConnectionError
+from backend.app import create_app
+from backend.app.extensions import db
+from backend.app.models.menu import Menu
+from backend.app.models.role import Role
+from backend.app.utils.response_cache import ResponseCache, cached_response
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(app, redis_mock, clock, monkeypatch):
+    cache = ResponseCache(redis_mock, stale_ttl=30, lock_timeout=1.0, poll_interval=0.01, clock=clock)
+    monkeypatch.setattr(app, 'response_cache', cache)
+    return cache
+
+
+def compute_counter(body=b'{"ok":true}', delay=0.0):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(delay)
+        from flask import current_app
+        return current_app.response_class(body, mimetype='application/json')
+    return compute, calls
+
+
+def test_hit_after_miss(cache):
+    compute, calls = compute_counter()
+
+    response, state = cache.fetch('k', ('roles',), 60, compute)
+    assert state == 'MISS'
+    response, state = cache.fetch('k', ('roles',), 60, compute)
+    assert state == 'HIT'
+    assert response.get_data() == b'{"ok":true}'
+    assert response.mimetype == 'application/json'
+    assert len(calls) == 1
+
+
+def test_tag_invalidation(cache):
+    compute, calls = compute_counter()
+    cache.fetch('k', ('roles', 'menus'), 60, compute)
+
+    cache.invalidate('posts')
+    assert cache.fetch('k', ('roles', 'menus'), 60, compute)[1] == 'HIT'
+
+    cache.invalidate('menus')
+    assert cache.fetch('k', ('roles', 'menus'), 60, compute)[1] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_expired_entry_served_stale_while_rebuilding(cache, redis_mock, clock):
+    compute, calls = compute_counter()
+    cache.fetch('k', (), 60, compute)
+    clock.now += 61
+
+    # 其他 worker 持有重建锁
+    redis_mock.set('cache:lock:k', 1, px=1000, nx=True)
+    response, state = cache.fetch('k', (), 60, compute)
+    assert state == 'STALE'
+    assert len(calls) == 1
+
+    redis_mock.delete('cache:lock:k')
+    assert cache.fetch('k', (), 60, compute)[1] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_error_responses_not_cached(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        from flask import current_app
+        return current_app.response_class(b'error', status=500)
+
+    cache.fetch('k', (), 60, compute)
+    assert cache.fetch('k', (), 60, compute)[1] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_stampede_single_recompute(app, cache):
+    """多个请求同时未命中时只有一个重新计算，其他等待结果"""
+    compute, calls = compute_counter(delay=0.2)
+    states = []
+
+    def worker():
+        with app.app_context():
+            states.append(cache.fetch('k', ('roles',), 60, compute)[1])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(states) == ['HIT'] * 7 + ['MISS']
+
+
+def test_redis_unavailable_falls_back(app, redis_mock):
+    redis_mock.mget.side_effect = RedisConnectionError("down")
+    cache = ResponseCache(redis_mock)
+    compute, calls = compute_counter()
+
+    assert cache.fetch('k', (), 60, compute)[1] == 'MISS'
+    assert cache.fetch('k', (), 60, compute)[1] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_decorator_with_commit_invalidation(redis_mock):
+    """提交对标签表的修改后缓存自动失效"""
+    app = create_app()
+    app.response_cache = ResponseCache(redis_mock)
+    calls = []
+
+    @app.route('/roles')
+    @cached_response(ttl=60, tags=[Role])
+    def list_roles():
+        calls.append(1)
+        return jsonify([role.name for role in Role.query.order_by(Role.id)])
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Role(role_code='editor', name='编辑'))
+        db.session.commit()
+        client = app.test_client()
+
+        response = client.get('/roles')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert client.get('/roles').headers['X-Cache'] == 'HIT'
+        assert client.get('/roles?page=2').headers['X-Cache'] == 'MISS'
+
+        # 无关表的提交不影响缓存
+        db.session.add(Menu(name='首页'))
+        db.session.commit()
+        assert client.get('/roles').headers['X-Cache'] == 'HIT'
+
+        Role.query.one().name = '编辑者'
+        db.session.commit()
+        response = client.get('/roles')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.get_json() == ['编辑者']
+        assert len(calls) == 3
+
+        db.session.remove()
+        db.drop_all()
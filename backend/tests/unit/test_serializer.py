@@ -0,0 +1,103 @@
+import json
+from datetime import datetime
+import pytest
+from flask import Flask, jsonify
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils import json_provider
+from backend.app.utils.json_provider import FastJSONProvider
+from backend.app.utils.response import ResponseCode, uniform_response
+from backend.app.utils.serializer import ModelSerializer, serializer_for, to_dict, to_dicts
+
+CREATED = datetime(2024, 5, 1, 8, 30, 15)
+
+
+def make_user(i=1):
+    return User(id=i, username=f'user{i}', nickname='张三', password='hash', is_admin=False, status=1,
+                create_time=CREATED, update_time=CREATED, is_delete=False)
+
+
+def test_serializer_columns_exclude_password():
+    data = to_dict(make_user())
+
+    assert 'password' not in data
+    assert data['username'] == 'user1'
+    assert data['create_time'] == CREATED
+    assert set(data) == set(serializer_for(User).fields)
+
+
+def test_serializer_fields_and_exclude():
+    assert to_dict(make_user(), fields=('id', 'username')) == {'id': 1, 'username': 'user1'}
+    assert to_dict(make_user(), fields=('id',)) == {'id': 1}
+    assert 'password' in to_dict(make_user(), exclude=())
+    with pytest.raises(ValueError):
+        ModelSerializer(User, fields=('id', 'missing'))
+
+
+def test_serializer_cached_per_arguments():
+    assert serializer_for(User, fields=('id',)) is serializer_for(User, fields=['id'])
+    assert serializer_for(User) is not serializer_for(Role)
+
+
+def test_to_dicts():
+    assert [row['id'] for row in to_dicts([make_user(1), make_user(2)])] == [1, 2]
+    assert to_dicts([]) == []
+
+
+@pytest.fixture(params=['json', 'orjson'])
+def provider(request, monkeypatch):
+    """标准库和 orjson 两种实现的输出一致"""
+    if request.param == 'orjson':
+        monkeypatch.setattr(json_provider, 'orjson', pytest.importorskip('orjson'))
+    else:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    # provider 只持有应用的弱引用，用 yield 保留应用对象
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    yield app.json
+
+
+def test_provider_encodes_datetime_enum_and_unicode(provider):
+    text = provider.dumps({'time': CREATED, 'code': ResponseCode.SUCCESS, 'name': '张三', 'ids': {1}})
+
+    assert text == '{"time":"2024-05-01T08:30:15","code":[0,"操作成功",200],"name":"张三","ids":[1]}'
+    assert provider.loads(text)['name'] == '张三'
+    assert provider.dumpb({'name': '张三'}) == '{"name":"张三"}'.encode('utf-8')
+
+
+def test_provider_response(provider):
+    with provider._app.app_context():
+        response = jsonify(user=to_dict(make_user()))
+
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.data)['user']['create_time'] == '2024-05-01T08:30:15'
+
+
+def test_app_uses_fast_provider(app):
+    assert isinstance(app.json, FastJSONProvider)
+
+
+def test_uniform_response_serializes_models(app):
+    @uniform_response
+    def single():
+        return make_user()
+
+    @uniform_response
+    def many():
+        return [make_user(1), make_user(2)], 201
+
+    @uniform_response
+    def passthrough():
+        return jsonify(ok=True)
+
+    with app.test_request_context():
+        body = json.loads(single().data)
+        assert body['code'] == 0
+        assert body['data']['create_time'] == '2024-05-01T08:30:15'
+        assert 'password' not in body['data']
+
+        response = many()
+        assert response.status_code == 201
+        assert [row['id'] for row in json.loads(response.data)['data']] == [1, 2]
+
+        assert json.loads(passthrough().data) == {'ok': True}
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import event, inspect, select, text
+from backend.app.extensions import db
+from backend.app.models.menu import Menu
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.permission import PermissionCache
+
+
+@pytest.fixture
+def data(app):
+    db.create_all()
+    menus = [Menu(name=f'menu{i}') for i in range(4)]
+    role = Role(role_code='editor', name='编辑', menus=menus)
+    users = [User(username=f'user{i}', password='x', roles=[role]) for i in range(4)]
+    db.session.add_all([role, *menus, *users])
+    db.session.commit()
+    menus[0].soft_delete()
+    users[0].soft_delete()
+    db.session.commit()
+    yield {'role': role, 'menus': menus, 'users': users}
+    db.session.remove()
+    db.drop_all()
+
+
+@pytest.fixture
+def statements(app):
+    captured = []
+    listener = lambda conn, cursor, statement, *args: captured.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    yield captured
+    event.remove(db.engine, 'before_cursor_execute', listener)
+
+
+def test_deleted_rows_excluded(data):
+    assert sorted(user.username for user in User.query.all()) == ['user1', 'user2', 'user3']
+    assert db.session.execute(select(db.func.count()).select_from(User)).scalar() == 3
+    assert User.query.filter_by(username='user0').first() is None
+
+
+def test_deleted_rows_excluded_from_relationship_loads(data):
+    db.session.expire_all()
+    role = Role.query.one()
+
+    assert sorted(menu.name for menu in role.menus) == ['menu1', 'menu2', 'menu3']
+    assert role.users.count() == 3
+
+
+def test_include_deleted_opt_out(data):
+    users = User.query.execution_options(include_deleted=True).all()
+    assert len(users) == 4
+
+    deleted = db.session.execute(
+        select(User).where(User.username == 'user0').execution_options(include_deleted=True)
+    ).scalar_one()
+    assert deleted.is_delete is True
+
+
+def test_bulk_soft_delete_and_restore_single_statement(data, statements):
+    ids = [user.id for user in data['users']]
+    statements.clear()
+
+    assert User.soft_delete_by_ids(ids) == 3
+    db.session.commit()
+    assert len([s for s in statements if s.startswith('UPDATE')]) == 1
+    assert User.query.count() == 0
+
+    statements.clear()
+    assert User.restore_by_ids(ids[:2]) == 2
+    db.session.commit()
+    assert len([s for s in statements if s.startswith('UPDATE')]) == 1
+    assert sorted(user.username for user in User.query) == ['user0', 'user1']
+
+
+def test_bulk_soft_delete_invalidates_permissions(app, data, redis_mock, monkeypatch):
+    cache = PermissionCache(redis_mock, version_check_interval=0)
+    monkeypatch.setattr(app, 'permission_cache', cache)
+    version = cache.current_version()
+
+    Menu.soft_delete_by_ids([data['menus'][1].id])
+    db.session.commit()
+
+    assert cache.current_version() == version + 1
+
+
+def test_mixin_indexes(data):
+    indexes = {index['name']: index for index in inspect(db.engine).get_indexes('users')}
+
+    assert indexes['ix_users_is_delete_status_create_time']['column_names'] == ['is_delete', 'status', 'create_time']
+    assert 'ix_users_create_time_id' in indexes
+    # SQLite 上创建只包含未删除行的部分索引
+    sql = db.session.execute(text(
+        "SELECT sql FROM sqlite_master WHERE name = 'ix_users_live_status_create_time'"
+    )).scalar()
+    assert 'WHERE is_delete = 0' in sql
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+from flask import Blueprint
+from backend.app import create_app
+from backend.app.config import Config
+from backend.app.views import BLUEPRINTS, discover_blueprints
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 全新解释器中导入应用并执行 create_app() 的耗时上限（秒），可通过环境变量按机器调整
+STARTUP_BUDGET = float(os.getenv('STARTUP_BUDGET_SECONDS', 3.0))
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+finished = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': finished - imported,
+    'total': finished - started,
+    'modules': sorted(name for name in sys.modules if name.split('.')[0] == 'PIL'),
+}))
+"""
+
+
+def measure_startup():
+    """在子进程中测量冷启动，避免受当前进程已导入模块的影响"""
+    env = dict(os.environ, FLASK_ENV='testing')
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, timeout=60, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_registry_covers_all_view_modules():
+    """新增的视图模块必须登记到 BLUEPRINTS，否则不会被注册"""
+    assert sorted(BLUEPRINTS) == discover_blueprints()
+
+
+def test_auto_discover_registers_same_blueprints(app, monkeypatch):
+    monkeypatch.setattr(Config, 'BLUEPRINT_AUTO_DISCOVER', True)
+    discovered = create_app()
+
+    assert sorted(discovered.blueprints) == sorted(app.blueprints)
+    assert all(isinstance(bp, Blueprint) for bp in discovered.blueprints.values())
+
+
+def test_startup_does_not_import_pillow_and_fits_budget():
+    # 取两次中较快的一次，减少偶发抖动造成的误报
+    runs = [measure_startup() for _ in range(2)]
+    best = min(runs, key=lambda run: run['total'])
+
+    assert best['modules'] == [], "Pillow should only be imported when the first captcha is rendered"
+    assert best['total'] < STARTUP_BUDGET, (
+        f"startup took {best['total']:.3f}s (import {best['import']:.3f}s, create_app {best['create_app']:.3f}s), "
+        f"budget {STARTUP_BUDGET}s; run `python -X importtime -c 'from app import create_app; create_app()'` "
+        f"in backend to find the slow imports"
+    )
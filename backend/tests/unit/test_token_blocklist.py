@@ -0,0 +1,174 @@
+import queue
+import time
+import pytest
+from flask import jsonify
+from flask_jwt_extended import create_access_token, decode_token, jwt_required
+from redis.exceptions import ConnectionError as RedisConnectionError
+from backend.app import create_app
+from backend.app.extensions import db
+from backend.app.models.user import User
+from backend.app.utils.identity import IdentityCache
+from backend.app.utils.token_blocklist import BloomFilter, TokenBlocklist
+
+
+class FakePubSub:
+    """把 publish 的消息投递给订阅方的最小 pubsub 实现"""
+
+    def __init__(self):
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channel = channel
+
+    def deliver(self, channel, message):
+        self.messages.put({'type': 'message', 'channel': channel, 'data': message})
+        return 1
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f'revoked-{i}')
+
+    # 没有漏报
+    assert all(f'revoked-{i}' in bloom for i in range(10000))
+    false_positives = sum(f'active-{i}' in bloom for i in range(50000))
+    assert false_positives / 50000 < 0.02
+    assert bloom.estimated_error_rate() == pytest.approx(0.01, rel=0.2)
+
+
+def test_bloom_filter_validates_parameters():
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=0)
+    with pytest.raises(ValueError):
+        BloomFilter(capacity=10, error_rate=1)
+
+
+def test_revoke_stores_jti_until_token_expires(redis_mock):
+    blocklist = TokenBlocklist(redis_mock, listen=False)
+    now = time.time()
+
+    assert blocklist.revoke('jti-1', now + 60)
+    assert 0 < redis_mock.pttl('jwt:revoked:jti:jti-1') <= 60000
+    assert redis_mock.zrangebyscore('jwt:revoked:index', '-inf', '+inf') == [b'jti-1']
+    assert redis_mock.published == [('jwt:revoked:events', b'jti-1')]
+    # 已过期的令牌不需要记录
+    assert not blocklist.revoke('jti-2', now - 1)
+    assert redis_mock.get('jwt:revoked:jti:jti-2') is None
+
+
+def test_unrevoked_tokens_pass_without_redis(redis_mock):
+    TokenBlocklist(redis_mock, listen=False).revoke('revoked', time.time() + 60)
+    # 另一个进程启动时从索引加载过滤器
+    blocklist = TokenBlocklist(redis_mock, listen=False)
+
+    for i in range(100):
+        assert not blocklist.is_revoked(f'active-{i}')
+    assert blocklist.is_revoked('revoked')
+
+    stats = blocklist.stats()
+    assert stats['live'] and stats['filter_entries'] == 1
+    assert stats['checks'] == 101 and stats['revoked'] == 1
+    # 只有命中过滤器的检查（真实撤销或极少数误报）访问 Redis
+    assert stats['redis_lookups'] == redis_mock.exists.call_count <= 2
+    assert stats['filter_passes'] == 101 - stats['redis_lookups']
+
+
+def test_revocation_reaches_other_workers_via_pubsub(redis_mock):
+    pubsub = FakePubSub()
+    redis_mock.pubsub.return_value = pubsub
+    redis_mock.publish.side_effect = pubsub.deliver
+    worker = TokenBlocklist(redis_mock)
+    worker.start()
+    try:
+        assert wait_until(lambda: worker.stats()['live'])
+        TokenBlocklist(redis_mock, listen=False).revoke('revoked-elsewhere', time.time() + 60)
+        assert wait_until(lambda: worker.stats()['filter_entries'] == 1)
+        assert worker.is_revoked('revoked-elsewhere')
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_own_revocation_counted_once(redis_mock):
+    pubsub = FakePubSub()
+    redis_mock.pubsub.return_value = pubsub
+    redis_mock.publish.side_effect = pubsub.deliver
+    worker = TokenBlocklist(redis_mock)
+    worker.start()
+    try:
+        assert wait_until(lambda: worker.stats()['live'])
+        worker.revoke('revoked-here', time.time() + 60)
+        # 等待本进程发布的消息被订阅线程处理
+        assert wait_until(pubsub.messages.empty)
+        time.sleep(0.05)
+        assert worker.stats()['filter_entries'] == 1
+    finally:
+        worker.stop(timeout=2)
+
+
+def test_redis_errors_fall_back_to_local_filter(redis_mock):
+    blocklist = TokenBlocklist(redis_mock, listen=False)
+    blocklist.revoke('revoked', time.time() + 60)
+    blocklist.is_revoked('warm-up')
+    redis_mock.exists.side_effect = RedisConnectionError('down')
+
+    assert blocklist.is_revoked('revoked')
+    assert blocklist.stats()['lookup_errors'] == 1
+
+
+@pytest.fixture
+def blocklist_app(app, redis_mock):
+    blocklist_app = create_app()
+    blocklist_app.token_blocklist = TokenBlocklist(redis_mock, listen=False)
+    blocklist_app.identity_cache = IdentityCache(redis_mock)
+    with blocklist_app.app_context():
+        db.create_all()
+        db.session.add(User(username='alice', password='hash'))
+        db.session.commit()
+
+    @blocklist_app.route('/protected')
+    @jwt_required()
+    def protected():
+        return jsonify(ok=True)
+
+    return blocklist_app
+
+
+def test_logout_revokes_token(blocklist_app):
+    client = blocklist_app.test_client()
+    with blocklist_app.app_context():
+        token = create_access_token(identity=str(User.query.one().id))
+        jti = decode_token(token)['jti']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.get('/protected', headers=headers).status_code == 200
+    assert client.post('/api/logout', headers=headers).status_code == 200
+    assert blocklist_app.token_blocklist.is_revoked(jti)
+    assert client.get('/protected', headers=headers).status_code == 401
+    # 已撤销的令牌再次注销不报错
+    assert client.post('/api/logout', headers=headers).status_code == 200
+
+
+def test_logout_without_token(blocklist_app):
+    response = blocklist_app.test_client().post('/api/logout')
+
+    assert response.status_code == 200
+    assert blocklist_app.token_blocklist.stats()['filter_entries'] == 0
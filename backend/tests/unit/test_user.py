@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from backend.app.extensions import db
+from backend.app.models.department import Department
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.identity import IdentityCache
+from backend.app.utils.permission import PermissionCache
+from backend.app.utils.response_cache import ResponseCache
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def permission_cache(app, redis_mock, monkeypatch):
+    cache = PermissionCache(redis_mock)
+    monkeypatch.setattr(app, 'permission_cache', cache)
+    monkeypatch.setattr(app, 'response_cache', ResponseCache(redis_mock))
+    monkeypatch.setattr(app, 'identity_cache', IdentityCache(redis_mock))
+    return cache
+
+
+@pytest.fixture
+def users(app, permission_cache):
+    """
+    25 个普通用户，每 3 个共享同一创建时间以覆盖游标的 id 排序；
+    偶数用户属于 sales/north 部门和 editor 角色，奇数用户属于 rd 部门和 viewer 角色；
+    每 5 个用户中有 1 个禁用，另有 1 个逻辑删除的用户。
+    """
+    db.create_all()
+    sales = Department(name='sales')
+    north = Department(name='north', parent=sales)
+    rd = Department(name='rd')
+    editor = Role(role_code='editor', name='编辑')
+    viewer = Role(role_code='viewer', name='只读')
+    admin = User(username='boss', password='x', is_admin=True, create_time=BASE_TIME - timedelta(days=1))
+    db.session.add_all([sales, north, rd, editor, viewer, admin])
+    for i in range(25):
+        db.session.add(User(
+            username=f'user{i:02d}',
+            password='x',
+            department=(sales if i % 4 == 0 else north) if i % 2 == 0 else rd,
+            roles=[editor] if i % 2 == 0 else [viewer, editor] if i % 3 == 0 else [viewer],
+            status=0 if i % 5 == 0 else 1,
+            create_time=BASE_TIME + timedelta(hours=i // 3),
+        ))
+    db.session.add(User(username='deleted', password='x', is_delete=True, create_time=BASE_TIME))
+    db.session.commit()
+
+    token = create_access_token(identity=str(admin.id))
+    yield {
+        'headers': {'Authorization': f'Bearer {token}'},
+        'sales': sales, 'rd': rd, 'editor': editor, 'viewer': viewer,
+    }
+    db.session.remove()
+    db.drop_all()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@pytest.fixture
+def query_counter(app):
+    counter = QueryCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', counter)
+
+
+def fetch_all(client, headers, **params):
+    """按游标依次取完所有页，返回用户名列表和页数"""
+    names, pages, cursor = [], 0, None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        body = client.get('/api/users', headers=headers, query_string=query).get_json()
+        assert body['code'] == 0
+        names.extend(item['username'] for item in body['data']['items'])
+        pages += 1
+        cursor = body['data']['next_cursor']
+        if cursor is None:
+            return names, pages
+
+
+def test_list_users_keyset_pagination(app, users):
+    """游标分页按 (create_time, id) 倒序遍历全部用户，不重复不遗漏"""
+    names, pages = fetch_all(app.test_client(), users['headers'], limit=7)
+
+    expected = [f'user{i:02d}' for i in sorted(range(25), key=lambda i: (i // 3, i), reverse=True)] + ['boss']
+    assert names == expected
+    assert pages == 4
+
+
+def test_list_users_item_fields(app, users):
+    body = app.test_client().get('/api/users', headers=users['headers'], query_string={'limit': 1}).get_json()
+    item = body['data']['items'][0]
+
+    assert item['username'] == 'user24'
+    assert item['department'] == {'id': users['sales'].id, 'name': 'sales'}
+    assert [role['role_code'] for role in item['roles']] == ['editor']
+    assert 'password' not in item
+
+
+def test_list_users_filters(app, users):
+    client, headers = app.test_client(), users['headers']
+
+    names, _ = fetch_all(client, headers, department_id=users['sales'].id)
+    assert sorted(names) == [f'user{i:02d}' for i in range(0, 25, 2)]
+
+    names, _ = fetch_all(client, headers, role_id=users['viewer'].id)
+    assert sorted(names) == [f'user{i:02d}' for i in range(1, 25, 2)]
+
+    names, _ = fetch_all(client, headers, status=0, role_id=users['editor'].id)
+    assert sorted(names) == ['user00', 'user10', 'user15', 'user20']
+
+
+def test_list_users_constant_query_count(app, users, query_counter):
+    """每页的查询次数固定，与每页数量无关，防止 N+1 回归"""
+    client, headers = app.test_client(), users['headers']
+    client.get('/api/users', headers=headers, query_string={'limit': 1})  # 预热权限缓存
+
+    counts = []
+    for limit in (1, 10, 26):
+        query_counter.count = 0
+        response = client.get('/api/users', headers=headers, query_string={'limit': limit})
+        assert len(response.get_json()['data']['items']) == limit
+        counts.append(query_counter.count)
+
+    assert counts == [2, 2, 2]
+
+
+def test_list_users_invalid_cursor(app, users):
+    response = app.test_client().get('/api/users', headers=users['headers'], query_string={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == 1001
+
+
+def test_get_user(app, users):
+    client, headers = app.test_client(), users['headers']
+    user_id = User.query.filter_by(username='user03').one().id
+
+    body = client.get(f'/api/users/{user_id}', headers=headers).get_json()
+    assert body['data']['username'] == 'user03'
+    assert sorted(role['role_code'] for role in body['data']['roles']) == ['editor', 'viewer']
+
+    deleted_id = User.query.execution_options(include_deleted=True).filter_by(username='deleted').one().id
+    assert client.get(f'/api/users/{deleted_id}', headers=headers).get_json()['code'] == 1004
+
+
+def test_get_user_cached_until_change(app, users):
+    client, headers = app.test_client(), users['headers']
+    user = User.query.filter_by(username='user03').one()
+
+    assert client.get(f'/api/users/{user.id}', headers=headers).headers['X-Cache'] == 'MISS'
+    assert client.get(f'/api/users/{user.id}', headers=headers).headers['X-Cache'] == 'HIT'
+
+    user.nickname = 'Three'
+    db.session.commit()
+    response = client.get(f'/api/users/{user.id}', headers=headers)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['data']['nickname'] == 'Three'
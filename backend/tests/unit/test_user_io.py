@@ -0,0 +1,151 @@
+import csv
+import io
+import pytest
+from flask_jwt_extended import create_access_token
+from backend.app.extensions import db
+from backend.app.models.department import Department
+from backend.app.models.role import Role
+from backend.app.models.user import User
+from backend.app.utils.permission import PermissionCache
+from backend.app.utils.user_io import export_users, import_users
+
+HEADER = 'username,password,nickname,email,phone_number,gender,department,roles\n'
+
+
+@pytest.fixture
+def org(app, redis_mock, monkeypatch):
+    monkeypatch.setattr(app, 'permission_cache', PermissionCache(redis_mock))
+    db.create_all()
+    sales = Department(name='sales')
+    editor = Role(role_code='editor', name='编辑')
+    viewer = Role(role_code='viewer', name='只读')
+    admin = User(username='boss', password='x', is_admin=True, email='boss@example.com')
+    db.session.add_all([sales, editor, viewer, admin])
+    db.session.commit()
+    yield {'admin': admin, 'sales': sales}
+    db.session.remove()
+    db.drop_all()
+
+
+def csv_lines(*rows):
+    return io.StringIO(HEADER + ''.join(f'{row}\n' for row in rows))
+
+
+def test_import_users_in_chunks(org):
+    progress = []
+    lines = csv_lines(
+        'alice,pw1,Alice,alice@example.com,13800000001,2,sales,editor|viewer',
+        'bob,pw2,,,,,,',
+        ',pw3,,,,,,',                                   # 缺少用户名
+        'carol,pw4,,boss@example.com,,,,',              # 邮箱与已有用户重复
+        'dave,pw5,,,,,unknown,',                        # 部门不存在
+        'erin,pw6,,,,,,admin',                          # 角色不存在
+        'frank,pw7,,alice@example.com,,,,',             # 邮箱与文件内前面的行重复
+        'alice,pw8,,,,,,',                              # 用户名重复
+        'grace,pw9,,,,9,,',                             # 性别不合法
+        'heidi,pw10,,,,,sales,viewer',
+    )
+
+    result = import_users(lines, chunk_size=3, progress=progress.append)
+
+    assert result.total == 10
+    assert result.created == 3
+    assert [line for line, _ in result.errors] == [4, 5, 6, 7, 8, 9, 10]
+    assert [chunk['created'] for chunk in progress] == [2, 0, 0, 1]
+    assert progress[-1]['total_created'] == 3
+    assert result.chunks == progress
+
+    alice = User.query.filter_by(username='alice').one()
+    assert alice.check_password('pw1')
+    assert alice.department.name == 'sales'
+    assert sorted(role.role_code for role in alice.roles) == ['editor', 'viewer']
+    assert alice.gender == 2
+    assert User.query.filter_by(username='bob').one().email is None
+
+
+def test_import_roles_attach_to_inserted_rows(org, monkeypatch):
+    """校验之后其他导入写入了同名用户时，角色仍然关联到本次插入的行"""
+    from backend.app.utils.user_io import UserImporter
+    other = User(id=1000, username='alice', password='x')
+    db.session.add(other)
+    db.session.commit()
+    # 模拟并发导入：校验时同名用户尚未写入
+    monkeypatch.setattr(UserImporter, '_existing', lambda self, chunk: {field: set() for field in self.seen})
+
+    result = import_users(csv_lines('alice,pw1,,,,,,editor'))
+
+    assert result.created == 1
+    imported = User.query.filter(User.username == 'alice', User.id != 1000).one()
+    assert [role.role_code for role in imported.roles] == ['editor']
+    assert db.session.get(User, 1000).roles == []
+
+
+def test_import_without_sorted_returning(org, monkeypatch):
+    """数据库不支持有序 RETURNING（如 MySQL）时逐行插入，角色仍关联到正确的用户"""
+    dialect = db.session.get_bind().dialect
+    monkeypatch.setattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+
+    result = import_users(csv_lines('alice,pw1,,,,,,editor', 'bob,pw2,,,,,,viewer|editor'))
+
+    assert result.created == 2 and not result.errors
+    roles = {user.username: sorted(role.role_code for role in user.roles)
+             for user in User.query.filter(User.username.in_(['alice', 'bob']))}
+    assert roles == {'alice': ['editor'], 'bob': ['editor', 'viewer']}
+
+
+def test_import_missing_columns(org):
+    with pytest.raises(ValueError):
+        import_users(io.StringIO('username\nalice\n'))
+
+
+def test_import_chunk_database_error_isolated(org, monkeypatch):
+    """某一批写入失败只影响该批"""
+    from backend.app.utils import user_io
+    calls = []
+    original = user_io.password_hasher.hash_many
+
+    def failing_hash_many(passwords):
+        hashes = original(passwords)
+        calls.append(len(hashes))
+        # 第二批返回空的哈希，违反非空约束触发数据库错误
+        return hashes if len(calls) != 2 else [None] * len(hashes)
+
+    monkeypatch.setattr(user_io.password_hasher, 'hash_many', failing_hash_many)
+    result = import_users(csv_lines('u1,pw,,,,,,', 'u2,pw,,,,,,', 'u3,pw,,,,,,'), chunk_size=1)
+
+    assert result.created == 2
+    assert [line for line, _ in result.errors] == [3]
+    assert sorted(user.username for user in User.query.filter(User.username.like('u%'))) == ['u1', 'u3']
+
+
+def test_export_users_streams_batches(org):
+    import_users(csv_lines(*(f'user{i},pw,,,,,sales,editor|viewer' for i in range(5))))
+
+    chunks = list(export_users(batch_size=2))
+
+    # 表头 + 3 批（2、2、2 行，共 6 个用户）
+    assert len(chunks) == 4
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+    assert [row['username'] for row in rows] == ['boss'] + [f'user{i}' for i in range(5)]
+    assert rows[1]['department'] == 'sales'
+    assert rows[1]['roles'] == 'editor|viewer'
+    assert rows[0]['roles'] == ''
+
+
+def test_import_and_export_endpoints(app, org):
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(org['admin'].id))}"}
+    upload = io.BytesIO(('﻿' + HEADER + 'alice,pw,,,,,sales,editor\nbob,,,,,,,\n').encode('utf-8'))
+
+    response = client.post('/api/users/import', headers=headers,
+                           data={'file': (upload, 'users.csv')}, content_type='multipart/form-data')
+    body = response.get_json()['data']
+    assert body['created'] == 1
+    assert body['errors'] == [{'line': 3, 'message': 'password is required'}]
+
+    response = client.get('/api/users/export', headers=headers)
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert [row['username'] for row in csv.DictReader(io.StringIO(response.get_data(as_text=True)))] == ['boss', 'alice']
+
+    assert client.post('/api/users/import', headers=headers).status_code == 400